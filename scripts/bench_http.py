@@ -0,0 +1,78 @@
+"""
+Connection-reuse benchmark against a local stub server.
+
+  python scripts/bench_http.py --n 500
+
+Compares a fresh httpx.Client per call (what the eBay client used to do) with the
+shared keep-alive pool from channels.http. The stub counts TCP connections, so
+the reuse is visible directly; against the real APIs every avoided connection
+also saves a TLS handshake (and the stub has none), so real gains are larger.
+Most of the per-call cost here is building a new client (SSL context, pool).
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from channels.http import close_http, get_http  # noqa: E402
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with _Stub.lock:
+            _Stub.connections += 1
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _run(name, n, call):
+    _Stub.connections = 0
+    t0 = time.perf_counter()
+    for _ in range(n):
+        call()
+    wall = time.perf_counter() - t0
+    print(f"{name:18s} requests={n} req_per_sec={round(n / wall)} "
+          f"ms_per_req={wall / n * 1e3:.2f} connections={_Stub.connections}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=500)
+    args = ap.parse_args()
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}/sell/inventory/v1/offer"
+
+    def per_call():
+        with httpx.Client(timeout=30) as s:
+            s.get(url).raise_for_status()
+
+    def pooled():
+        get_http().get(url).raise_for_status()
+
+    _run("client-per-call", args.n, per_call)
+    _run("shared-pool", args.n, pooled)
+    close_http()
+    srv.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Acquire-latency benchmark for the rate limiter backends under contention.
+
+  python scripts/bench_limiter.py --procs 4 --threads 4 --n 2000
+  python scripts/bench_limiter.py --redis redis://localhost:6379/0
+  python scripts/bench_limiter.py --waiters 200 --rate 2000
+
+The first table sizes the bucket so callers never have to wait: the numbers are
+the pure cost of one atomic acquire (lock / SQLite transaction / Redis round-trip).
+
+The contention table runs `--waiters` threads and `--waiters` asyncio tasks
+against one small, saturated bucket. With reservations the grant rate should sit
+at the configured rate, the event loop should stay responsive (loop_lag), and
+waiters should be served round-robin: with FIFO reservations nobody finishes
+early by barging, so finish_spread (last minus first waiter to finish, as a
+fraction of the run) stays small.
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rate_limit.limiter import SharedBucketLimiter, SlidingWindowLimiter  # noqa: E402
+from rate_limit.backends import backend_from_url  # noqa: E402
+
+RATE, BURST = 1e9, 1e9
+
+def _worker(url, threads, n, out):
+    backend = backend_from_url(url)
+    lim = SlidingWindowLimiter(RATE, BURST) if backend is None else None
+    lat = []
+    lock = threading.Lock()
+
+    def run():
+        local = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            if lim is not None:
+                with lim():
+                    pass
+            else:
+                backend.take("bench", RATE, BURST, 1)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            lat.extend(local)
+
+    ts = [threading.Thread(target=run) for _ in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    out.put(lat)
+
+def bench(url, procs, threads, n):
+    q = mp.get_context("fork").Queue()
+    start = time.perf_counter()
+    ps = [mp.get_context("fork").Process(target=_worker, args=(url, threads, n, q)) for _ in range(procs)]
+    for p in ps:
+        p.start()
+    lat = [x for _ in ps for x in q.get()]
+    for p in ps:
+        p.join()
+    wall = time.perf_counter() - start
+    lat.sort()
+    return {
+        "acquires": len(lat),
+        "acq_per_sec": round(len(lat) / wall),
+        "p50_us": round(statistics.median(lat) * 1e6, 1),
+        "p99_us": round(lat[int(len(lat) * 0.99) - 1] * 1e6, 1),
+    }
+
+def _contended(url, rate):
+    backend = backend_from_url(url)
+    if backend is None:
+        return SlidingWindowLimiter(rate, 1)
+    return SharedBucketLimiter(backend, f"contend-{time.time_ns()}", rate, 1)
+
+def _spread(finish, wall):
+    # 1.0 = someone finished right at the start; ~1/n_acquires = perfect round-robin
+    return round((max(finish) - min(finish)) / wall, 3)
+
+def contention_threads(url, waiters, rate, n):
+    lim = _contended(url, rate)
+    finish = [0.0] * waiters
+    gate = threading.Event()
+
+    def run(i):
+        gate.wait()
+        for _ in range(n):
+            with lim():
+                pass
+        finish[i] = time.perf_counter()
+
+    ts = [threading.Thread(target=run, args=(i,)) for i in range(waiters)]
+    for t in ts:
+        t.start()
+    start = time.perf_counter()
+    gate.set()
+    for t in ts:
+        t.join()
+    wall = time.perf_counter() - start
+    return {"acq_per_sec": round(waiters * n / wall), "finish_spread": _spread(finish, wall)}
+
+async def _contention_async(url, waiters, rate, n):
+    lim = _contended(url, rate)
+    finish = [0.0] * waiters
+    lag = [0.0]
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag[0] = max(lag[0], time.perf_counter() - t0 - 0.001)
+
+    async def run(i):
+        for _ in range(n):
+            await lim.acquire()
+        finish[i] = time.perf_counter()
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(run(i) for i in range(waiters)))
+    wall = time.perf_counter() - start
+    stop.set()
+    await tick
+    return {
+        "acq_per_sec": round(waiters * n / wall),
+        "finish_spread": _spread(finish, wall),
+        "loop_lag_ms": round(lag[0] * 1e3, 2),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, default=4)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--n", type=int, default=2000, help="acquires per thread")
+    ap.add_argument("--redis", default=os.getenv("REDIS_URL"), help="redis:// url to include")
+    ap.add_argument("--waiters", type=int, default=200, help="concurrent waiters in the contention run")
+    ap.add_argument("--rate", type=float, default=2000, help="bucket rate for the contention run")
+    ap.add_argument("--per-waiter", type=int, default=5, help="acquires per waiter in the contention run")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    # memory buckets are per process, so only threads contend there
+    cases = [("memory", "memory", 1), ("sqlite", f"sqlite:///{tmp}/bench.db", args.procs)]
+    if args.redis:
+        cases.append(("redis", args.redis, args.procs))
+    # create the table before workers race for it; don't carry the connection across fork()
+    backend_from_url(cases[1][1])._conn().close()
+    for name, url, procs in cases:
+        r = bench(url, procs, args.threads, args.n)
+        print(f"{name:7s} procs={procs} threads={args.threads} " + " ".join(f"{k}={v}" for k, v in r.items()))
+
+    print(f"\ncontention: rate={args.rate:g}/s burst=1 waiters={args.waiters} x {args.per_waiter}")
+    for name, url, _ in cases:
+        r = contention_threads(url, args.waiters, args.rate, args.per_waiter)
+        print(f"{name:7s} threads " + " ".join(f"{k}={v}" for k, v in r.items()))
+        r = asyncio.run(_contention_async(url, args.waiters, args.rate, args.per_waiter))
+        print(f"{name:7s} asyncio " + " ".join(f"{k}={v}" for k, v in r.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Node-level benchmark suite (see src/bench/suite.py).
+
+  python scripts/bench_nodes.py                       # run, compare with benchmarks/baseline.json
+  python scripts/bench_nodes.py --rows 100000 --save  # run and store as the new baseline
+  python scripts/bench_nodes.py --only validate map_schema
+  python scripts/bench_nodes.py --overhead            # per-request executor overhead, 10-row catalog
+
+Exits 1 when a bench regressed beyond --tolerance (items/sec) or --mem-tolerance
+(peak memory), so it can gate CI. Baselines are machine-specific: record one per runner.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench import suite  # noqa: E402
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", nargs="*", choices=suite.BENCHES)
+    ap.add_argument("--baseline", default="benchmarks/baseline.json")
+    ap.add_argument("--save", action="store_true", help="write the results as the baseline")
+    ap.add_argument("--out", help="also write the results here")
+    ap.add_argument("--tolerance", type=float, default=0.15)
+    ap.add_argument("--mem-tolerance", type=float, default=0.25)
+    ap.add_argument("--overhead", action="store_true", help="time per-request executor overhead instead")
+    ap.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "market-translator-bench"))
+    args = ap.parse_args()
+
+    if args.overhead:
+        res = suite.overhead(args.workdir)
+        print(f"{'mode':<24}{'us/request':>12}{'overhead us':>13}")
+        for name, us in res["us_per_request"].items():
+            extra = res["overhead_us"].get(name)
+            print(f"{name:<24}{us:>12,.1f}{'' if extra is None else f'{extra:,.1f}':>13}")
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(res, f, indent=2)
+        return
+
+    res = suite.run(args.workdir, rows=args.rows, seed=args.seed, repeat=args.repeat, only=args.only)
+    print(f"{'bench':<18}{'items/s':>14}{'peak MB':>10}")
+    for name, r in res["results"].items():
+        print(f"{name:<18}{r['items_per_sec']:>14,.0f}{r['peak_mem_mb']:>10.1f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(res, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save to create one")
+        return
+    with open(args.baseline) as f:
+        base = json.load(f)
+    if base["meta"].get("rows") != res["meta"]["rows"]:
+        print(f"note: baseline used {base['meta'].get('rows')} rows, this run {res['meta']['rows']}")
+    regressions = suite.compare(base, res, args.tolerance, args.mem_tolerance)
+    for msg in regressions:
+        print("REGRESSION", msg)
+    if regressions:
+        sys.exit(1)
+    print("no regressions")
+
+if __name__ == "__main__":
+    main()
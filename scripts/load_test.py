@@ -0,0 +1,90 @@
+"""
+End-to-end load test of /translate against local marketplace stand-ins (see src/bench/load.py).
+
+  python scripts/load_test.py --channel amazon --rows 500
+  python scripts/load_test.py --channel ebay --rows 5000 --concurrency 32 --limits my_limits.yaml
+  python scripts/load_test.py --channel ebay --error-rate 0.05 --drop-rate 0.01 --json out.json
+
+Faults come from --faults (benchmarks/standin_faults.yaml by default); the --latency/--error-rate/
+--drop-rate flags override its defaults for every operation. --limits swaps the client-side
+rate limits (RATE_LIMITS_PATH) to try other bucket settings against the same quotas.
+Storage and the PTD disk cache go to --workdir so runs leave the real ones alone.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--channel", choices=["amazon", "ebay"], default="amazon")
+    ap.add_argument("--rows", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--batch-size", type=int, default=50)
+    ap.add_argument("--upsert-mode", choices=["item", "bulk"], default="item")
+    ap.add_argument("--faults", default="benchmarks/standin_faults.yaml")
+    ap.add_argument("--latency", type=float, help="fixed service time in seconds for every operation")
+    ap.add_argument("--error-rate", type=float)
+    ap.add_argument("--drop-rate", type=float)
+    ap.add_argument("--limits", help="rate-limit config to use instead of configs/rate_limits.yaml")
+    ap.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "market-translator-load"))
+    ap.add_argument("--json", help="also write the full report here")
+    args = ap.parse_args()
+
+    # before the app is imported: module-level caches read these
+    os.makedirs(args.workdir, exist_ok=True)
+    os.environ.setdefault("STORAGE_DB", os.path.join(args.workdir, "storage.db"))
+    os.environ.setdefault("PTD_CACHE_DIR", os.path.join(args.workdir, "ptd"))
+    if args.limits:
+        os.environ["RATE_LIMITS_PATH"] = args.limits
+
+    from bench import load, standin
+
+    faults = standin.load_faults(args.faults)
+    default = faults.setdefault("default", {})
+    overrides = {"error_rate": args.error_rate, "drop_rate": args.drop_rate}
+    if args.latency is not None:
+        overrides["latency"] = {"dist": "fixed", "value": args.latency}
+    for k, v in overrides.items():
+        if v is not None:
+            default[k] = v
+            for spec in (faults.get("operations") or {}).values():
+                spec.pop(k, None)
+
+    rep = load.run(args.channel, args.workdir, rows=args.rows, seed=args.seed, faults=faults,
+                   concurrency=args.concurrency, batch_size=args.batch_size, upsert_mode=args.upsert_mode)
+
+    c = rep["counts"]
+    print(f"{rep['meta']['channel']}: {c['input_items']} items, {c['upserted']} upserted, "
+          f"{rep['rejected']} rejected, {c['errors']} errors in {rep['wall_s']:.2f}s "
+          f"-> {rep['items_per_sec']:.1f} items/s")
+    for kind, n in rep["item_errors"].items():
+        print(f"  {n:>6}  {kind}")
+    print()
+    print(f"{'operation':<34}{'calls':>7}{'p50 ms':>9}{'p99 ms':>9}{'429':>7}{'err':>7}"
+          f"{'wait s':>9}{'rate/s':>8}{'conf':>7}{'eff':>7}{'aimd':>7}")
+    for op, o in rep["operations"].items():
+        lim = o["limiter"]
+        eff = "-" if lim["efficiency"] is None else f"{lim['efficiency']:.0%}"
+        aimd = "-" if lim["adapted_per_sec"] is None else f"{lim['adapted_per_sec']:.1f}"
+        print(f"{op:<34}{o['calls']:>7}{o['p50_ms']:>9.1f}{o['p99_ms']:>9.1f}"
+              f"{o['throttled_rate']:>7.1%}{o['error_rate']:>7.1%}{lim['wait_s']:>9.2f}"
+              f"{lim['achieved_per_sec']:>8.2f}{lim['configured_per_sec'] or 0:>7g}{eff:>7}{aimd:>7}")
+    ch = rep["channel_limiter"]
+    eff = "-" if ch["efficiency"] is None else f"{ch['efficiency']:.0%}"
+    print(f"{'(channel bucket)':<34}{'':>7}{'':>9}{'':>9}{'':>7}{'':>7}{'':>9}"
+          f"{ch['achieved_per_sec']:>8.2f}{ch['configured_per_sec'] or 0:>7g}{eff:>7}{ch['adapted_per_sec'] or 0:>7.1f}")
+    print()
+    print(f"{'stand-in saw':<34}{'reqs':>7}{'p50 ms':>9}{'p99 ms':>9}{'drops':>7}  statuses")
+    for op, s in rep["server"].items():
+        print(f"{op:<34}{s['requests']:>7}{s['p50_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['drops']:>7}  {s['statuses']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rep, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,34 @@
-# Placeholder for data seeding or fixture generation
-print("Nothing to seed yet. Add your own bootstrap here.")
+"""
+Generate deterministic synthetic catalogs (see src/bench/synth.py).
+
+  python scripts/seed_samples.py --rows 100000 --out data/synth/catalog_100k.csv
+  python scripts/seed_samples.py --rows 1000000 --out data/synth/catalog_1m.jsonl --invalid-rate 0.02
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench import synth  # noqa: E402
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1000)
+    ap.add_argument("--out", default="data/synth/catalog_1k.csv", help=".csv or .jsonl (SP-API listings items)")
+    ap.add_argument("--format", choices=["csv", "jsonl"], default=None, help="default: from the extension")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--invalid-rate", type=float, default=0.05)
+    ap.add_argument("--dirty-rate", type=float, default=0.1, help="share of parseable-but-messy prices")
+    args = ap.parse_args()
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    t0 = time.perf_counter()
+    n = synth.generate(args.out, args.rows, fmt=args.format, seed=args.seed,
+                       invalid_rate=args.invalid_rate, dirty_rate=args.dirty_rate)
+    dt = time.perf_counter() - t0
+    print(f"wrote {n} rows to {args.out} ({os.path.getsize(args.out) / 2**20:.1f} MB, {n / dt:,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .routers import translate, health, metrics, review, ebay
+from channels.base import close_clients
+from channels.tokens import stop_renewals
+from pipeline.graph import get_graph
+from pipeline.jobs import shutdown_runner
+from utils.metrics import flush as flush_metrics, start_flusher
+from .routers import translate, health, metrics, review, ebay, jobs, profiles
 
-app = FastAPI(title="Marketplace Schema Translator + Rate-Limit Agent")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # each worker snapshots its metrics to METRICS_DIR for /metrics to merge
+    start_flusher()
+    # compile the default graph before the first request instead of during it
+    get_graph()
+    yield
+    # stop accepting job work; running jobs stop after their current chunk
+    shutdown_runner()
+    # close pooled keep-alive connections held by the channel clients
+    close_clients()
+    stop_renewals()
+    flush_metrics()
+
+app = FastAPI(title="Marketplace Schema Translator + Rate-Limit Agent", lifespan=lifespan)
 
 app.include_router(health.router, prefix="/health", tags=["health"])
 app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 app.include_router(translate.router, prefix="", tags=["translate"])
 app.include_router(review.router, tags=["review"])
 app.include_router(ebay.router, tags=["ebay"])
+app.include_router(jobs.router, tags=["jobs"])
+app.include_router(profiles.router, tags=["profiles"])
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from pipeline.jobs import QueueFull, get_runner
+from storage import db
+from .translate import TranslateRequest, check_extra
+
+router = APIRouter()
+
+@router.post("/jobs/translate/{channel}", status_code=202)
+def submit_translate(channel: str, req: TranslateRequest, dry_run: bool = Query(True)):
+    check_extra(req.extra)
+    params = {"catalog_path": req.catalog_path, "batch_size": req.batch_size, "dry_run": dry_run, "extra": req.extra or {}}
+    try:
+        job_id = get_runner().submit(channel, params)
+    except QueueFull as ex:
+        raise HTTPException(status_code=429, detail=str(ex), headers={"Retry-After": "30"})
+    return {"job_id": job_id, "status": "queued"}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = db.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+@router.get("/jobs")
+def list_jobs(status: Optional[str] = Query(None), limit: int = Query(50, ge=1, le=1000)):
+    if status and status not in db.JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(db.JOB_STATUSES)}")
+    return {"jobs": db.list_jobs(status=status, limit=limit)}
+
+@router.post("/jobs/{job_id}/cancel", status_code=202)
+def cancel_job(job_id: str):
+    if db.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    if not db.request_cancel(job_id):
+        raise HTTPException(status_code=409, detail="job already finished")
+    return {"job_id": job_id, "cancel": True}
@@ -1,8 +1,37 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from rate_limit.limiter import effective_rates
+from channels.tokens import token_metrics
+from utils import metrics as m
 
 router = APIRouter()
 
-# Placeholder. In production, expose Prometheus metrics or summaries from storage.
-@router.get("/")
-def metrics():
-    return {"accepted": 0, "rejected": 0, "throughput_per_min": 0}
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _wants_json(accept: str) -> bool:
+    # Prometheus asks for openmetrics/text; only clients that ask for JSON alone get the
+    # summary /metrics used to return
+    types = {part.split(";", 1)[0].strip() for part in accept.lower().split(",")}
+    return "application/json" in types and not types & {"text/plain", "application/openmetrics-text"}
+
+# Prometheus scrape target, merged over every worker sharing METRICS_DIR
+@router.get("", response_class=PlainTextResponse)
+@router.get("/", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus(request: Request):
+    if _wants_json(request.headers.get("accept", "")):
+        return JSONResponse(summary())
+    return PlainTextResponse(m.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@router.get("/summary")
+def summary():
+    accepted = m.total("pipeline_items_total", stage="upserted")
+    node = m.collect()["pipeline_node_seconds"].get(("throttle_and_upsert",))
+    upsert_seconds = node[-1] if node else 0.0
+    return {
+        "accepted": int(accepted),
+        "rejected": int(m.total("pipeline_items_total", stage="rejected")),
+        # listings accepted per minute spent in the upsert stage
+        "throughput_per_min": round(accepted / upsert_seconds * 60, 1) if upsert_seconds else 0,
+        "rate_limits": effective_rates(),
+        "token_refreshes": token_metrics(),
+    }
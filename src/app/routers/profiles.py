@@ -0,0 +1,19 @@
+import re
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from utils.profiling import profile_dir
+
+router = APIRouter()
+
+_ID = re.compile(r"^[0-9a-f]{32}$")
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, format: str = Query("json", pattern="^(json|folded)$")):
+    """Profile artifact of a run: the JSON breakdown, or collapsed stacks (sampling mode) for flamegraphs."""
+    if not _ID.match(profile_id):
+        raise HTTPException(status_code=404, detail="profile not found")
+    path = profile_dir() / f"{profile_id}.{format}"
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="profile not found")
+    media = "application/json" if format == "json" else "text/plain"
+    return FileResponse(path, media_type=media, filename=path.name)
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
-from pipeline.graph import run_pipeline
+from typing import Optional, Dict, Any
+from pipeline.rejects import get_reject_set
+from .translate import check_extra
 
 router = APIRouter()
 
@@ -10,21 +11,6 @@ class ReviewRequest(BaseModel):
     batch_size: int = 50
     extra: Optional[Dict[str, Any]] = None
 
-def _match_contains(rec: Dict[str, Any], needle: str) -> bool:
-    if not needle:
-        return True
-    needle = needle.lower()
-    # search in error codes/messages and in payload text
-    errors_text = " ".join(rec.get("errors", []))
-    payload_text = " ".join(f"{k}:{v}" for k, v in (rec.get("channel_payload") or {}).items())
-    hay = f"{errors_text} {payload_text}".lower()
-    return needle in hay
-
-def _match_id_like(rec: Dict[str, Any], id_like: Optional[str]) -> bool:
-    if not id_like:
-        return True
-    return id_like.lower() in (rec.get("id") or "").lower()
-
 @router.post("/review/{channel}")
 def review(
     channel: str,
@@ -35,40 +21,24 @@ def review(
     id_like: Optional[str] = Query(None, description="Substring to search in item id"),
     sort_by: Optional[str] = Query(None, pattern="^(id|errors)$", description="Optional sort key"),
     sort_dir: str = Query("asc", pattern="^(asc|desc)$"),
+    error_code: Optional[str] = Query(None, description="Only rejects with this error code (see facets)"),
+    after: Optional[int] = Query(None, ge=0, description="next_cursor of the previous page (keyset pagination)"),
 ):
-    # always dry-run for review
-    result = run_pipeline(
-        channel=channel,
-        catalog_path=req.catalog_path,
-        batch_size=req.batch_size,
-        dry_run=True,
-        extra=req.extra or {},
-    )
-    rejects: List[Dict[str, Any]] = result.get("rejects", [])
-
-    # filter
-    filtered = [
-        r for r in rejects
-        if _match_contains(r, contains) and _match_id_like(r, id_like)
-    ]
-
-    # sort
-    if sort_by:
-        reverse = sort_dir == "desc"
-        if sort_by == "id":
-            filtered.sort(key=lambda r: (r.get("id") or ""), reverse=reverse)
-        elif sort_by == "errors":
-            # sort by first error string
-            filtered.sort(key=lambda r: " ".join(r.get("errors", [])), reverse=reverse)
-
-    total = len(filtered)
-    page = filtered[offset : offset + limit]
+    check_extra(req.extra)
+    # rejects are materialized once per (channel, catalog content, mapping version)
+    try:
+        rejects = get_reject_set(channel, req.catalog_path, req.extra)
+    except FileNotFoundError as ex:
+        raise HTTPException(status_code=404, detail=str(ex))
+    page = rejects.page(contains, id_like, sort_by, sort_dir, offset, limit, error_code=error_code, after=after)
 
     return {
         "channel": channel,
-        "total_rejects": len(rejects),
-        "total_filtered": total,
+        "total_rejects": len(rejects.rejects),
+        "total_filtered": page["total"],
         "limit": limit,
         "offset": offset,
-        "items": page,
+        "next_cursor": page["next_cursor"],
+        "facets": rejects.facets(contains, id_like),
+        "items": page["items"],
     }
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
-from pipeline.graph import run_pipeline
+from pipeline import parallel
+from pipeline.graph import resolve_chunk_size, run_pipeline
+from pipeline.nodes.upsert import resolve_concurrency
 
 router = APIRouter()
 
@@ -10,7 +12,25 @@ class TranslateRequest(BaseModel):
     batch_size: int = 50
     extra: Optional[Dict[str, Any]] = None
 
+def check_extra(extra: Optional[Dict[str, Any]]) -> None:
+    """400 for a malformed extra["workers"] / ["concurrency"] / ["chunk_size"] instead of a failed run."""
+    try:
+        parallel.resolve_workers(extra)
+        resolve_concurrency(extra)
+        resolve_chunk_size(extra)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+
 @router.post("/translate/{channel}")
-def translate(channel: str, req: TranslateRequest, dry_run: bool = Query(True)):
-    result = run_pipeline(channel=channel, catalog_path=req.catalog_path, batch_size=req.batch_size, dry_run=dry_run, extra=req.extra or {})
+def translate(
+    channel: str,
+    req: TranslateRequest,
+    dry_run: bool = Query(True),
+    profile: Optional[str] = Query(None, pattern="^(1|true|timing|sample)$", description="Profile this run"),
+):
+    extra = dict(req.extra or {})
+    check_extra(extra)
+    if profile:
+        extra["profile"] = profile
+    result = run_pipeline(channel=channel, catalog_path=req.catalog_path, batch_size=req.batch_size, dry_run=dry_run, extra=extra)
     return result
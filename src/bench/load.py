@@ -0,0 +1,175 @@
+"""
+End-to-end load runs: POST /translate against the marketplace stand-ins (bench.standin).
+
+run() generates a synthetic catalog (SP-API JSONL for amazon, CSV for ebay), starts a
+stand-in with the given faults, points the channel client at it and drives
+/translate/{channel}?dry_run=false through the app in-process. It reports from what the
+run added to the metrics registry:
+
+  throughput  items upserted per second of wall time, item-level error kinds
+  operations  client-side calls, p50/p99 latency (histogram estimate, incl. retries),
+              status mix, 429 and error (5xx / dropped) rates
+  limiter     per operation bucket and the channel-wide one: tokens, wait time (summed
+              over concurrent callers), achieved vs configured rate, the AIMD-adapted rate
+  server      what the stand-in saw (exact service times, 429s, drops)
+"""
+from __future__ import annotations
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bench import synth
+from bench.standin import StandIn, channel_env
+from utils import metrics
+
+@contextmanager
+def _env(values: Dict[str, str]) -> Iterator[None]:
+    saved = {k: os.environ.get(k) for k in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+def _delta(before: Dict[str, Dict[Tuple[str, ...], Any]], after: Dict[str, Dict[Tuple[str, ...], Any]],
+           name: str) -> Dict[Tuple[str, ...], Any]:
+    """What a counter/histogram gained between two collect() calls."""
+    out = {}
+    old = before.get(name, {})
+    for key, v in after.get(name, {}).items():
+        prev = old.get(key)
+        if isinstance(v, list):
+            v = v if prev is None else [a - b for a, b in zip(v, prev)]
+            if any(v[:-1]):
+                out[key] = v
+        elif v - (prev or 0):
+            out[key] = v - (prev or 0)
+    return out
+
+def quantile(hist: metrics.Histogram, counts: List[float], q: float) -> float:
+    """Estimate a quantile from per-bucket counts, interpolating inside the bucket (like histogram_quantile)."""
+    total = sum(counts[:-1])
+    if not total:
+        return 0.0
+    rank = q * total
+    cum, lower = 0.0, 0.0
+    for le, n in zip(hist.buckets, counts):
+        if n and cum + n >= rank:
+            return lower + (le - lower) * (rank - cum) / n
+        cum += n
+        lower = le
+    return hist.buckets[-1]  # in the +Inf bucket
+
+def _operations(channel: str, before, after, wall: float) -> Dict[str, Dict[str, Any]]:
+    from rate_limit import limiter
+
+    seconds = _delta(before, after, metrics.HTTP_SECONDS.name)
+    responses = _delta(before, after, metrics.HTTP_RESPONSES.name)
+    waits = _delta(before, after, metrics.LIMITER_WAIT.name)
+    tokens = _delta(before, after, metrics.LIMITER_TOKENS.name)
+    cfg = limiter._load_config().get(channel, limiter.DEFAULT_LIMITS)
+    op_cfg = cfg.get("operations") or {}
+    rates = limiter.effective_rates()
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for (ch, op), counts in sorted(seconds.items()):
+        if ch != channel:
+            continue
+        statuses = {status: int(n) for (c, o, status), n in responses.items() if c == ch and o == op}
+        calls = sum(statuses.values())
+        throttled = statuses.get("429", 0)
+        failed = sum(n for s, n in statuses.items() if s == "error" or s.startswith("5"))
+        configured = (op_cfg.get(op) or cfg).get("rate_per_sec")
+        wait = waits.get((ch, op))
+        achieved = calls / wall if wall else 0.0
+        live = rates.get(f"{ch}/{op}") or rates.get(ch) or {}
+        out[op] = {
+            "calls": calls,
+            "p50_ms": round(quantile(metrics.HTTP_SECONDS, counts, 0.5) * 1e3, 1),
+            "p99_ms": round(quantile(metrics.HTTP_SECONDS, counts, 0.99) * 1e3, 1),
+            "statuses": dict(sorted(statuses.items())),
+            "throttled_rate": round(throttled / calls, 4) if calls else 0.0,
+            "error_rate": round(failed / calls, 4) if calls else 0.0,
+            "limiter": {
+                "tokens": tokens.get((ch, op), 0.0),
+                "wait_s": round(wait[-1], 3) if wait else 0.0,
+                "achieved_per_sec": round(achieved, 2),
+                "configured_per_sec": configured,
+                # share of the configured rate actually used; <1 with waits means throttling/backoff held us back
+                "efficiency": round(achieved / configured, 3) if configured else None,
+                "adapted_per_sec": live.get("rate_per_sec"),
+            },
+        }
+    return out
+
+def _channel_limiter(channel: str, before, after, wall: float) -> Dict[str, Any]:
+    """The channel-wide bucket every call is also charged against (often the real ceiling)."""
+    from rate_limit import limiter
+
+    tokens = sum(v for (ch, _), v in _delta(before, after, metrics.LIMITER_TOKENS.name).items() if ch == channel)
+    configured = limiter._load_config().get(channel, limiter.DEFAULT_LIMITS).get("rate_per_sec")
+    achieved = tokens / wall if wall else 0.0
+    return {
+        "tokens": tokens,
+        "achieved_per_sec": round(achieved, 2),
+        "configured_per_sec": configured,
+        "efficiency": round(achieved / configured, 3) if configured else None,
+        "adapted_per_sec": (limiter.effective_rates().get(channel) or {}).get("rate_per_sec"),
+    }
+
+def _error_kinds(errors: List[str]) -> Dict[str, int]:
+    """'SKU-1: upsert:error:ConnectError' -> 'upsert:error:ConnectError'; validation details dropped."""
+    kinds: Dict[str, int] = {}
+    for e in errors:
+        kind = e.split(": ", 1)[-1]
+        if kind.startswith("channel_validate:"):
+            kind = "channel_validate"
+        kinds[kind] = kinds.get(kind, 0) + 1
+    return dict(sorted(kinds.items(), key=lambda kv: -kv[1]))
+
+def run(channel: str, workdir: str, rows: int = 2000, seed: int = 42, faults: Optional[Dict[str, Any]] = None,
+        concurrency: int = 8, batch_size: int = 50, upsert_mode: str = "item",
+        extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    channel = channel.lower()
+    os.makedirs(workdir, exist_ok=True)
+    ext = "jsonl" if channel == "amazon" else "csv"
+    catalog = os.path.join(workdir, f"load_{channel}_{rows}_{seed}.{ext}")
+    if not os.path.exists(catalog):
+        synth.generate(catalog, rows, seed=seed)
+
+    body_extra = {"force_resync": True, "concurrency": concurrency, "upsert_mode": upsert_mode, **(extra or {})}
+    if channel == "amazon":
+        body_extra.setdefault("input_format", "spapi-jsonl")
+
+    # the app's lifespan closes the pooled connections to the stand-in on the way out
+    with StandIn(faults, seed=seed) as server, _env(channel_env(server.url, channel)), TestClient(app) as client:
+        before = metrics.collect()
+        t0 = time.perf_counter()
+        r = client.post(f"/translate/{channel}", params={"dry_run": "false"},
+                        json={"catalog_path": catalog, "batch_size": batch_size, "extra": body_extra})
+        wall = time.perf_counter() - t0
+        after = metrics.collect()
+        server_stats = server.stats()
+    r.raise_for_status()
+    result = r.json()
+    counts = result["counts"]
+    return {
+        "meta": {"channel": channel, "rows": rows, "seed": seed, "concurrency": concurrency,
+                 "upsert_mode": upsert_mode, "batch_size": batch_size},
+        "wall_s": round(wall, 3),
+        "items_per_sec": round(counts["upserted"] / wall, 1) if wall else 0.0,
+        "counts": counts,
+        "rejected": result.get("rejected", len(result.get("rejects") or [])),
+        "item_errors": _error_kinds(result.get("errors") or []),
+        "operations": _operations(channel, before, after, wall),
+        "channel_limiter": _channel_limiter(channel, before, after, wall),
+        "server": server_stats,
+    }
@@ -0,0 +1,322 @@
+"""
+Local stand-ins for the marketplace endpoints the channel clients call, with fault injection.
+
+One threaded HTTP/1.1 (keep-alive) server answers both channels:
+
+  amazon  POST /auth/o2/token (LWA), GET /definitions/2020-09-01/productTypes/{pt},
+          PUT /listings/2021-08-01/items/{seller}/{sku}
+  ebay    POST /identity/v1/oauth2/token, GET .../get_item_aspects_for_category,
+          PUT inventory_item/{sku}, POST offer, POST offer/{id}/publish, the bulk_* calls,
+          GET {payment,fulfillment,return}_policy
+
+Faults are configured per operation (the limiter's operation names), shaped like
+configs/rate_limits.yaml; see benchmarks/standin_faults.yaml:
+
+  default / operations.<name>:
+    latency     {dist: fixed, value} | {dist: uniform, low, high}
+                | {dist: lognormal, median, sigma} | {dist: exponential, mean}   (seconds)
+    quota       {rate_per_sec, burst}: server-side bucket; over quota -> 429 + Retry-After
+                (Amazon operations also send x-amzn-RateLimit-Limit, like SP-API)
+    error_rate  share of requests answered with error_status (500, or a list to pick from)
+    drop_rate   share of connections closed without a response
+
+Everything random comes from one seeded generator, so a run's fault pattern is repeatable
+for the same request order.
+"""
+from __future__ import annotations
+import json
+import math
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+
+import yaml
+
+from bench.synth import PTD_SCHEMA
+
+AMAZON_OPS = {"lwaToken", "getDefinitionsProductType", "putListingsItem"}
+
+# (method, path regex, operation); first match wins
+_ROUTES: List[Tuple[str, Pattern[str], str]] = [(m, re.compile(p), op) for m, p, op in [
+    ("POST", r"^/auth/o2/token$", "lwaToken"),
+    ("GET", r"^/definitions/2020-09-01/productTypes/(?P<pt>[^/]+)$", "getDefinitionsProductType"),
+    ("PUT", r"^/listings/2021-08-01/items/[^/]+/(?P<sku>[^/]+)$", "putListingsItem"),
+    ("POST", r"^/identity/v1/oauth2/token$", "oauthToken"),
+    ("GET", r"^/sell/metadata/v1/marketplace/[^/]+/get_item_aspects_for_category$", "getItemAspectsForCategory"),
+    ("PUT", r"^/sell/inventory/v1/inventory_item/(?P<sku>[^/]+)$", "createOrReplaceInventoryItem"),
+    ("POST", r"^/sell/inventory/v1/offer$", "createOffer"),
+    ("POST", r"^/sell/inventory/v1/offer/(?P<offer>[^/]+)/publish$", "publishOffer"),
+    ("POST", r"^/sell/inventory/v1/bulk_create_or_replace_inventory_item$", "bulkCreateOrReplaceInventoryItem"),
+    ("POST", r"^/sell/inventory/v1/bulk_create_offer$", "bulkCreateOffer"),
+    ("POST", r"^/sell/inventory/v1/bulk_publish_offer$", "bulkPublishOffer"),
+    ("GET", r"^/sell/account/v1/payment_policy$", "getPaymentPolicies"),
+    ("GET", r"^/sell/account/v1/fulfillment_policy$", "getFulfillmentPolicies"),
+    ("GET", r"^/sell/account/v1/return_policy$", "getReturnPolicies"),
+]]
+
+_PTD_ETAG = '"standin-ptd-1"'
+
+def load_faults(path: Optional[str]) -> Dict[str, Any]:
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+def _latency_sampler(spec: Optional[Dict[str, Any]]) -> Callable[[random.Random], float]:
+    spec = spec or {}
+    dist = spec.get("dist", "fixed")
+    if dist == "fixed":
+        v = float(spec.get("value", 0.0))
+        return lambda rnd: v
+    if dist == "uniform":
+        lo, hi = float(spec.get("low", 0.0)), float(spec.get("high", 0.0))
+        return lambda rnd: rnd.uniform(lo, hi)
+    if dist == "lognormal":
+        mu, sigma = math.log(float(spec["median"])), float(spec.get("sigma", 0.5))
+        return lambda rnd: rnd.lognormvariate(mu, sigma)
+    if dist == "exponential":
+        rate = 1.0 / float(spec["mean"])
+        return lambda rnd: rnd.expovariate(rate)
+    raise ValueError(f"unknown latency dist: {dist}")
+
+class _Quota:
+    """Server-side token bucket; take() returns 0 when admitted, else seconds until a token."""
+    def __init__(self, rate_per_sec: float, burst: float):
+        self.rate = float(rate_per_sec)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+class _OpFaults:
+    __slots__ = ("latency", "quota", "error_rate", "error_status", "drop_rate")
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.latency = _latency_sampler(spec.get("latency"))
+        q = spec.get("quota")
+        self.quota = _Quota(q["rate_per_sec"], q.get("burst", 1)) if q else None
+        self.error_rate = float(spec.get("error_rate", 0.0))
+        status = spec.get("error_status", 500)
+        self.error_status = [int(s) for s in status] if isinstance(status, list) else [int(status)]
+        self.drop_rate = float(spec.get("drop_rate", 0.0))
+
+class _OpStats:
+    __slots__ = ("requests", "statuses", "drops", "latencies")
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses: Dict[int, int] = {}
+        self.drops = 0
+        self.latencies: List[float] = []
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._serve("GET")
+
+    def do_PUT(self):
+        self._serve("PUT")
+
+    def do_POST(self):
+        self._serve("POST")
+
+    def _serve(self, method: str) -> None:
+        t0 = time.perf_counter()
+        srv: StandIn = self.server.standin
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        path, _, _ = self.path.partition("?")
+        for m, rx, op in _ROUTES:
+            match = rx.match(path) if m == method else None
+            if match:
+                break
+        else:
+            self._reply(404, {"errors": [{"message": f"no stand-in for {method} {path}"}]})
+            return
+
+        faults = srv.faults(op)
+        headers: Dict[str, str] = {}
+        if op in AMAZON_OPS and faults.quota:
+            headers["x-amzn-RateLimit-Limit"] = str(faults.quota.rate)
+        wait = faults.quota.take() if faults.quota else 0.0
+        if wait:
+            # throttled calls are answered right away, before any service time
+            headers["Retry-After"] = f"{wait:.3f}"
+            self._reply(429, {"errors": [{"code": "QuotaExceeded", "message": "You exceeded your quota"}]}, headers)
+            srv.record(op, 429, time.perf_counter() - t0)
+            return
+
+        with srv.lock:
+            delay = faults.latency(srv.rnd)
+            roll = srv.rnd.random()
+            status = srv.rnd.choice(faults.error_status)
+        time.sleep(delay)
+        if roll < faults.drop_rate:
+            srv.record(op, None, time.perf_counter() - t0)
+            self.close_connection = True
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            return
+        elif roll < faults.drop_rate + faults.error_rate:
+            self._reply(status, {"errors": [{"message": "injected server error"}]}, headers)
+        else:
+            self._ok(op, match, body, headers)
+        srv.record(op, self._status, time.perf_counter() - t0)
+
+    def _ok(self, op: str, match: "re.Match[str]", body: bytes, headers: Dict[str, str]) -> None:
+        srv: StandIn = self.server.standin
+        if op in ("lwaToken", "oauthToken"):
+            self._reply(200, {"access_token": f"standin-{op}-{srv.next_id()}", "token_type": "bearer", "expires_in": 3600})
+        elif op == "getDefinitionsProductType":
+            if self.headers.get("if-none-match") == _PTD_ETAG:
+                self._reply(304, None, {**headers, "ETag": _PTD_ETAG})
+            else:
+                self._reply(200, {"productType": match["pt"], "schema": PTD_SCHEMA}, {**headers, "ETag": _PTD_ETAG})
+        elif op == "putListingsItem":
+            self._reply(200, {"sku": match["sku"], "status": "ACCEPTED", "submissionId": str(srv.next_id()), "issues": []}, headers)
+        elif op == "getItemAspectsForCategory":
+            self._reply(200, {"aspects": [
+                {"localizedAspectName": "Brand", "aspectConstraint": {"aspectRequired": False}},
+                {"localizedAspectName": "Color", "aspectConstraint": {"aspectRequired": False}},
+            ]})
+        elif op == "createOrReplaceInventoryItem":
+            self._reply(204, None)
+        elif op == "createOffer":
+            self._reply(201, {"offerId": str(srv.next_id())})
+        elif op == "publishOffer":
+            self._reply(200, {"listingId": str(srv.next_id())})
+        elif op.startswith("bulk"):
+            reqs = (json.loads(body or b"{}") or {}).get("requests") or []
+            out = []
+            for r in reqs:
+                resp = {"statusCode": 200, "sku": r.get("sku")}
+                if op != "bulkCreateOrReplaceInventoryItem":
+                    resp["offerId"] = r.get("offerId") or str(srv.next_id())
+                if op == "bulkPublishOffer":
+                    resp["listingId"] = str(srv.next_id())
+                out.append(resp)
+            self._reply(200, {"responses": out})
+        else:  # business policies
+            kind = {"getPaymentPolicies": "payment", "getFulfillmentPolicies": "fulfillment", "getReturnPolicies": "return"}[op]
+            self._reply(200, {f"{kind}Policies": [{f"{kind}PolicyId": f"{kind.upper()}-1"}]})
+
+    def _reply(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        self._status = status
+        data = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+class StandIn:
+    """`with StandIn(faults) as s:` serves on s.url until the block exits."""
+    def __init__(self, faults: Optional[Dict[str, Any]] = None, seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        faults = faults or {}
+        default = faults.get("default") or {}
+        self._default = _OpFaults(default)
+        # per-operation specs inherit the default's keys
+        self._ops = {op: _OpFaults({**default, **(spec or {})}) for op, spec in (faults.get("operations") or {}).items()}
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self._ids = 0
+        self._stats: Dict[str, _OpStats] = {}
+        self._server = _Server((host, port), _Handler)
+        self._server.standin = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def faults(self, op: str) -> _OpFaults:
+        return self._ops.get(op, self._default)
+
+    def next_id(self) -> int:
+        with self.lock:
+            self._ids += 1
+            return self._ids
+
+    def record(self, op: str, status: Optional[int], seconds: float) -> None:
+        with self.lock:
+            s = self._stats.get(op)
+            if s is None:
+                s = self._stats[op] = _OpStats()
+            s.requests += 1
+            if status is None:
+                s.drops += 1
+            else:
+                s.statuses[status] = s.statuses.get(status, 0) + 1
+            s.latencies.append(seconds)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """operation -> {requests, statuses, drops, p50_ms, p99_ms} as the server saw them."""
+        with self.lock:
+            snap = {op: (s.requests, dict(s.statuses), s.drops, sorted(s.latencies)) for op, s in self._stats.items()}
+        return {
+            op: {"requests": n, "statuses": statuses, "drops": drops,
+                 "p50_ms": round(_pct(lat, 0.5) * 1e3, 2), "p99_ms": round(_pct(lat, 0.99) * 1e3, 2)}
+            for op, (n, statuses, drops, lat) in sorted(snap.items())
+        }
+
+    def start(self) -> "StandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+def _pct(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def channel_env(url: str, channel: str) -> Dict[str, str]:
+    """Environment that points a channel's client (and its token refreshes) at the stand-in."""
+    if channel == "amazon":
+        return {
+            "LWA_CLIENT_ID": "standin", "LWA_CLIENT_SECRET": "standin", "LWA_REFRESH_TOKEN": "standin",
+            "LWA_TOKEN_URL": f"{url}/auth/o2/token", "SPAPI_HOST": url,
+            "SELLER_ID": "STANDIN", "MARKETPLACE_IDS": "ATVPDKIKX0DER",
+        }
+    return {
+        "EBAY_BASE_URL": url, "EBAY_CLIENT_ID": "standin", "EBAY_CLIENT_SECRET": "standin",
+        "EBAY_REFRESH_TOKEN": "standin", "EBAY_MARKETPLACE_ID": "EBAY_US", "EBAY_DEFAULT_CATEGORY_ID": "9355",
+    }
@@ -0,0 +1,220 @@
+"""
+Node-level benchmarks over a synthetic catalog, with JSON baselines.
+
+Each bench reports items/sec (best of `repeat` timed runs) and the peak traced memory
+of one extra run under tracemalloc, so tracing overhead never skews the timing.
+`compare()` flags benches whose throughput fell or whose peak memory grew by more than
+the tolerance against a stored baseline.
+
+`overhead()` times whole requests on a tiny catalog instead: what each executor adds on
+top of the node work itself, in microseconds per request.
+"""
+from __future__ import annotations
+import functools
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bench import synth
+from channels.base import get_client
+from pipeline import columnar, graph
+from pipeline.graph import _load_items
+from pipeline.state import PipelineState
+from pipeline.nodes.map_schema import get_plan, map_schema_node
+from pipeline.nodes.validate import validate_node
+from pipeline.nodes.plan_batches import plan_batches_node
+from dspylocal.normalizer import normalize_fields
+from models import ptd_validator
+
+# "columnar" is read + map + validate in one: compare with load_items + map_schema + validate
+BENCHES = ["load_items", "map_schema", "normalize_fields", "validate", "plan_batches", "ptd_validate", "columnar"]
+
+# PTD schemas are served from the memory tier
+PTD_HOST = "https://bench.invalid"
+PTD_MARKETPLACES = ["ATVPDKIKX0DER"]
+
+def _seed_ptd_cache(product_types: List[str]) -> None:
+    for pt in product_types:
+        key = ptd_validator._cache_key(PTD_HOST, PTD_MARKETPLACES, pt)
+        ptd_validator._CACHE.put(key, {"schema": synth.PTD_SCHEMA, "etag": None, "exp": time.time() + 86400})
+
+def _setup(csv_path: str, jsonl_path: str) -> Dict[str, Callable[[], Tuple[Callable[[], Any], int]]]:
+    """bench name -> setup() returning (fn to time, items it processes). Setup is not timed."""
+    items = _load_items(csv_path)
+    n = len(items)
+
+    def state(**kw) -> PipelineState:
+        return PipelineState(channel="amazon", catalog_path=csv_path, extra={}, batch_size=50, **kw)
+
+    def load_items():
+        return (lambda: _load_items(csv_path)), n
+
+    def map_schema():
+        return (lambda: map_schema_node(state(items=items))), n
+
+    def normalize():
+        plan = get_plan("amazon")
+        pairs = [(it, plan(it)) for it in items]
+        return (lambda: [normalize_fields(it, p) for it, p in pairs]), n
+
+    mapped = map_schema_node(state(items=items)).mapped
+
+    def validate():
+        return (lambda: validate_node(state(mapped=mapped))), n
+
+    valid = validate_node(state(mapped=mapped)).valid
+
+    def plan_batches():
+        return (lambda: plan_batches_node(state(valid=valid))), len(valid)
+
+    def ptd():
+        with open(jsonl_path, encoding="utf-8") as f:
+            docs = [json.loads(line) for line in f]
+        _seed_ptd_cache(sorted({d["productType"] for d in docs}))
+
+        def run():
+            for d in docs:
+                ptd_validator.validate_attributes_with_ptd(PTD_HOST, PTD_MARKETPLACES, "token", d["productType"], d["attributes"])
+        return run, len(docs)
+
+    def columnar_engine():
+        return (lambda: [columnar.translate_frame(df, "amazon") for df in columnar.iter_frames(csv_path)]), n
+
+    return {
+        "load_items": load_items, "map_schema": map_schema, "normalize_fields": normalize,
+        "validate": validate, "plan_batches": plan_batches, "ptd_validate": ptd, "columnar": columnar_engine,
+    }
+
+def _measure(fn: Callable[[], Any], n: int, repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "items": n,
+        "seconds": round(best, 6),
+        "items_per_sec": round(n / best, 1) if best > 0 else 0.0,
+        "peak_mem_mb": round(peak / 2**20, 3),
+    }
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run(workdir: str, rows: int = 20000, seed: int = 42, repeat: int = 3, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    os.makedirs(workdir, exist_ok=True)
+    csv_path = os.path.join(workdir, f"bench_{rows}_{seed}.csv")
+    jsonl_path = os.path.join(workdir, f"bench_{rows}_{seed}.jsonl")
+    if not os.path.exists(csv_path):
+        synth.generate(csv_path, rows, seed=seed)
+    if not os.path.exists(jsonl_path):
+        synth.generate(jsonl_path, rows, seed=seed)
+
+    setups = _setup(csv_path, jsonl_path)
+    results = {}
+    for name in only or BENCHES:
+        fn, n = setups[name]()
+        results[name] = _measure(fn, n, repeat)
+    return {
+        "meta": {
+            "rows": rows, "seed": seed, "repeat": repeat, "git": _git_rev(),
+            "python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.15,
+            mem_tolerance: float = 0.25) -> List[str]:
+    """
+    Regression messages (empty = OK). A bench with no baseline entry is reported too, so a
+    new bench can't pass unchecked; baseline entries this run didn't execute are skipped.
+    """
+    out = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            out.append(f"{name}: no baseline entry; record one with --save")
+            continue
+        if base["items_per_sec"] and cur["items_per_sec"] < base["items_per_sec"] * (1 - tolerance):
+            drop = 1 - cur["items_per_sec"] / base["items_per_sec"]
+            out.append(f"{name}: {cur['items_per_sec']:.0f} items/s vs {base['items_per_sec']:.0f} baseline (-{drop:.0%})")
+        # ignore sub-MB noise
+        if cur["peak_mem_mb"] > max(base["peak_mem_mb"] * (1 + mem_tolerance), base["peak_mem_mb"] + 1):
+            out.append(f"{name}: peak {cur['peak_mem_mb']:.1f} MB vs {base['peak_mem_mb']:.1f} MB baseline")
+    return out
+
+OVERHEAD_MODES = ["nodes", "inline", "langgraph", "langgraph_uncached"]
+
+def overhead(workdir: str, rows: int = 10, seed: int = 42, number: int = 200, repeat: int = 3) -> Dict[str, Any]:
+    """
+    Per-request cost (best of `repeat`, mean of `number` calls) of a `rows`-item amazon run
+    with dry_run=False against the credential-less stub client:
+
+      nodes               the five node functions called back to back (the floor)
+      inline / langgraph  one chunk through the cached executor
+      langgraph_uncached  compile + invoke, what every request paid before graphs were cached
+      run_pipeline_*      the whole call, catalog read and result assembly included
+
+    `overhead_us` is each executor's time minus `nodes`.
+    """
+    if getattr(get_client("amazon"), "name", "base") != "base":
+        raise RuntimeError("amazon credentials are set; overhead() would push listings")
+    os.makedirs(workdir, exist_ok=True)
+    csv_path = os.path.join(workdir, f"overhead_{rows}_{seed}.csv")
+    if not os.path.exists(csv_path):
+        synth.generate(csv_path, rows, seed=seed)
+    items = _load_items(csv_path)
+    extra = {"force_resync": True}
+
+    def state() -> PipelineState:
+        return PipelineState(channel="amazon", catalog_path=csv_path, dry_run=False, extra=extra, items=list(items))
+
+    def nodes():
+        s = state()
+        for _, fn in graph.NODES:
+            s = fn(s)
+
+    inline, langgraph = graph.get_graph(executor="inline"), graph.get_graph()
+    calls: Dict[str, Callable[[], Any]] = {
+        "nodes": nodes,
+        "inline": lambda: inline.invoke(state()),
+        "langgraph": lambda: langgraph.invoke(state()),
+        "langgraph_uncached": lambda: graph.build_graph().invoke(state()),
+    }
+    for executor in ("inline", "langgraph"):
+        calls[f"run_pipeline_{executor}"] = functools.partial(
+            graph.run_pipeline, "amazon", csv_path, 50, False, {**extra, "executor": executor})
+
+    us: Dict[str, float] = {}
+    for name, fn in calls.items():
+        fn()  # warm caches (mapping plan, stub client, graph)
+        best = float("inf")
+        for _ in range(repeat):
+            gc.collect()
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn()
+            best = min(best, (time.perf_counter() - t0) / number)
+        us[name] = round(best * 1e6, 1)
+    return {
+        "meta": {"rows": rows, "seed": seed, "number": number, "repeat": repeat, "git": _git_rev(),
+                 "python": platform.python_version()},
+        "us_per_request": us,
+        "overhead_us": {m: round(us[m] - us["nodes"], 1) for m in OVERHEAD_MODES[1:]},
+    }
@@ -0,0 +1,175 @@
+"""
+Deterministic synthetic catalogs for benchmarks and load tests.
+
+Same (rows, seed, rates) -> byte-identical file. Rows are streamed, so 10M-row files
+need no more memory than 1k-row ones.
+
+  CSV    the columns of data/samples/catalog_sample.csv
+  JSONL  SP-API listings items (sku, productType, attributes{...}) like catalog_spapi.jsonl
+
+Distributions: brands are Zipf-weighted, prices log-normal per category; `dirty_rate`
+of prices come as "$1,299.00", "19,99 EUR", " 12.5 " and friends (still parseable), and
+`invalid_rate` of rows are broken on purpose (no title, 250-char title, price "N/A" / 0 / -5,
+8 bullets, missing brand).
+"""
+from __future__ import annotations
+import csv
+import io
+import json
+import math
+import random
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+CSV_COLUMNS = ["id", "title", "description", "brand", "price", "color", "size", "bullet_points", "specifics"]
+
+# category -> (productType, nouns, log-normal mu/sigma of the price, sizes)
+CATEGORIES = {
+    "apparel": ("SHIRT", ["T-Shirt", "Hoodie", "Polo", "Jacket", "Leggings", "Sweater"], 3.2, 0.5, ["XS", "S", "M", "L", "XL", "XXL"]),
+    "electronics": ("PERSONAL_COMPUTER", ["Wireless Mouse", "USB-C Hub", "Keyboard", "Headphones", "Webcam"], 3.6, 0.8, [""]),
+    "home": ("HOME", ["Water Bottle", "Coffee Mug", "Throw Pillow", "Desk Lamp", "Cutting Board"], 3.0, 0.6, ["", "500ml", "1L", "Large"]),
+    "toys": ("TOY_FIGURE", ["Building Set", "Puzzle", "Plush Bear", "RC Car"], 3.1, 0.7, [""]),
+    "beauty": ("BEAUTY", ["Face Serum", "Lip Balm", "Shampoo", "Hand Cream"], 2.6, 0.5, ["30ml", "50ml", "100ml"]),
+}
+_CATEGORY_WEIGHTS = [0.35, 0.25, 0.2, 0.1, 0.1]
+ADJECTIVES = ["Premium", "Classic", "Ultra", "Eco", "Compact", "Deluxe", "Essential", "Pro", "Soft", "Rugged"]
+COLORS = ["Black", "White", "Gray", "Blue", "Red", "Green", "Navy", "Beige", ""]
+FEATURES = ["Durable", "Lightweight", "Machine washable", "BPA-free", "2-year warranty", "Recycled materials",
+            "Fast charging", "Ergonomic", "Hypoallergenic", "Gift ready"]
+_BRANDS = [f"{a}{b}" for a in ("Acme", "Nova", "Terra", "Zen", "Hydra", "Tech", "Urban", "Peak") for b in ("", "Co", "Labs", "Works")]
+_BRAND_WEIGHTS = [1 / (i + 1) for i in range(len(_BRANDS))]  # Zipf(1)
+
+# A PTD-shaped schema (nested arrays of {value} objects) that clean JSONL items satisfy
+_VALUE_LIST = {
+    "type": "array", "minItems": 1, "maxItems": 5,
+    "items": {"type": "object", "required": ["value"], "properties": {"value": {"type": "string", "minLength": 1, "maxLength": 200}}},
+}
+PTD_SCHEMA = {
+    "type": "object",
+    "required": ["item_name", "brand", "purchasable_offer"],
+    "properties": {
+        "item_name": _VALUE_LIST,
+        "brand": _VALUE_LIST,
+        "bullet_point": _VALUE_LIST,
+        "color": _VALUE_LIST,
+        "purchasable_offer": {
+            "type": "array",
+            "items": {"type": "object", "properties": {"our_price": {"type": "array", "items": {"type": "object", "properties": {
+                "schedule": {"type": "array", "items": {"type": "object", "properties": {
+                    "value_with_tax": {"type": "object", "required": ["amount"], "properties": {"amount": {"type": "number", "minimum": 0}}},
+                }}},
+            }}}}},
+        },
+    },
+}
+
+def _dirty_price(rnd: random.Random, price: float) -> str:
+    return rnd.choice([
+        f"${price:,.2f}",
+        f"{price:.2f} USD",
+        f" {price:.1f} ",
+        f"USD{price:.2f}",
+        f"{price:,.2f}".replace(".", "#").replace(",", ".").replace("#", ",") + " EUR",  # 1.299,00 EUR
+    ])
+
+class _Row:
+    """One product drawn from the distributions; rendered to CSV or SP-API JSON."""
+    __slots__ = ("sku", "category", "title", "description", "brand", "price", "color", "size", "bullets", "specifics", "invalid")
+
+def _rows(n: int, seed: int, invalid_rate: float, dirty_rate: float) -> Iterator[_Row]:
+    rnd = random.Random(seed)
+    cats = list(CATEGORIES)
+    for i in range(n):
+        cat = rnd.choices(cats, _CATEGORY_WEIGHTS)[0]
+        _, nouns, mu, sigma, sizes = CATEGORIES[cat]
+        r = _Row()
+        r.sku = f"SYN-{seed}-{i:08d}"
+        r.category = cat
+        noun = rnd.choice(nouns)
+        r.brand = rnd.choices(_BRANDS, _BRAND_WEIGHTS)[0]
+        r.color = rnd.choice(COLORS)
+        r.size = rnd.choice(sizes)
+        r.title = " ".join(x for x in (rnd.choice(ADJECTIVES), r.color, noun) if x)
+        r.description = f"{r.brand} {noun.lower()} - " + ", ".join(rnd.sample(FEATURES, 3)).lower() + "."
+        price = round(min(5000.0, math.exp(rnd.gauss(mu, sigma))), 2)
+        r.price = _dirty_price(rnd, price) if rnd.random() < dirty_rate else f"{price:.2f}"
+        r.bullets = rnd.sample(FEATURES, rnd.randint(0, 4))
+        r.specifics = {"material": rnd.choice(["cotton", "steel", "plastic", "glass", "wool"]), "origin": rnd.choice(["US", "CN", "DE", "VN"])}
+        r.invalid = rnd.random() < invalid_rate
+        if r.invalid:
+            kind = rnd.randrange(5)
+            if kind == 0:
+                r.title = ""
+            elif kind == 1:
+                r.title = (r.title + " ") * 30  # > 200 chars
+            elif kind == 2:
+                r.price = rnd.choice(["N/A", "0", "-5.00", ""])
+            elif kind == 3:
+                r.bullets = FEATURES[:8]
+            else:
+                r.brand = ""
+        yield r
+
+def _bullet_string(rnd: random.Random, bullets: List[str]) -> str:
+    if not bullets:
+        return ""
+    # the formats seen in real feeds: python-ish list, JSON list, semicolons
+    style = rnd.randrange(3)
+    if style == 0:
+        return "[" + ",".join(f"'{b}'" for b in bullets) + "]"
+    if style == 1:
+        return json.dumps(bullets)
+    return ";".join(bullets)
+
+def write_csv(out: TextIO, rows: int, seed: int = 42, invalid_rate: float = 0.05, dirty_rate: float = 0.1) -> int:
+    fmt = random.Random(seed ^ 0x5EED)
+    w = csv.writer(out, lineterminator="\n")
+    w.writerow(CSV_COLUMNS)
+    n = 0
+    for r in _rows(rows, seed, invalid_rate, dirty_rate):
+        w.writerow([
+            r.sku, r.title, r.description, r.brand, r.price, r.color, r.size,
+            _bullet_string(fmt, r.bullets), ";".join(f"{k}:{v}" for k, v in r.specifics.items()),
+        ])
+        n += 1
+    return n
+
+def _amount(price: str) -> Any:
+    try:
+        return float(price)
+    except ValueError:
+        return price  # dirty values stay strings, as in sloppy upstream feeds
+
+def spapi_item(r: _Row) -> Dict[str, Any]:
+    attrs: Dict[str, Any] = {
+        "item_name": [{"value": r.title}] if r.title else [],
+        "brand": [{"value": r.brand}] if r.brand else [],
+        "product_description": [{"value": r.description}],
+        "bullet_point": [{"value": b} for b in r.bullets],
+        "purchasable_offer": [{"currency": "USD", "our_price": [{"schedule": [{"value_with_tax": {"amount": _amount(r.price), "currency_code": "USD"}}]}]}],
+        "fulfillment_availability": [{"fulfillment_channel_code": "DEFAULT", "quantity": 100}],
+    }
+    if r.color:
+        attrs["color"] = [{"value": r.color}]
+    if r.size:
+        attrs["size"] = [{"value": r.size}]
+    return {"sku": r.sku, "productType": CATEGORIES[r.category][0], "requirements": "LISTING", "attributes": attrs}
+
+def write_jsonl(out: TextIO, rows: int, seed: int = 42, invalid_rate: float = 0.05, dirty_rate: float = 0.1) -> int:
+    n = 0
+    for r in _rows(rows, seed, invalid_rate, dirty_rate):
+        out.write(json.dumps(spapi_item(r), separators=(",", ":")))
+        out.write("\n")
+        n += 1
+    return n
+
+def generate(path: str, rows: int, fmt: Optional[str] = None, **kw: Any) -> int:
+    """Write a catalog to `path`; format from `fmt` or the extension (.csv / .jsonl)."""
+    fmt = fmt or ("jsonl" if path.endswith(".jsonl") else "csv")
+    writer = write_jsonl if fmt == "jsonl" else write_csv
+    with open(path, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        return writer(f, rows, **kw)
+
+def csv_text(rows: int, **kw: Any) -> str:
+    buf = io.StringIO()
+    write_csv(buf, rows, **kw)
+    return buf.getvalue()
@@ -1,25 +1,37 @@
 # src/channels/amazon.py
 from __future__ import annotations
 from typing import Dict, Any, List, Tuple, Optional
-import os, time, httpx
+import os
+import asyncio
+import httpx
 from models.ptd_validator import validate_attributes_with_ptd
+from rate_limit.limiter import send, asend
+from channels.http import get_http
+from channels.tokens import TokenManager, credential_key
+from channels import amazon_feeds
+from channels.amazon_feeds import ListingsFeedSubmitter
+
+CHANNEL = "amazon"
+LWA_TOKEN_URL = "https://api.amazon.com/auth/o2/token"
 
 class _LWA:
-    def __init__(self, client_id: str, client_secret: str, refresh_token: str):
+    def __init__(self, client_id: str, client_secret: str, refresh_token: str, http: Optional[httpx.Client] = None,
+                 token_url: Optional[str] = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.refresh_token = refresh_token
-        self._cached: Optional[str] = None
-        self._exp: float = 0.0
-        self._http = httpx.Client(timeout=10.0)
+        # LWA_TOKEN_URL points refreshes at a stand-in server (load tests)
+        self.token_url = token_url or os.getenv("LWA_TOKEN_URL") or LWA_TOKEN_URL
+        self._http = http or get_http()
+        # single-flight refresh, renewed ahead of expiry, optionally shared across workers
+        self._tokens = TokenManager("amazon:lwa", credential_key("lwa", client_id, refresh_token), self._fetch)
 
     def access_token(self) -> str:
-        now = time.time()
-        if self._cached and now < self._exp - 60:  # reuse until ~1 min before expiry
-            return self._cached
+        return self._tokens.get()
 
-        r = self._http.post(
-            "https://api.amazon.com/auth/o2/token",
+    def _fetch(self) -> Tuple[str, float]:
+        r = send(CHANNEL, "lwaToken", lambda: self._http.post(
+            self.token_url,
             headers={"Content-Type": "application/x-www-form-urlencoded;charset=UTF-8"},
             data={
                 "grant_type": "refresh_token",
@@ -27,12 +39,11 @@ class _LWA:
                 "client_id": self.client_id,
                 "client_secret": self.client_secret,
             },
-        )
+            timeout=10.0,
+        ))
         r.raise_for_status()
         data = r.json()
-        self._cached = data["access_token"]
-        self._exp = now + int(data.get("expires_in", 3600))
-        return self._cached
+        return data["access_token"], int(data.get("expires_in", 3600))
 
 class AmazonSPAPIClient:
     """
@@ -57,6 +68,7 @@ class AmazonSPAPIClient:
         user_agent: str = "market-translator/0.1 (Language=Python)",
         issue_locale: str = "en_US",
         timeout: float = 15.0,
+        http: Optional[httpx.Client] = None,
     ):
         self.host = host.rstrip("/")
         self.seller_id = seller_id
@@ -64,7 +76,9 @@ class AmazonSPAPIClient:
         self.issue_locale = issue_locale
         self.ua = user_agent
         self.lwa = lwa
-        self._http = httpx.Client(timeout=timeout)
+        self.timeout = timeout
+        # shared keep-alive pool unless the caller injects its own client
+        self._http = http or get_http()
 
     @classmethod
     def from_env(cls) -> "AmazonSPAPIClient":
@@ -92,19 +106,10 @@ class AmazonSPAPIClient:
             "accept": "application/json",
         }
 
-    def _definitions_url(self, product_type: str) -> str:
-        return f"{self.host}/definitions/2020-09-01/productTypes/{product_type}"
-
     def _put_item_url(self, sku: str) -> str:
         return f"{self.host}/listings/2021-08-01/items/{self.seller_id}/{sku}"
 
-    # ---------- public interface ----------
-    def validate_listing(self, payload: Dict[str, Any]) -> Tuple[bool, List[str]]:
-        """
-        Expect payload to be in Listings Items shape:
-          { "sku": "...", "productType": "...", "attributes": { ... }, "requirements": "LISTING" }
-        We only enforce basics here; full JSON-Schema validation can be added later.
-        """
+    def _shape_errors(self, payload: Dict[str, Any]) -> List[str]:
         errs: List[str] = []
 
         sku = payload.get("sku")
@@ -118,52 +123,91 @@ class AmazonSPAPIClient:
         attrs = payload.get("attributes")
         if not isinstance(attrs, dict):
             errs.append("attributes:missing_or_not_dict")
+        return errs
+
+    def _put_params(self) -> Dict[str, str]:
+        return {"marketplaceIds": ",".join(self.mids), "issueLocale": self.issue_locale}
 
+    # ---------- public interface ----------
+    def validate_listing(self, payload: Dict[str, Any]) -> Tuple[bool, List[str]]:
+        """
+        Expect payload to be in Listings Items shape:
+          { "sku": "...", "productType": "...", "attributes": { ... }, "requirements": "LISTING" }
+        We only enforce basics here; full JSON-Schema validation can be added later.
+        """
+        errs = self._shape_errors(payload)
         if errs:
             return False, errs
+        pt = payload.get("productType") or payload.get("product_type")
+        attrs = payload.get("attributes")
 
-        # Optional quick preflight: confirm productType exists for your marketplace(s)
-        try:
-            r = self._http.get(
-                self._definitions_url(pt),
-                params={"marketplaceIds": ",".join(self.mids), "requirements": "ENFORCED"},
-                headers=self._headers(),
-            )
-            # 404 here means unknown/unsupported product type
-            if r.status_code == 404:
-                return False, [f"productType:unsupported:{pt}"]
-            r.raise_for_status()
-        except Exception:
-            # Treat transport errors as soft failures; we'll let the upsert surface additional issues
-            pass
-
-        # Optional: enable via env flag to avoid surprises at first
-        if os.getenv("SPAPI_SCHEMA_VALIDATE", "1") == "1":
-            ok, schema_errs = validate_attributes_with_ptd(
-                host=self.host,
-                marketplace_ids=self.mids,
-                access_token=self.lwa.access_token(),
-                product_type=pt,
-                attributes=attrs or {},
-            )
-            if not ok:
-                # Prefix to distinguish client-side schema errors from API errors
-                return False, [f"{e}" for e in schema_errs]
-               
-        return True, []
+        # One cached Product Type Definitions lookup per product type covers both the
+        # "is this productType supported" check and (optionally) schema validation.
+        return validate_attributes_with_ptd(
+            host=self.host,
+            marketplace_ids=self.mids,
+            access_token=self.lwa.access_token(),
+            product_type=pt,
+            attributes=attrs or {},
+            check_schema=os.getenv("SPAPI_SCHEMA_VALIDATE", "1") == "1",
+        )
 
     def upsert_listing(self, payload: Dict[str, Any]) -> bool:
         """
         PUT Listings Item. Returns True on 2xx.
         """
         sku = payload["sku"]
-        params = {
-            "marketplaceIds": ",".join(self.mids),
-            "issueLocale": self.issue_locale,
-        }
-        r = self._http.put(self._put_item_url(sku), json=payload, params=params, headers=self._headers())
+        r = send(CHANNEL, "putListingsItem", lambda: self._http.put(
+            self._put_item_url(sku), json=payload, params=self._put_params(), headers=self._headers(),
+            timeout=self.timeout,
+        ))
         # Many validations are surfaced as 400 with a response body containing 'issues'
         if r.status_code // 100 == 2:
             return True
         # Optionally you could parse r.json().get("issues") and bubble them up
         return False
+
+    @property
+    def bulk_buffer(self) -> int:
+        # every feed is a createFeed call (~1 per 2 min) plus a blocking poll: fill them
+        return amazon_feeds.FEED_MAX_MESSAGES
+
+    def upsert_bulk(self, payloads: List[Dict[str, Any]]) -> List[List[str]]:
+        """JSON_LISTINGS_FEED submission: a few feeds instead of one PUT per SKU."""
+        feeds = ListingsFeedSubmitter(
+            host=self.host,
+            seller_id=self.seller_id,
+            marketplace_ids=self.mids,
+            headers=self._headers,
+            http=self._http,
+            issue_locale=self.issue_locale,
+        )
+        return feeds.submit(payloads)
+
+    # ---------- async interface (concurrent upsert engine) ----------
+    async def avalidate_listing(self, payload: Dict[str, Any], http: httpx.AsyncClient) -> Tuple[bool, List[str]]:
+        errs = self._shape_errors(payload)
+        if errs:
+            return False, errs
+        pt = payload.get("productType") or payload.get("product_type")
+        attrs = payload.get("attributes")
+
+        # token refresh and the (cached, single-flight) PTD fetch block; keep them off the event loop
+        token = await asyncio.to_thread(self.lwa.access_token)
+        return await asyncio.to_thread(
+            validate_attributes_with_ptd,
+            host=self.host,
+            marketplace_ids=self.mids,
+            access_token=token,
+            product_type=pt,
+            attributes=attrs or {},
+            check_schema=os.getenv("SPAPI_SCHEMA_VALIDATE", "1") == "1",
+        )
+
+    async def aupsert_listing(self, payload: Dict[str, Any], http: httpx.AsyncClient) -> bool:
+        sku = payload["sku"]
+        headers = await asyncio.to_thread(self._headers)
+        r = await asend(CHANNEL, "putListingsItem", lambda: http.put(
+            self._put_item_url(sku), json=payload, params=self._put_params(), headers=headers
+        ))
+        return r.status_code // 100 == 2
@@ -0,0 +1,206 @@
+"""
+Bulk listings upsert through the SP-API Feeds API (JSON_LISTINGS_FEED).
+
+One feed carries up to FEED_MAX_MESSAGES listings (and at most FEED_MAX_BYTES of
+JSON), so a 500k-SKU catalog becomes ~50 feeds instead of 500k putListingsItem calls:
+
+  1. POST /feeds/2021-06-30/documents          -> feedDocumentId + pre-signed upload url
+  2. PUT  <url>                                 (the feed JSON)
+  3. POST /feeds/2021-06-30/feeds               -> feedId
+  4. GET  /feeds/2021-06-30/feeds/{feedId}      until DONE / CANCELLED / FATAL
+  5. GET  /feeds/2021-06-30/documents/{resultFeedDocumentId} -> report url, then GET it
+
+The processing report's issues are keyed by messageId, which maps back to the SKU.
+"""
+from __future__ import annotations
+import gzip
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import httpx
+from rate_limit.limiter import send
+
+CHANNEL = "amazon"
+FEED_TYPE = "JSON_LISTINGS_FEED"
+CONTENT_TYPE = "application/json; charset=UTF-8"
+FEED_MAX_MESSAGES = int(os.getenv("SPAPI_FEED_MAX_MESSAGES", "10000"))
+FEED_MAX_BYTES = int(os.getenv("SPAPI_FEED_MAX_BYTES", str(100 * 1024 * 1024)))
+DONE_STATUSES = {"DONE", "CANCELLED", "FATAL"}
+
+def _message(message_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "messageId": message_id,
+        "sku": payload["sku"],
+        "operationType": "UPDATE",
+        "productType": payload.get("productType") or payload.get("product_type"),
+        "requirements": payload.get("requirements") or "LISTING",
+        "attributes": payload.get("attributes") or {},
+    }
+
+def pack_feeds(
+    header: Dict[str, Any],
+    payloads: List[Dict[str, Any]],
+    max_messages: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> Iterator[Tuple[bytes, List[int]]]:
+    """
+    Split payloads into feed documents under both limits.
+    Yields (document bytes, indexes into `payloads`); messageId i+1 is the i-th index.
+    """
+    max_messages = max_messages or FEED_MAX_MESSAGES
+    max_bytes = max_bytes or FEED_MAX_BYTES
+    head = json.dumps({"header": header, "messages": []}).encode()
+    overhead = len(head)
+    msgs: List[bytes] = []
+    idx: List[int] = []
+    size = overhead
+
+    def flush():
+        body = head[:-2] + b",".join(msgs) + b"]}"
+        return body, idx
+
+    for i, p in enumerate(payloads):
+        m = json.dumps(_message(len(msgs) + 1, p), separators=(",", ":")).encode()
+        if msgs and (len(msgs) >= max_messages or size + len(m) + 1 > max_bytes):
+            yield flush()
+            msgs, idx, size = [], [], overhead
+            m = json.dumps(_message(1, p), separators=(",", ":")).encode()
+        msgs.append(m)
+        idx.append(i)
+        size += len(m) + 1
+    if msgs:
+        yield flush()
+
+def parse_report(report: Dict[str, Any]) -> Dict[int, List[str]]:
+    """messageId -> error codes (warnings don't reject the listing)."""
+    out: Dict[int, List[str]] = {}
+    for issue in report.get("issues") or []:
+        if (issue.get("severity") or "ERROR").upper() != "ERROR":
+            continue
+        mid = issue.get("messageId")
+        code = issue.get("code") or "issue"
+        attrs = ",".join(issue.get("attributeNames") or [])
+        out.setdefault(mid, []).append(f"feed:{code}" + (f":{attrs}" if attrs else ""))
+    return out
+
+class ListingsFeedSubmitter:
+    def __init__(
+        self,
+        host: str,
+        seller_id: str,
+        marketplace_ids: List[str],
+        headers: Callable[[], Dict[str, str]],
+        http: httpx.Client,
+        issue_locale: str = "en_US",
+        poll_interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.host = host.rstrip("/")
+        self.seller_id = seller_id
+        self.mids = marketplace_ids
+        self.headers = headers
+        self.http = http
+        self.issue_locale = issue_locale
+        self.poll_interval = float(os.getenv("SPAPI_FEED_POLL_INTERVAL", "30") if poll_interval is None else poll_interval)
+        self.timeout = float(os.getenv("SPAPI_FEED_TIMEOUT", "3600") if timeout is None else timeout)
+
+    # ---------- Feeds API calls ----------
+    def _create_document(self) -> Dict[str, Any]:
+        r = send(CHANNEL, "createFeedDocument", lambda: self.http.post(
+            f"{self.host}/feeds/2021-06-30/documents", json={"contentType": CONTENT_TYPE}, headers=self.headers()))
+        r.raise_for_status()
+        return r.json()
+
+    def _upload(self, url: str, body: bytes) -> None:
+        # pre-signed S3 url: no SP-API auth, no SP-API quota
+        r = self.http.put(url, content=body, headers={"Content-Type": CONTENT_TYPE}, timeout=300)
+        r.raise_for_status()
+
+    def _create_feed(self, document_id: str) -> str:
+        body = {"feedType": FEED_TYPE, "marketplaceIds": self.mids, "inputFeedDocumentId": document_id}
+        r = send(CHANNEL, "createFeed", lambda: self.http.post(
+            f"{self.host}/feeds/2021-06-30/feeds", json=body, headers=self.headers()))
+        r.raise_for_status()
+        return r.json()["feedId"]
+
+    def _get_feed(self, feed_id: str) -> Dict[str, Any]:
+        r = send(CHANNEL, "getFeed", lambda: self.http.get(
+            f"{self.host}/feeds/2021-06-30/feeds/{feed_id}", headers=self.headers()))
+        r.raise_for_status()
+        return r.json()
+
+    def _report(self, document_id: str) -> Dict[str, Any]:
+        r = send(CHANNEL, "getFeedDocument", lambda: self.http.get(
+            f"{self.host}/feeds/2021-06-30/documents/{document_id}", headers=self.headers()))
+        r.raise_for_status()
+        doc = r.json()
+        raw = self.http.get(doc["url"], timeout=300)
+        raw.raise_for_status()
+        content = raw.content
+        if (doc.get("compressionAlgorithm") or "").upper() == "GZIP":
+            content = gzip.decompress(content)
+        return json.loads(content)
+
+    # ---------- public ----------
+    def submit(self, payloads: List[Dict[str, Any]]) -> List[List[str]]:
+        """Upsert all payloads; returns per-payload errors (empty list = accepted)."""
+        results: List[List[str]] = [[] for _ in payloads]
+        header = {"sellerId": self.seller_id, "version": "2.0", "issueLocale": self.issue_locale}
+
+        # submit every feed first so Amazon processes them while we poll
+        pending: List[Tuple[str, List[int]]] = []
+        for body, idx in pack_feeds(header, payloads):
+            try:
+                doc = self._create_document()
+                self._upload(doc["url"], body)
+                pending.append((self._create_feed(doc["feedDocumentId"]), idx))
+            except Exception as ex:
+                for i in idx:
+                    results[i].append(f"feed:submit_error:{type(ex).__name__}")
+
+        deadline = time.monotonic() + self.timeout
+        while pending:
+            still: List[Tuple[str, List[int]]] = []
+            for feed_id, idx in pending:
+                try:
+                    feed = self._get_feed(feed_id)
+                except Exception:
+                    still.append((feed_id, idx))
+                    continue
+                status = feed.get("processingStatus")
+                if status not in DONE_STATUSES:
+                    still.append((feed_id, idx))
+                    continue
+                self._collect(feed, idx, results)
+            pending = still
+            if pending:
+                if time.monotonic() > deadline:
+                    for feed_id, idx in pending:
+                        for i in idx:
+                            results[i].append(f"feed:timeout:{feed_id}")
+                    break
+                time.sleep(self.poll_interval)
+        return results
+
+    def _collect(self, feed: Dict[str, Any], idx: List[int], results: List[List[str]]) -> None:
+        status = feed.get("processingStatus")
+        report: Dict[str, Any] = {}
+        if feed.get("resultFeedDocumentId"):
+            try:
+                report = self._report(feed["resultFeedDocumentId"])
+            except Exception as ex:
+                for i in idx:
+                    results[i].append(f"feed:report_error:{type(ex).__name__}")
+                return
+        if status != "DONE" and not report.get("issues"):
+            for i in idx:
+                results[i].append(f"feed:{status}")
+            return
+        for mid, errs in parse_report(report).items():
+            if isinstance(mid, int) and 1 <= mid <= len(idx):
+                results[idx[mid - 1]].extend(errs)
+            elif mid is None:
+                # feed-level issue: applies to every message in the feed
+                for i in idx:
+                    results[i].extend(errs)
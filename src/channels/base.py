@@ -1,9 +1,14 @@
 # src/channels/base.py
 from typing import Dict, Any, List, Tuple
 import os
+import threading
+from .http import close_http
 
 class ChannelClient:
     name = "base"
+    # accepted payloads a streamed bulk run holds back across chunks so each bulk
+    # submission is full (0 = submit every chunk on its own)
+    bulk_buffer = 0
 
     def validate_listing(self, payload: Dict[str, Any]) -> Tuple[bool, List[str]]:
         errs = []
@@ -18,25 +23,63 @@ class ChannelClient:
         ok, _ = self.validate_listing(payload)
         return ok
 
+    def prefetch(self, payloads: List[Dict[str, Any]]) -> None:
+        """Warm per-job metadata (e.g. category aspects) before validation; no-op by default."""
+
+    def upsert_bulk(self, payloads: List[Dict[str, Any]]) -> List[List[str]]:
+        """
+        Bulk upsert (extra={"upsert_mode": "bulk"}). Returns per-payload errors, empty = accepted.
+        Channels with bulk endpoints override this; the default is one upsert per item.
+        """
+        return [[] if self.upsert_listing(p) else ["upsert:failed"] for p in payloads]
+
+    # Async variants used by the concurrent upsert engine. `http` is the engine's shared
+    # httpx.AsyncClient; clients without network I/O just run the sync path.
+    async def avalidate_listing(self, payload: Dict[str, Any], http: Any = None) -> Tuple[bool, List[str]]:
+        return self.validate_listing(payload)
+
+    async def aupsert_listing(self, payload: Dict[str, Any], http: Any = None) -> bool:
+        return self.upsert_listing(payload)
+
 def _has_all(names: list[str]) -> bool:
     return all(os.getenv(n) for n in names)
 
-def get_client(channel: str) -> ChannelClient:
-    ch = (channel or "").lower()
+_AMAZON_ENV = ["LWA_CLIENT_ID", "LWA_CLIENT_SECRET", "LWA_REFRESH_TOKEN", "SPAPI_HOST", "SELLER_ID", "MARKETPLACE_IDS"]
+_EBAY_ENV = ["EBAY_BASE_URL", "EBAY_CLIENT_ID", "EBAY_CLIENT_SECRET", "EBAY_REFRESH_TOKEN", "EBAY_MARKETPLACE_ID"]
+
+# channel -> (env fingerprint, client). Clients live for the whole process so their
+# pooled connections and cached OAuth tokens survive across batches and jobs.
+_CLIENTS: Dict[str, Tuple[tuple, ChannelClient]] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def _build_client(ch: str) -> ChannelClient:
     # Prefer Amazon SP-API if LWA creds + endpoint are set
-    if ch == "amazon" and _has_all([
-        "LWA_CLIENT_ID", "LWA_CLIENT_SECRET", "LWA_REFRESH_TOKEN",
-        "SPAPI_HOST", "SELLER_ID", "MARKETPLACE_IDS"
-    ]):
+    if ch == "amazon" and _has_all(_AMAZON_ENV):
         from .amazon import AmazonSPAPIClient
         return AmazonSPAPIClient.from_env()
-    
+
     # eBay Sell APIs (sandbox or prod)
-    if ch == "ebay" and _has_all([
-        "EBAY_BASE_URL", "EBAY_CLIENT_ID", "EBAY_CLIENT_SECRET",
-        "EBAY_REFRESH_TOKEN", "EBAY_MARKETPLACE_ID"
-    ]):
+    if ch == "ebay" and _has_all(_EBAY_ENV):
         from .ebay import EbayClient
         return EbayClient.from_env()
-    
+
     return ChannelClient()
+
+def get_client(channel: str) -> ChannelClient:
+    ch = (channel or "").lower()
+    # rebuild only when the credentials/endpoint the client was built from change
+    stamp = tuple(os.getenv(n) for n in (_AMAZON_ENV if ch == "amazon" else _EBAY_ENV if ch == "ebay" else []))
+    hit = _CLIENTS.get(ch)
+    if hit and hit[0] == stamp:
+        return hit[1]
+    with _CLIENTS_LOCK:
+        hit = _CLIENTS.get(ch)
+        if not hit or hit[0] != stamp:
+            hit = _CLIENTS[ch] = (stamp, _build_client(ch))
+        return hit[1]
+
+def close_clients() -> None:
+    """Drop cached channel clients and close the shared connection pool (app shutdown)."""
+    with _CLIENTS_LOCK:
+        _CLIENTS.clear()
+    close_http()
@@ -11,10 +11,30 @@
 from __future__ import annotations
 from typing import Dict, Any, List, Tuple, Optional
 import os
-import time
 import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import httpx
+from rate_limit.limiter import send, asend
+from channels.http import get_http
+from channels.tokens import TokenManager, credential_key
+from utils.cache import DiskCache, TTLCache
+from utils import metrics
 
+CHANNEL = "ebay"
+# eBay's bulk Inventory API accepts at most 25 requests per call
+BULK_SIZE = 25
+# concurrent get_item_aspects_for_category calls when prefetching a job's categories
+PREFETCH_WORKERS = 4
+
+def _metadata_cache() -> TTLCache:
+    """Aspects per (marketplace, category) and business policies per marketplace."""
+    root = os.getenv("EBAY_METADATA_CACHE_DIR")
+    return TTLCache(
+        max_entries=int(os.getenv("EBAY_METADATA_CACHE_SIZE", "2048")),
+        ttl=float(os.getenv("EBAY_METADATA_TTL", "86400")),
+        disk=DiskCache(root) if root else None,
+    )
 
 def _env(name: str, default: Optional[str] = None) -> str:
     v = os.getenv(name, default)
@@ -24,58 +44,61 @@ def _env(name: str, default: Optional[str] = None) -> str:
 
 
 class _EbayAuth:
-    def __init__(self, base_url: str, client_id: str, client_secret: str, refresh_token: str) -> None:
+    def __init__(
+        self, base_url: str, client_id: str, client_secret: str, refresh_token: str,
+        http: Optional[httpx.Client] = None,
+    ) -> None:
         self.base = base_url.rstrip("/")
+        self.http = http or get_http()
         self.cid  = client_id
         self.csec = client_secret
         self.refresh = refresh_token
-        self._app_tok: Optional[str] = None
-        self._app_exp: float = 0.0
-        self._user_tok: Optional[str] = None
-        self._user_exp: float = 0.0
+        self._app = TokenManager("ebay:app", credential_key("ebay-app", self.base, client_id), self._fetch_app)
+        self._user = TokenManager(
+            "ebay:user", credential_key("ebay-user", self.base, client_id, refresh_token), self._fetch_user
+        )
 
     def _token(self, grant_type: str, scope: str, refresh_token: Optional[str] = None) -> dict:
         url = f"{self.base}/identity/v1/oauth2/token"
         data = {"grant_type": grant_type, "scope": scope}
         if refresh_token:
             data["refresh_token"] = refresh_token
-        with httpx.Client(timeout=30) as s:
-            r = s.post(url, data=data, auth=(self.cid, self.csec),
-                       headers={"Content-Type": "application/x-www-form-urlencoded"})
-            r.raise_for_status()
-            return r.json()
+        r = send(CHANNEL, "oauthToken", lambda: self.http.post(
+            url, data=data, auth=(self.cid, self.csec),
+            headers={"Content-Type": "application/x-www-form-urlencoded"}, timeout=30))
+        r.raise_for_status()
+        return r.json()
 
-    def app_token(self) -> str:
-        now = time.time()
-        if self._app_tok and now < self._app_exp - 60:
-            return self._app_tok
+    def _fetch_app(self) -> Tuple[str, float]:
         scopes = "https://api.ebay.com/oauth/api_scope"
         j = self._token("client_credentials", scopes)
-        self._app_tok = j["access_token"]
-        self._app_exp = now + float(j.get("expires_in", 7200))
-        return self._app_tok
+        return j["access_token"], float(j.get("expires_in", 7200))
 
-    def user_token(self) -> str:
-        now = time.time()
-        if self._user_tok and now < self._user_exp - 60:
-            return self._user_tok
+    def _fetch_user(self) -> Tuple[str, float]:
         scopes = " ".join([
             "https://api.ebay.com/oauth/api_scope/sell.inventory",
             "https://api.ebay.com/oauth/api_scope/sell.account",
         ])
         j = self._token("refresh_token", scopes, refresh_token=self.refresh)
-        self._user_tok = j["access_token"]
-        self._user_exp = now + float(j.get("expires_in", 7200))
-        return self._user_tok
+        return j["access_token"], float(j.get("expires_in", 7200))
+
+    def app_token(self) -> str:
+        return self._app.get()
+
+    def user_token(self) -> str:
+        return self._user.get()
 
 
 class EbayClient:
     name = "ebay"
 
-    def __init__(self, *, base_url: str, marketplace_id: str, auth: _EbayAuth):
+    def __init__(self, *, base_url: str, marketplace_id: str, auth: _EbayAuth, http: Optional[httpx.Client] = None):
         self.base = base_url.rstrip("/")
         self.market = marketplace_id
         self.auth = auth
+        # one keep-alive pool for every call instead of a fresh connection per request
+        self.http = http or auth.http
+        self.meta = _metadata_cache()
 
     @classmethod
     def from_env(cls) -> "EbayClient":
@@ -106,13 +129,11 @@ class EbayClient:
         }
 
     # ---------- metadata/aspects ----------
-    def _required_aspects(self, category_id: str) -> List[str]:
-        url = f"{self.base}/sell/metadata/v1/marketplace/{self.market}/get_item_aspects_for_category"
-        with httpx.Client(timeout=30) as s:
-            r = s.get(url, headers=self._h_app(), params={"category_id": category_id})
-            if r.status_code != 200:
-                return []
-            data = r.json()
+    def _aspects_url(self) -> str:
+        return f"{self.base}/sell/metadata/v1/marketplace/{self.market}/get_item_aspects_for_category"
+
+    @staticmethod
+    def _parse_required_aspects(data: Dict[str, Any]) -> List[str]:
         req: List[str] = []
         for a in data.get("aspects", []):
             c = a.get("aspectConstraint", {})
@@ -122,26 +143,70 @@ class EbayClient:
                     req.append(name)
         return req
 
+    def _aspects_key(self, category_id: str) -> str:
+        return f"aspects|{self.base}|{self.market}|{category_id}"
+
+    def _fetch_required_aspects(self, category_id: str) -> Optional[List[str]]:
+        r = send(CHANNEL, "getItemAspectsForCategory", lambda: self.http.get(
+            self._aspects_url(), headers=self._h_app(), params={"category_id": category_id}, timeout=30))
+        if r.status_code != 200:
+            return None  # not cached; the next item retries
+        return self._parse_required_aspects(r.json())
+
+    def _required_aspects(self, category_id: str) -> List[str]:
+        key = self._aspects_key(category_id)
+        hit = self.meta.get(key)
+        metrics.CACHE_REQUESTS.inc(cache="ebay_aspects", result="miss" if hit is None else "hit")
+        if hit is not None:
+            return hit
+        return self.meta.get_or_load(key, lambda: self._fetch_required_aspects(category_id)) or []
+
+    def prefetch(self, payloads: List[Dict[str, Any]]) -> None:
+        """Warm the aspects cache for every distinct category in a job before validating it."""
+        cats = {self._category(self._normalize(p)) for p in payloads}
+        missing = [c for c in cats if c and self.meta.get(self._aspects_key(c)) is None]
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=min(PREFETCH_WORKERS, len(missing))) as pool:
+            # failures are left uncached; validate_listing retries them per category
+            list(pool.map(lambda c: self._safe(self._required_aspects, c), missing))
+
+    @staticmethod
+    def _safe(fn, *args):
+        try:
+            return fn(*args)
+        except Exception:
+            return None
+
     # ---------- public API ----------
-    def validate_listing(self, payload: Dict[str, Any]) -> Tuple[bool, List[str]]:
-        """Cheap guards + optional aspects check (if categoryId is provided)."""
+    def _basic_errors(self, norm: Dict[str, Any]) -> List[str]:
         errs: List[str] = []
-        norm = self._normalize(payload)
-
         if not norm["title"]:
             errs.append("required:title")
         if not norm["price"]:
             errs.append("required:price")
         if not norm["brand"]:
             errs.append("required:brand")
+        return errs
 
-        cat = norm.get("categoryId") or os.getenv("EBAY_DEFAULT_CATEGORY_ID") or ""
+    @staticmethod
+    def _category(norm: Dict[str, Any]) -> str:
+        return norm.get("categoryId") or os.getenv("EBAY_DEFAULT_CATEGORY_ID") or ""
+
+    @staticmethod
+    def _aspect_errors(required: List[str], norm: Dict[str, Any]) -> List[str]:
+        have = set((norm.get("aspects") or {}).keys())
+        missing = [x for x in sorted(set(required)) if x not in have]
+        return [f"aspects:missing:{','.join(missing)}"] if missing else []
+
+    def validate_listing(self, payload: Dict[str, Any]) -> Tuple[bool, List[str]]:
+        """Cheap guards + optional aspects check (if categoryId is provided)."""
+        norm = self._normalize(payload)
+        errs = self._basic_errors(norm)
+
+        cat = self._category(norm)
         if cat:
-            required = set(self._required_aspects(cat))
-            have = set((norm.get("aspects") or {}).keys())
-            missing = [x for x in sorted(required) if x not in have]
-            if missing:
-                errs.append(f"aspects:missing:{','.join(missing)}")
+            errs.extend(self._aspect_errors(self._required_aspects(cat), norm))
 
         return (len(errs) == 0, errs)
 
@@ -159,31 +224,147 @@ class EbayClient:
 
         # 1) Inventory Item
         inv = self._to_inventory_item(norm)
-        with httpx.Client(timeout=60) as s:
-            r = s.put(f"{self.base}/sell/inventory/v1/inventory_item/{sku}",
-                      headers=self._h_user(), content=json.dumps(inv).encode("utf-8"))
-            if not (200 <= r.status_code < 300):
-                return False
+        r = send(CHANNEL, "createOrReplaceInventoryItem", lambda: self.http.put(
+            f"{self.base}/sell/inventory/v1/inventory_item/{sku}",
+            headers=self._h_user(), content=json.dumps(inv).encode("utf-8"), timeout=60))
+        if not (200 <= r.status_code < 300):
+            return False
 
         # 2) Offer (create)
         pol = self._find_policies()
         offer = self._to_offer(norm, sku, pol)
-        with httpx.Client(timeout=60) as s:
-            r = s.post(f"{self.base}/sell/inventory/v1/offer",
-                       headers=self._h_user(), content=json.dumps(offer).encode("utf-8"))
-            if not (200 <= r.status_code < 300):
-                return False
-            offer_id = (r.json() or {}).get("offerId")
+        r = send(CHANNEL, "createOffer", lambda: self.http.post(
+            f"{self.base}/sell/inventory/v1/offer",
+            headers=self._h_user(), content=json.dumps(offer).encode("utf-8"), timeout=60))
+        if not (200 <= r.status_code < 300):
+            return False
+        offer_id = (r.json() or {}).get("offerId")
 
         # 3) Publish only when LIVE requested
         if (payload.get("mode") or "").upper() == "LIVE" and offer_id:
-            with httpx.Client(timeout=30) as s:
-                r = s.post(f"{self.base}/sell/inventory/v1/offer/{offer_id}/publish",
-                           headers=self._h_user())
-                return 200 <= r.status_code < 300
+            r = send(CHANNEL, "publishOffer", lambda: self.http.post(
+                f"{self.base}/sell/inventory/v1/offer/{offer_id}/publish", headers=self._h_user(), timeout=30))
+            return 200 <= r.status_code < 300
 
         return True  # draft created successfully
 
+    # ---------- bulk API (extra={"upsert_mode": "bulk"}) ----------
+    @staticmethod
+    def _bulk_errors(resp: Dict[str, Any]) -> List[str]:
+        errs = [f"ebay:{e.get('errorId', 'error')}" for e in resp.get("errors") or []]
+        if not errs and not (200 <= int(resp.get("statusCode") or 0) < 300):
+            errs.append(f"ebay:status_{resp.get('statusCode')}")
+        return errs
+
+    def _bulk_post(self, op: str, path: str, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One bulk call; returns the per-request responses (same order as `requests`)."""
+        r = send(CHANNEL, op, lambda: self.http.post(
+            f"{self.base}/sell/inventory/v1/{path}", headers=self._h_user(),
+            content=json.dumps({"requests": requests}).encode("utf-8"), timeout=60))
+        if not (200 <= r.status_code < 300) and r.status_code != 207:
+            return [{"statusCode": r.status_code} for _ in requests]
+        return (r.json() or {}).get("responses") or [{"statusCode": 500} for _ in requests]
+
+    def upsert_bulk(self, payloads: List[Dict[str, Any]]) -> List[List[str]]:
+        """
+        bulkCreateOrReplaceInventoryItem -> bulkCreateOffer -> bulkPublishOffer (LIVE only),
+        25 SKUs per call, with business policies resolved once for the whole job.
+        Returns per-payload errors (empty = accepted).
+        """
+        results: List[List[str]] = [[] for _ in payloads]
+        pol = self._find_policies()
+        locale = os.getenv("EBAY_LOCALE", "en_US")
+
+        prepared = []  # (index, sku, norm, live)
+        for i, payload in enumerate(payloads):
+            sku = payload.get("sku") or payload.get("id")
+            if not sku:
+                results[i].append("sku:missing")
+                continue
+            norm = self._normalize(payload)
+            try:
+                self._to_offer(norm, sku, pol)  # surfaces a bad price before any call
+            except (TypeError, ValueError):
+                results[i].append("price:invalid")
+                continue
+            prepared.append((i, str(sku), norm, (payload.get("mode") or "").upper() == "LIVE"))
+
+        for start in range(0, len(prepared), BULK_SIZE):
+            chunk = prepared[start:start + BULK_SIZE]
+
+            inv = [{"sku": sku, "locale": locale, **self._to_inventory_item(norm)} for _, sku, norm, _ in chunk]
+            ok = []
+            for item, resp in zip(chunk, self._bulk_post("bulkCreateOrReplaceInventoryItem",
+                                                       "bulk_create_or_replace_inventory_item", inv)):
+                errs = self._bulk_errors(resp)
+                results[item[0]].extend(errs)
+                if not errs:
+                    ok.append(item)
+            if not ok:
+                continue
+
+            offers = [self._to_offer(norm, sku, pol) for _, sku, norm, _ in ok]
+            publish = []
+            for item, resp in zip(ok, self._bulk_post("bulkCreateOffer", "bulk_create_offer", offers)):
+                errs = self._bulk_errors(resp)
+                results[item[0]].extend(errs)
+                if not errs and item[3] and resp.get("offerId"):
+                    publish.append((item, resp["offerId"]))
+            if publish:
+                reqs = [{"offerId": offer_id} for _, offer_id in publish]
+                for (item, _), resp in zip(publish, self._bulk_post("bulkPublishOffer", "bulk_publish_offer", reqs)):
+                    results[item[0]].extend(self._bulk_errors(resp))
+        return results
+
+    # ---------- async API (concurrent upsert engine) ----------
+    # Token refresh and policy lookup stay sync; they run in a worker thread so the
+    # event loop keeps other requests in flight.
+    async def avalidate_listing(self, payload: Dict[str, Any], http: httpx.AsyncClient) -> Tuple[bool, List[str]]:
+        norm = self._normalize(payload)
+        errs = self._basic_errors(norm)
+
+        cat = self._category(norm)
+        if cat:
+            required = self.meta.get(self._aspects_key(cat))
+            if required is None:
+                # coalesced with other items of this category, off the event loop
+                required = await asyncio.to_thread(self._required_aspects, cat)
+            else:
+                metrics.CACHE_REQUESTS.inc(cache="ebay_aspects", result="hit")
+            errs.extend(self._aspect_errors(required, norm))
+
+        return (len(errs) == 0, errs)
+
+    async def aupsert_listing(self, payload: Dict[str, Any], http: httpx.AsyncClient) -> bool:
+        norm = self._normalize(payload)
+        sku  = payload.get("sku") or payload.get("id")
+        if not sku:
+            return False
+
+        headers = await asyncio.to_thread(self._h_user)
+        inv = self._to_inventory_item(norm)
+        r = await asend(CHANNEL, "createOrReplaceInventoryItem", lambda: http.put(
+            f"{self.base}/sell/inventory/v1/inventory_item/{sku}",
+            headers=headers, content=json.dumps(inv).encode("utf-8")))
+        if not (200 <= r.status_code < 300):
+            return False
+
+        pol = await asyncio.to_thread(self._find_policies)
+        offer = self._to_offer(norm, sku, pol)
+        r = await asend(CHANNEL, "createOffer", lambda: http.post(
+            f"{self.base}/sell/inventory/v1/offer",
+            headers=headers, content=json.dumps(offer).encode("utf-8")))
+        if not (200 <= r.status_code < 300):
+            return False
+        offer_id = (r.json() or {}).get("offerId")
+
+        if (payload.get("mode") or "").upper() == "LIVE" and offer_id:
+            r = await asend(CHANNEL, "publishOffer", lambda: http.post(
+                f"{self.base}/sell/inventory/v1/offer/{offer_id}/publish", headers=headers))
+            return 200 <= r.status_code < 300
+
+        return True
+
     # ---------- shaping helpers ----------
     def _normalize(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         prod = payload.get("product") or {}
@@ -198,8 +379,10 @@ class EbayClient:
             brand = payload.get("brand") or ""
             desc  = payload.get("description") or ""
             aspects = {}
-            if payload.get("color"): aspects["Color"] = [str(payload["color"])]
-            if payload.get("size"):  aspects["Size"]  = [str(payload["size"])]
+            if payload.get("color"):
+                aspects["Color"] = [str(payload["color"])]
+            if payload.get("size"):
+                aspects["Size"] = [str(payload["size"])]
             price = payload.get("price") or ""
         return {
             "title": title,
@@ -260,24 +443,33 @@ class EbayClient:
         }
         if all(ids.values()):
             return ids
-        # otherwise pick the first policy in each list
+        key = f"policies|{self.base}|{self.market}"
+        found = self.meta.get(key)
+        metrics.CACHE_REQUESTS.inc(cache="ebay_policies", result="miss" if found is None else "hit")
+        if found is None:
+            found = self.meta.get_or_load(key, lambda: self._lookup_policies(dict(ids)))
+        return {k: v or (found or {}).get(k, "") for k, v in ids.items()}
+
+    def _lookup_policies(self, ids: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """
+        First policy of each missing kind. A 200 with an empty list is a definitive "none"
+        and is cached as ""; any other status (or a network error) returns None, which
+        get_or_load doesn't cache, so the next upsert retries the lookup.
+        """
+        s = self.http
         try:
-            with httpx.Client(timeout=30) as s:
-                if not ids["paymentPolicyId"]:
-                    r = s.get(f"{self.base}/sell/account/v1/payment_policy",
-                              headers=self._h_user(), params={"marketplace_id": self.market})
-                    if r.status_code == 200 and r.json().get("paymentPolicies"):
-                        ids["paymentPolicyId"] = r.json()["paymentPolicies"][0]["paymentPolicyId"]
-                if not ids["fulfillmentPolicyId"]:
-                    r = s.get(f"{self.base}/sell/account/v1/fulfillment_policy",
-                              headers=self._h_user(), params={"marketplace_id": self.market})
-                    if r.status_code == 200 and r.json().get("fulfillmentPolicies"):
-                        ids["fulfillmentPolicyId"] = r.json()["fulfillmentPolicies"][0]["fulfillmentPolicyId"]
-                if not ids["returnPolicyId"]:
-                    r = s.get(f"{self.base}/sell/account/v1/return_policy",
-                              headers=self._h_user(), params={"marketplace_id": self.market})
-                    if r.status_code == 200 and r.json().get("returnPolicies"):
-                        ids["returnPolicyId"] = r.json()["returnPolicies"][0]["returnPolicyId"]
+            for kind in ("payment", "fulfillment", "return"):
+                field = f"{kind}PolicyId"
+                if ids[field]:
+                    continue
+                r = send(CHANNEL, f"get{kind.title()}Policies", lambda: s.get(
+                    f"{self.base}/sell/account/v1/{kind}_policy",
+                    headers=self._h_user(), params={"marketplace_id": self.market}, timeout=30))
+                if r.status_code != 200:
+                    return None
+                policies = r.json().get(f"{kind}Policies") or []
+                if policies:
+                    ids[field] = policies[0][field]
         except Exception:
-            pass
+            return None  # not cached; retried on the next upsert
         return ids
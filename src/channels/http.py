@@ -0,0 +1,65 @@
+"""
+Process-wide, connection-pooled HTTP clients shared by every channel client.
+
+Keep-alive connections are reused across token fetches, metadata lookups and
+upserts, and HTTP/2 is negotiated when the `h2` package is installed. Pool
+sizing comes from the environment:
+
+  HTTP_MAX_CONNECTIONS   (100)  total open connections per client
+  HTTP_MAX_KEEPALIVE     (20)   idle connections kept for reuse
+  HTTP_KEEPALIVE_EXPIRY  (30)   seconds an idle connection is kept
+  HTTP2                  (1)    set 0 to force HTTP/1.1
+"""
+from __future__ import annotations
+import os
+import threading
+from typing import Optional, Tuple
+import httpx
+
+DEFAULT_TIMEOUT = 30.0
+
+# (pid, client): a pooled client must never be shared across fork()
+_client: Tuple[Optional[int], Optional[httpx.Client]] = (None, None)
+_lock = threading.Lock()
+
+def pool_limits(max_connections: Optional[int] = None) -> httpx.Limits:
+    # an explicit size (e.g. upsert concurrency) keeps every connection warm
+    total = max_connections or int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    keepalive = max_connections or int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    return httpx.Limits(
+        max_connections=total,
+        max_keepalive_connections=min(total, keepalive),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+
+def http2_enabled() -> bool:
+    if os.getenv("HTTP2", "1") != "1":
+        return False
+    try:
+        import h2  # noqa: F401  optional dependency (httpx[http2])
+    except ImportError:
+        return False
+    return True
+
+def get_http() -> httpx.Client:
+    """The shared sync client for this process."""
+    global _client
+    pid = os.getpid()
+    if _client[0] == pid and _client[1] is not None and not _client[1].is_closed:
+        return _client[1]
+    with _lock:
+        if _client[0] != pid or _client[1] is None or _client[1].is_closed:
+            _client = (pid, httpx.Client(timeout=DEFAULT_TIMEOUT, limits=pool_limits(), http2=http2_enabled()))
+        return _client[1]
+
+def async_client(max_connections: Optional[int] = None, timeout: float = DEFAULT_TIMEOUT) -> httpx.AsyncClient:
+    """A pooled async client; async clients are bound to one event loop, so the caller owns it."""
+    return httpx.AsyncClient(timeout=timeout, limits=pool_limits(max_connections), http2=http2_enabled())
+
+def close_http() -> None:
+    global _client
+    with _lock:
+        pid, c = _client
+        _client = (None, None)
+    if c is not None and pid == os.getpid():
+        c.close()
@@ -0,0 +1,275 @@
+"""
+OAuth access tokens shared across threads and worker processes.
+
+- single-flight: when a token expires only one caller refreshes it, the rest wait
+  for (and reuse) its result
+- refresh-ahead: inside the renewal window the current token is still returned
+  while one background thread fetches the next
+- proactive renewal: a timer starts that same renewal at exp - RENEW_AHEAD, so an
+  idle worker's first request after a quiet hour doesn't wait on the auth endpoint
+- TOKEN_CACHE shares tokens between workers so each credential set is refreshed
+  once, not once per process:
+    (unset)               per-process only
+    file:///path/to/dir   one JSON file per credential set, flock-serialized refresh
+    redis://host:6379/0   Redis keys + a SET NX lock, released only by its holder
+"""
+from __future__ import annotations
+import abc
+import collections
+import fcntl
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Deque, Dict, Iterator, Optional, Tuple
+from utils import metrics
+
+# A token is considered expired this many seconds early
+EXPIRY_SKEW = 60
+# ...and renewed in the background once it is this close to expiry
+RENEW_AHEAD = 300
+
+Fetch = Callable[[], Tuple[str, float]]  # -> (access_token, expires_in seconds)
+
+class TokenStore(abc.ABC):
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """(token, absolute expiry) or None."""
+
+    @abc.abstractmethod
+    def put(self, key: str, token: str, exp: float) -> None:
+        ...
+
+    @abc.abstractmethod
+    def lock(self, key: str) -> ContextManager[None]:
+        """Cross-process mutex around a refresh."""
+
+class FileTokenStore(TokenStore):
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        try:
+            d = json.loads(self._path(key).read_text())
+            return d["token"], float(d["exp"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, token: str, exp: float) -> None:
+        # write-then-rename so readers never see half a file; tokens are secrets -> 0600
+        tmp = self._path(key).with_suffix(f".{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"token": token, "exp": exp}, f)
+        os.replace(tmp, self._path(key))
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        with open(self.root / f"{key}.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+# delete the lock only if it still holds our token: after lock_ttl it may be someone else's
+_RELEASE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+class RedisTokenStore(TokenStore):
+    """`client` is anything with redis-py's get/set/eval, e.g. redis.Redis or a test stand-in."""
+
+    def __init__(self, client: Any, prefix: str = "oauth:", lock_ttl: float = 30.0):
+        self.client = client
+        self.prefix = prefix
+        self.lock_ttl = lock_ttl
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisTokenStore":
+        import redis  # optional dependency; only needed for the redis token cache
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        raw = self.client.get(self.prefix + key)
+        if not raw:
+            return None
+        d = json.loads(raw)
+        return d["token"], float(d["exp"])
+
+    def put(self, key: str, token: str, exp: float) -> None:
+        ttl = max(1, int(exp - time.time()))
+        self.client.set(self.prefix + key, json.dumps({"token": token, "exp": exp}), ex=ttl)
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        name = f"{self.prefix}{key}:lock"
+        token = secrets.token_hex(16)
+        # the lock expires on its own if its holder dies mid-refresh
+        while not self.client.set(name, token, nx=True, px=int(self.lock_ttl * 1000)):
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            self.client.eval(_RELEASE, 1, name, token)
+
+def store_from_url(url: Optional[str]) -> Optional[TokenStore]:
+    if not url:
+        return None
+    if url.startswith("file://"):
+        return FileTokenStore(url[len("file://"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisTokenStore.from_url(url)
+    raise ValueError(f"Unsupported TOKEN_CACHE: {url}")
+
+# (TOKEN_CACHE url, store)
+_store: Tuple[Optional[str], Optional[TokenStore]] = (None, None)
+
+def _get_store() -> Optional[TokenStore]:
+    global _store
+    url = os.getenv("TOKEN_CACHE") or None
+    if _store[0] != url:
+        _store = (url, store_from_url(url))
+    return _store[1]
+
+# ---------- metrics ----------
+_REFRESH_WINDOW = 600.0
+_refreshes: Dict[str, Deque[float]] = collections.defaultdict(collections.deque)
+_refresh_totals: Dict[str, int] = collections.Counter()
+
+def _record_refresh(label: str) -> None:
+    now = time.time()
+    q = _refreshes[label]
+    q.append(now)
+    while q and q[0] < now - _REFRESH_WINDOW:
+        q.popleft()
+    _refresh_totals[label] += 1
+    metrics.TOKEN_REFRESHES.inc(token=label)
+
+def token_metrics() -> Dict[str, Dict[str, float]]:
+    """Token refreshes done by this process, per label: total and per-minute over the last 10 min."""
+    now = time.time()
+    out = {}
+    for label, total in list(_refresh_totals.items()):
+        recent = sum(1 for t in list(_refreshes[label]) if t >= now - _REFRESH_WINDOW)
+        out[label] = {"refreshes": total, "refresh_per_min": round(recent / (_REFRESH_WINDOW / 60), 3)}
+    return out
+
+def credential_key(*parts: str) -> str:
+    """Stable cache key for a credential set; never puts the secrets themselves in a key."""
+    return hashlib.sha256("\x00".join(parts).encode()).hexdigest()[:32]
+
+# managers with a pending renewal timer
+_SCHEDULED: "weakref.WeakSet[TokenManager]" = weakref.WeakSet()
+
+def stop_renewals() -> None:
+    """Cancel every pending renewal timer (shutdown, tests); get() keeps refreshing lazily."""
+    for tm in list(_SCHEDULED):
+        timer = tm._timer
+        if timer is not None:
+            timer.cancel()
+
+class TokenManager:
+    def __init__(self, label: str, key: str, fetch: Fetch, store: Optional[TokenStore] = None):
+        self.label = label  # e.g. "amazon:lwa", for metrics
+        self.key = key
+        self.fetch = fetch
+        self._store = store
+        self._token: Optional[str] = None
+        self._exp = 0.0
+        self._lock = threading.Lock()  # held for the whole refresh
+        self._renewing = False
+        self._timer: Optional[threading.Timer] = None
+        self._renew_lock = threading.Lock()  # only guards _renewing, so get() never waits on a refresh
+
+    @property
+    def store(self) -> Optional[TokenStore]:
+        return self._store if self._store is not None else _get_store()
+
+    def _fresh(self, exp: float, margin: float) -> bool:
+        return time.time() < exp - margin
+
+    def get(self) -> str:
+        token, exp = self._token, self._exp
+        if token and self._fresh(exp, RENEW_AHEAD):
+            metrics.CACHE_REQUESTS.inc(cache=f"token:{self.label}", result="hit")
+            return token
+        if token and self._fresh(exp, EXPIRY_SKEW):
+            metrics.CACHE_REQUESTS.inc(cache=f"token:{self.label}", result="hit")
+            self._renew_in_background()
+            return token
+        metrics.CACHE_REQUESTS.inc(cache=f"token:{self.label}", result="miss")
+        with self._lock:
+            # whoever held the lock may have refreshed already
+            if self._token and self._fresh(self._exp, EXPIRY_SKEW):
+                return self._token
+            return self._refresh()
+
+    def _renew_in_background(self) -> None:
+        with self._renew_lock:
+            if self._renewing:
+                return
+            self._renewing = True
+
+        def run():
+            try:
+                with self._lock:
+                    if not self._fresh(self._exp, RENEW_AHEAD):
+                        self._refresh(renew=True)
+            except Exception:
+                pass  # the foreground path retries once the token really expires
+            finally:
+                self._renewing = False
+
+        threading.Thread(target=run, name=f"token-renew-{self.label}", daemon=True).start()
+
+    def _refresh(self, renew: bool = False) -> str:
+        """Called with self._lock held."""
+        store = self.store
+        if store is None:
+            return self._fetch()
+        margin = RENEW_AHEAD if renew else EXPIRY_SKEW
+        hit = store.get(self.key)
+        if hit and self._fresh(hit[1], margin):
+            self._set(*hit)
+            return self._token
+        with store.lock(self.key):
+            hit = store.get(self.key)  # another worker may have refreshed while we waited
+            if hit and self._fresh(hit[1], margin):
+                self._set(*hit)
+                return self._token
+            token = self._fetch()
+            store.put(self.key, token, self._exp)
+            return token
+
+    def _fetch(self) -> str:
+        token, expires_in = self.fetch()
+        _record_refresh(self.label)
+        self._set(token, time.time() + float(expires_in))
+        return token
+
+    def _set(self, token: str, exp: float) -> None:
+        """Called with self._lock held: install a token and schedule its renewal."""
+        self._token, self._exp = token, exp
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        delay = exp - RENEW_AHEAD - time.time()
+        if delay > 0:  # otherwise already inside the window: get() renews on the next call
+            self._timer = threading.Timer(delay, self._renew_in_background)
+            self._timer.name = f"token-timer-{self.label}"
+            self._timer.daemon = True
+            self._timer.start()
+            _SCHEDULED.add(self)
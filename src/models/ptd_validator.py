@@ -1,54 +1,110 @@
 from __future__ import annotations
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+import os
 import time
-import httpx
 from jsonschema import Draft201909Validator as Validator, exceptions as js_exc
+from rate_limit.limiter import send
+from channels.http import get_http
+from utils.cache import DiskCache, LRUCache, SingleFlight
+from utils import metrics
 
-# Simple in-memory cache (productType + marketplaceIds) for ~1 hour
-_CACHE: Dict[str, Dict[str, Any]] = {}
-_TTL = 3600
+# Two tiers, keyed by (host, marketplaceIds, productType):
+#   memory: LRU of {schema, etag, exp} plus the compiled validator
+#   disk:   PTD_CACHE_DIR (opt-in), survives restarts; revalidated with If-None-Match after PTD_TTL
+_TTL = int(os.getenv("PTD_TTL", "3600"))
+# unknown product types are remembered too, so a bad column doesn't cost one call per item
+_NEG_TTL = 300
+_CACHE = LRUCache(int(os.getenv("PTD_CACHE_SIZE", "256")))
+_INFLIGHT = SingleFlight()
+# (PTD_CACHE_DIR, disk tier); no disk tier unless the directory is configured
+_disk_tier: Tuple[Optional[str], Optional[DiskCache]] = (None, None)
+
+def _disk() -> Optional[DiskCache]:
+    global _disk_tier
+    root = os.getenv("PTD_CACHE_DIR") or None
+    if _disk_tier[0] != root:
+        _disk_tier = (root, DiskCache(root) if root else None)
+    return _disk_tier[1]
+
+class UnknownProductType(Exception):
+    pass
 
 def _cache_key(host: str, mids: List[str], product_type: str) -> str:
     mids_key = ",".join(sorted(mids))
     return f"{host}|{mids_key}|{product_type}"
 
-def _get_cached(key: str) -> Dict[str, Any] | None:
-    v = _CACHE.get(key)
-    if v and time.time() < v.get("_exp", 0):
-        return v["schema"]
-    return None
-
-def _put_cache(key: str, schema: Dict[str, Any]) -> None:
-    _CACHE[key] = {"schema": schema, "_exp": time.time() + _TTL}
-
-def fetch_ptd_schema(host: str, marketplace_ids: List[str], access_token: str, product_type: str) -> Dict[str, Any]:
-    """
-    Calls Product Type Definitions: GET /definitions/2020-09-01/productTypes/{productType}
-    Returns the JSON Schema describing the 'attributes' object for that product type.
-    """
-    key = _cache_key(host, marketplace_ids, product_type)
-    cached = _get_cached(key)
-    if cached:
-        return cached
-
+def _fetch(host: str, marketplace_ids: List[str], access_token: str, product_type: str, etag: Optional[str]):
     url = f"{host.rstrip('/')}/definitions/2020-09-01/productTypes/{product_type}"
     headers = {
         "x-amz-access-token": access_token,  # LWA token (no SigV4 needed)
         "accept": "application/json",
         "user-agent": "market-translator/0.1 (Language=Python)",
     }
+    if etag:
+        headers["if-none-match"] = etag
     params = {
         "marketplaceIds": ",".join(marketplace_ids),
         "requirements": "LISTING",
     }
-    with httpx.Client(timeout=15.0) as http:
-        r = http.get(url, headers=headers, params=params)
+    http = get_http()
+    return send("amazon", "getDefinitionsProductType", lambda: http.get(url, headers=headers, params=params, timeout=15.0))
+
+def _load(key: str, host: str, marketplace_ids: List[str], access_token: str, product_type: str) -> Dict[str, Any]:
+    """Memory miss: try disk, then (re)validate against the API. Runs once per key at a time."""
+    entry = _CACHE.get(key)
+    if entry and time.time() < entry["exp"]:
+        return entry  # filled by the call we were coalesced behind
+    tier = _disk()
+    disk = tier.get(key) if tier is not None else None  # maybe fresher: another worker or an earlier run
+    if disk and time.time() < disk["exp"]:
+        _CACHE.put(key, disk)
+        return disk
+    entry = disk or entry
+
+    etag = entry.get("etag") if entry and entry.get("schema") is not None else None
+    r = _fetch(host, marketplace_ids, access_token, product_type, etag)
+    if r.status_code == 304 and entry:
+        entry = {**entry, "exp": time.time() + _TTL}
+    elif r.status_code == 404:
+        entry = {"schema": None, "etag": None, "exp": time.time() + _NEG_TTL}
+    else:
         r.raise_for_status()
         data = r.json()
-    # PTD response includes a 'schema' object — we’ll validate against this.
-    schema = data.get("schema") or data
-    _put_cache(key, schema)
-    return schema
+        # PTD response includes a 'schema' object — we’ll validate against this.
+        entry = {"schema": data.get("schema") or data, "etag": r.headers.get("etag"), "exp": time.time() + _TTL}
+    if tier is not None:
+        tier.put(key, {k: v for k, v in entry.items() if k != "validator"})
+    _CACHE.put(key, entry)
+    return entry
+
+def _entry(host: str, marketplace_ids: List[str], access_token: str, product_type: str) -> Dict[str, Any]:
+    key = _cache_key(host, marketplace_ids, product_type)
+    entry = _CACHE.get(key)
+    if entry and time.time() < entry["exp"]:
+        metrics.CACHE_REQUESTS.inc(cache="ptd", result="hit")
+        return entry
+    metrics.CACHE_REQUESTS.inc(cache="ptd", result="miss")
+    return _INFLIGHT.do(key, lambda: _load(key, host, marketplace_ids, access_token, product_type))
+
+def fetch_ptd_schema(host: str, marketplace_ids: List[str], access_token: str, product_type: str) -> Dict[str, Any]:
+    """
+    Calls Product Type Definitions: GET /definitions/2020-09-01/productTypes/{productType}
+    Returns the JSON Schema describing the 'attributes' object for that product type.
+    """
+    entry = _entry(host, marketplace_ids, access_token, product_type)
+    if entry["schema"] is None:
+        raise UnknownProductType(product_type)
+    return entry["schema"]
+
+def get_validator(host: str, marketplace_ids: List[str], access_token: str, product_type: str) -> Validator:
+    """Compiled validator, built once per cached schema."""
+    entry = _entry(host, marketplace_ids, access_token, product_type)
+    if entry["schema"] is None:
+        raise UnknownProductType(product_type)
+    v = entry.get("validator")
+    if v is None:
+        v = entry["validator"] = Validator(entry["schema"])
+    return v
 
 def _format_error(e: js_exc.ValidationError) -> str:
     """
@@ -82,20 +138,29 @@ def validate_attributes_with_ptd(
     access_token: str,
     product_type: str,
     attributes: Dict[str, Any],
+    check_schema: bool = True,
 ) -> Tuple[bool, List[str]]:
     """
     Standard JSON Schema validation ONLY (ignores Amazon's custom vocabulary),
     which already catches most structural issues before you call Listings Items.
+    With check_schema=False only the product type's existence is checked.
     """
     try:
-        schema = fetch_ptd_schema(host, marketplace_ids, access_token, product_type)
+        validator = get_validator(host, marketplace_ids, access_token, product_type)
+    except UnknownProductType:
+        return False, [f"productType:unsupported:{product_type}"]
+    except js_exc.SchemaError:
+        return True, []
     except Exception as ex:
+        if not check_schema:
+            return True, []  # transport trouble; let the upsert surface real issues
         # If schema fetch fails, don't block — return a transport diagnostic and let API handle it.
         return False, [f"ptd_fetch:{type(ex).__name__}"]
+    if not check_schema:
+        return True, []
 
     try:
         # PTD schema describes the 'attributes' object directly.
-        validator = Validator(schema)
         errors = sorted(validator.iter_errors(attributes), key=lambda e: e.path)
         if not errors:
             return True, []
@@ -0,0 +1,353 @@
+"""
+Opt-in columnar map + validate engine (extra={"engine": "columnar"}).
+
+Loads CSV catalog chunks as pandas DataFrames and applies the YAML mapping,
+the `normalize_title_desc` cleanups and `validate_node` checks column by
+column: whitespace, price and length rules are pandas `.str` / `to_numeric`
+operations, checks are combined as numpy boolean masks, and the parsers that
+build per-row objects (bullets, specifics) run once per distinct value.
+Output is the same TranslatedItem/Reject/error list the row path produces.
+
+With pyarrow installed (`pip install .[columnar]`) cells are Arrow strings and
+the `.str` ops run in Arrow compute; without it the same code runs on object
+columns, correct but several times slower.
+"""
+import ast
+import csv
+import json
+import os
+import re
+from functools import partial
+from itertools import compress
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pipeline.state import ITEM_FIELDS, Item, TranslatedItem, Reject
+from pipeline.nodes.validate import REQUIRED
+from schema.mapping import loader as mapping_loader
+
+try:
+    import pyarrow  # optional dependency (.[columnar])
+    STRING = pd.ArrowDtype(pyarrow.string())
+except ImportError:
+    pyarrow = None
+    STRING = object
+
+# CSV columns the row loader lifts out of `attributes` into Item fields
+_ITEM_COLUMNS = {"id", "sku", "ID", "title", "description"}
+_PRICE_JUNK = r"[^\d.\-]"
+_TITLE_MAX = 200
+_BULLETS_MAX = 5
+# exactly what str.split()/str.strip() treat as whitespace (Arrow's and RE2's \s differ)
+_WS_CHARS = "".join(c for c in map(chr, range(0x3001)) if c.isspace())
+_WS_RUN = f"[{_WS_CHARS}]+"
+# anything " ".join(v.split()) would change after stripping
+_WS_IRREGULAR = f"[{_WS_CHARS.replace(' ', '')}]|  "
+
+def _rule_source(rule: Any) -> Tuple[Any, Any]:
+    if isinstance(rule, str):
+        return rule, ""
+    if isinstance(rule, dict):
+        return rule.get("source"), rule.get("default", "")
+    return None, ""
+
+def supports(channel: str, catalog_path: str, extra: Dict[str, Any]) -> bool:
+    """CSV catalogs whose mapping only reads plain columns / title / description / id."""
+    if os.path.splitext(catalog_path)[1].lower() != ".csv":
+        return False
+    if (extra or {}).get("input_format") == "spapi-jsonl":
+        return False
+    mapping, _ = mapping_loader.get_mapping(channel)
+    for rule in mapping.values():
+        src, _ = _rule_source(rule)
+        # getattr() fallbacks onto Item methods/"attributes" only make sense row by row
+        if isinstance(src, str) and src not in ITEM_FIELDS and hasattr(Item, src):
+            return False
+        if src == "attributes":
+            return False
+    return True
+
+def _read_arrow(path: str) -> Optional[pd.DataFrame]:
+    """Whole file through Arrow's multithreaded reader, every column typed as string; None if it can't parse it."""
+    from pyarrow import csv as pacsv
+
+    with open(path, newline="", encoding="utf-8") as f:
+        names = next(csv.reader(f), [])
+    convert = pacsv.ConvertOptions(
+        column_types={n: pyarrow.string() for n in names},
+        null_values=[], strings_can_be_null=False, quoted_strings_can_be_null=False,
+    )
+    try:
+        table = pacsv.read_csv(path, parse_options=pacsv.ParseOptions(newlines_in_values=True), convert_options=convert)
+    except pyarrow.ArrowInvalid:  # e.g. ragged rows, which pandas pads
+        return None
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+def iter_frames(path: str, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    # keep every cell a plain string, exactly what csv.DictReader hands the row path
+    kw = dict(dtype=STRING, keep_default_na=False, na_filter=False)
+    if chunk_size:
+        yield from pd.read_csv(path, chunksize=chunk_size, **kw)
+        return
+    df = _read_arrow(path) if pyarrow is not None else None
+    yield df if df is not None else pd.read_csv(path, **kw)
+
+# ---------- mapping ----------
+def _strings(col: pd.Series) -> bool:
+    """All cells are str, so the .str ops apply (YAML defaults can mix in other types)."""
+    if pyarrow is not None and col.dtype == STRING:
+        return True
+    return pd.api.types.infer_dtype(col, skipna=False) in ("string", "empty")
+
+def _objects(col: pd.Series) -> pd.Series:
+    # Series.astype(object)/tolist() box Arrow cells one by one; to_numpy converts in bulk
+    return pd.Series(col.to_numpy(dtype=object), dtype=object)
+
+def _ids(df: pd.DataFrame, start: int) -> List[str]:
+    ids = pd.Series([""] * len(df), dtype=object)
+    for c in ("id", "sku", "ID"):
+        if c in df.columns:
+            ids = ids.mask(ids == "", _objects(df[c]))
+    out = ids.tolist()
+    for i in np.flatnonzero(ids.to_numpy() == ""):
+        out[i] = str(start + i + 1)
+    return out
+
+def _source_column(df: pd.DataFrame, ids: List[str], src: Any, default: Any) -> pd.Series:
+    n = len(df)
+    if src in ("title", "description"):
+        return df[src].reset_index(drop=True) if src in df.columns else pd.Series([""] * n, dtype=STRING)
+    if src == "id":
+        return pd.Series(ids, dtype=object)
+    if not isinstance(src, str) or src in _ITEM_COLUMNS or src not in df.columns:
+        return pd.Series([default] * n, dtype=object)
+    col = df[src].reset_index(drop=True)
+    if isinstance(default, str) and default == "":
+        return col
+    if not isinstance(default, str):
+        col = _objects(col)
+    return col.mask(col == "", default)
+
+# ---------- normalization (mirrors models.hf_models.normalize_title_desc) ----------
+def _literal(v: str) -> Any:
+    """ast.literal_eval(v), with cheap exact answers for the common catalog shapes."""
+    head = v.lstrip(" \t")[:1]
+    if head.isidentifier() and head not in "NTFbBrRuU":
+        # plain text: a bare name, which literal_eval rejects after a full compile
+        raise ValueError(v)
+    if head == "[" and "\\" not in v:
+        # without escapes, a JSON list of strings (or a '...' one with the quotes swapped) reads the same
+        for doc in [v] if '"' in v else [v, v.replace("'", '"')]:
+            try:
+                lit = json.loads(doc)
+            except ValueError:
+                continue
+            if isinstance(lit, list) and all(isinstance(x, str) for x in lit):
+                return lit
+    return ast.literal_eval(v)
+
+def _bullets(bp: Any) -> Any:
+    if isinstance(bp, str):
+        try:
+            lit = _literal(bp)
+            if isinstance(lit, (list, tuple)):
+                bp = list(dict.fromkeys(str(x).strip() for x in lit if str(x).strip()))
+        except Exception:
+            parts = [p.strip() for p in bp.split(";") if p.strip()]
+            bp = list(dict.fromkeys(parts)) if parts else bp
+    if isinstance(bp, (list, tuple)):
+        return list(bp)[:_BULLETS_MAX]
+    return bp
+
+def _specifics(specs: Any) -> Any:
+    if not (isinstance(specs, str) and specs.strip()):
+        return specs
+    d = {}
+    for pair in specs.split(";"):
+        if ":" in pair:
+            k, v = pair.split(":", 1)
+            k, v = k.strip(), v.strip()
+            if k:
+                d[k] = v
+    return d or specs
+
+def _per_distinct(col: pd.Series, fn) -> Tuple[List[Any], np.ndarray, List[Any]]:
+    """fn over the distinct cells only -> (row values, codes, per-distinct results); rows never share lists/dicts."""
+    try:
+        codes, uniques = pd.factorize(col, use_na_sentinel=False)
+    except TypeError:  # unhashable default from YAML
+        parsed = [fn(v) for v in col]
+        return parsed, np.arange(len(parsed)), parsed
+    parsed = [fn(v) for v in uniques]
+    rows = [parsed[c] for c in codes.tolist()]
+    return [r.copy() if isinstance(r, (list, dict)) else r for r in rows], codes, parsed
+
+def _collapse_ws(col: pd.Series) -> pd.Series:
+    """" ".join(v.split()) on a string column; only rows with irregular whitespace go through the regex."""
+    col = col.str.strip(_WS_CHARS)
+    irregular = col.str.contains(_WS_IRREGULAR, regex=True).to_numpy(dtype=bool)
+    if irregular.any():
+        col = col.copy()
+        col[irregular] = col[irregular].str.replace(_WS_RUN, " ", regex=True)
+    return col
+
+def _price(col: pd.Series) -> pd.Series:
+    """Strip currency junk and format as 0.00; unparseable cells stay as they were."""
+    if not _strings(col):
+        return col.map(_price_one)
+    cleaned = col.str.replace(_PRICE_JUNK, "", regex=True)
+    vals = np.array(pd.to_numeric(cleaned, errors="coerce"), dtype=np.float64)
+    # the row path's rules for the rare rest: unparseable cells, Unicode digits
+    # (RE2's \d is ASCII-only), and >15 digits where to_numeric isn't correctly rounded
+    exact = np.isnan(vals) | ~col.str.isascii().to_numpy(dtype=bool) \
+        | (cleaned.str.len().to_numpy(dtype=np.int64) > 15)
+    ok = ~exact
+    out = _objects(col).copy()
+    if ok.any():
+        # each distinct price is formatted once (keyed on the bits, so -0.0 stays "-0.00")
+        codes, uniques = pd.factorize(vals[ok].view(np.int64))
+        out[ok] = np.array(["%.2f" % v for v in uniques.view(np.float64).tolist()], dtype=object)[codes]
+    for i in np.flatnonzero(exact):
+        out.iat[i] = _price_one(col.iat[i])
+    # still all str: keep the column's dtype so the blank check stays vectorized
+    return out.astype(col.dtype) if pyarrow is not None and col.dtype == STRING else out
+
+def _price_one(raw: Any) -> Any:
+    if raw is None:
+        return raw
+    try:
+        return f"{float(re.sub(_PRICE_JUNK, '', str(raw))):.2f}"
+    except Exception:
+        return raw
+
+def _normalize(cols: Dict[Any, pd.Series], n: int) -> Dict[Any, np.ndarray]:
+    """Normalize in place; returns the bullet counts the validator needs."""
+    title = cols.get("title", pd.Series([""] * n, dtype=STRING))
+    cols["title"] = _collapse_ws(title).str.slice(0, _TITLE_MAX)
+    desc = cols.get("description", pd.Series([""] * n, dtype=STRING))
+    cols["description"] = desc.str.strip(_WS_CHARS)
+    counts: Dict[Any, np.ndarray] = {}
+    if "bullet_points" in cols:
+        rows, codes, parsed = _per_distinct(cols["bullet_points"], _bullets)
+        cols["bullet_points"] = rows
+        sizes = np.fromiter((len(p) if isinstance(p, list) else 0 for p in parsed), dtype=np.int64, count=len(parsed))
+        counts["bullet_points"] = sizes[codes]
+    if "price" in cols:
+        cols["price"] = _price(cols["price"])
+    if "specifics" in cols:
+        cols["specifics"] = _per_distinct(cols["specifics"], _specifics)[0]
+    if "brand" in cols and _strings(cols["brand"]):
+        cols["brand"] = cols["brand"].str.strip(_WS_CHARS)
+    return counts
+
+# ---------- validation (mirrors pipeline.nodes.validate) ----------
+def _blank(col: Any) -> np.ndarray:
+    """None or whitespace-only str, like _missing_fields."""
+    col = col if isinstance(col, pd.Series) else pd.Series(col, dtype=object)
+    if _strings(col):
+        return col.str.strip(_WS_CHARS).eq("").to_numpy(dtype=bool)
+    return np.fromiter((v is None or (isinstance(v, str) and not v.strip()) for v in col), dtype=bool, count=len(col))
+
+def _float_one(v: Any) -> Optional[float]:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+def _as_float(col: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """float(v) per cell, NaN where it raises: to_numeric for the bulk, float() for what it rejects ("nan", "1_0", " 5 ")."""
+    col = _objects(col)
+    vals = np.array(pd.to_numeric(col, errors="coerce"), dtype=np.float64)
+    parsed = ~np.isnan(vals)
+    for i in np.flatnonzero(~parsed):
+        f = _float_one(col.iat[i])
+        if f is not None:
+            vals[i] = f
+            parsed[i] = True
+    return vals, parsed
+
+def _validate(cols: Dict[Any, Any], counts: Dict[Any, np.ndarray], channel: str, n: int) -> Dict[int, List[str]]:
+    """Row index -> errors, for the failing rows only."""
+    req = REQUIRED.get(channel, ["title"])
+
+    missing = np.ones((len(req), n), dtype=bool)
+    for j, f in enumerate(req):
+        if f in cols:
+            missing[j] = _blank(cols[f])
+    any_missing = missing.any(axis=0)
+
+    if "price" in cols:
+        vals, parsed = _as_float(cols["price"])
+    else:
+        vals, parsed = np.full(n, np.nan), np.zeros(n, dtype=bool)
+    not_numeric = ~parsed
+    with np.errstate(invalid="ignore"):
+        not_positive = vals <= 0  # NaN compares False, same as the row path
+
+    tlen = cols["title"].str.len().to_numpy(dtype=np.int64)
+    title_empty = tlen == 0
+    title_long = tlen > _TITLE_MAX
+
+    blen = counts.get("bullet_points") if channel == "amazon" else None
+    if blen is None:
+        blen = np.zeros(n, dtype=np.int64)
+    too_many = blen > _BULLETS_MAX
+
+    bad = any_missing | not_numeric | not_positive | title_empty | title_long | too_many
+    out: Dict[int, List[str]] = {}
+    for i in np.flatnonzero(bad).tolist():
+        errs = out[i] = []
+        if any_missing[i]:
+            errs.append("missing:" + ",".join(f for j, f in enumerate(req) if missing[j, i]))
+        if not_numeric[i]:
+            errs.append("price:not_numeric")
+        elif not_positive[i]:
+            errs.append("price:not_positive")
+        if title_empty[i]:
+            errs.append("title:empty")
+        elif title_long[i]:
+            errs.append(f"title:too_long({tlen[i]}>{_TITLE_MAX})")
+        if too_many[i]:
+            errs.append(f"bullet_points:too_many({blen[i]}>{_BULLETS_MAX})")
+    return out
+
+def translate_frame(
+    df: pd.DataFrame, channel: str, start: int = 0
+) -> Tuple[List[TranslatedItem], List[TranslatedItem], List[Reject], List[str]]:
+    """
+    Map + normalize + validate one catalog chunk.
+    `start` is the number of rows before this chunk (for generated row-number ids).
+    Returns (mapped, valid, rejects, errors) exactly like map_schema_node + validate_node.
+    """
+    n = len(df)
+    channel = (channel or "").lower()
+    mapping, _ = mapping_loader.get_mapping(channel)
+    ids = _ids(df, start)
+
+    cols: Dict[Any, Any] = {}
+    for target_field, rule in mapping.items():
+        if isinstance(rule, (str, dict)):
+            src, default = _rule_source(rule)
+            cols[target_field] = _source_column(df, ids, src, default)
+        else:
+            cols[target_field] = pd.Series([""] * n, dtype=object)
+    counts = _normalize(cols, n)
+    item_errs = _validate(cols, counts, channel, n)
+
+    keys = list(cols.keys())
+    values = [c.to_numpy(dtype=object).tolist() if isinstance(c, pd.Series) else c for c in cols.values()]
+    # building the records is the floor: one payload dict per row, no per-row branching
+    mapped = list(map(TranslatedItem, ids, map(dict, map(partial(zip, keys), zip(*values)))))
+    rejects: List[Reject] = []
+    errors: List[str] = []
+    for i, errs in item_errs.items():
+        t = mapped[i]
+        errors.append(f"{t.id}: " + "; ".join(errs))
+        rejects.append(Reject(t.id, errs, t.channel_payload))
+    if not item_errs:
+        return mapped, list(mapped), rejects, errors
+    keep = np.ones(n, dtype=bool)
+    keep[list(item_errs)] = False
+    return mapped, list(compress(mapped, keep.tolist())), rejects, errors
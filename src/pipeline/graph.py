@@ -1,16 +1,37 @@
 import csv
-import json, os
-from typing import Dict, Any, List
+import functools
+import json
+import os
+import sys
+import time
+from itertools import islice
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
 from langgraph.graph import StateGraph, END
-from .state import PipelineState, Item, TranslatedItem
-from .nodes.map_schema import map_schema_node
-from .nodes.validate import validate_node
-from .nodes.plan_batches import plan_batches_node
-from .nodes.upsert import throttle_and_upsert_node
-from .nodes.reconcile import reconcile_node
+from pipeline.state import PREVIEW_SIZE, PipelineState, Item, as_dict
+from pipeline.nodes.map_schema import map_schema_node
+from pipeline.nodes.validate import validate_node
+from pipeline.nodes.plan_batches import plan_batches_node
+from pipeline.nodes.upsert import bulk_buffer, throttle_and_upsert_node
+from pipeline.nodes.reconcile import reconcile_node
+from pipeline import columnar
+from utils import metrics, profiling
 
-def _load_items(path: str) -> List[Item]:
-    out: List[Item] = []
+# Items per chunk when streaming (extra={"stream": true, "chunk_size": N})
+DEFAULT_CHUNK_SIZE = 1000
+
+def _stream_caps() -> Tuple[int, int]:
+    """Error strings / rejects a streamed run keeps (STREAM_MAX_ERRORS, STREAM_MAX_REJECTS); counts stay exact."""
+    return int(os.getenv("STREAM_MAX_ERRORS", "1000")), int(os.getenv("STREAM_MAX_REJECTS", "1000"))
+
+def resolve_chunk_size(extra: Optional[Dict[str, Any]]) -> int:
+    """Items per streamed chunk. Raises ValueError for a malformed `chunk_size` (the routers answer 400)."""
+    v = (extra or {}).get("chunk_size") or DEFAULT_CHUNK_SIZE
+    try:
+        return max(1, int(v))
+    except (TypeError, ValueError):
+        raise ValueError(f"chunk_size must be an integer, got {v!r}") from None
+
+def _iter_items(path: str) -> Iterator[Item]:
     ext = os.path.splitext(path)[1].lower()
     if ext == ".jsonl":
         with open(path, "r", encoding="utf-8") as f:
@@ -26,29 +47,61 @@ def _load_items(path: str) -> List[Item]:
                     title = obj.get("attributes",{}).get("item_name",[{}])[0].get("value","") or ""
                 except Exception:
                     pass
-                out.append(Item(id=sku, title=title, description="", attributes=obj))
-        return out
-    
+                yield Item(id=sku, title=title, description="", attributes=obj)
+        return
+
     with open(path, newline='', encoding='utf-8') as f:
         reader = csv.DictReader(f)
-        for row in reader:
-            out.append(Item(
-                id=row.get("id") or row.get("sku") or row.get("ID") or str(len(out)+1),
+        for n, row in enumerate(reader, 1):
+            yield Item(
+                id=row.get("id") or row.get("sku") or row.get("ID") or str(n),
                 title=row.get("title", ""),
                 description=row.get("description", ""),
                 attributes={k: v for k, v in row.items() if k not in {"id","sku","ID","title","description"}}
-            ))
-    return out
+            )
+
+def _load_items(path: str) -> List[Item]:
+    return list(_iter_items(path))
 
-def build_graph():
+def _iter_chunks(path: str, chunk_size: int) -> Iterator[List[Item]]:
+    # Lazily slice the reader so only one chunk of Items is alive at a time
+    items = _iter_items(path)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _timed(name: str, node):
+    @functools.wraps(node)
+    def run(state):
+        t0 = time.perf_counter()
+        try:
+            return node(state)
+        finally:
+            metrics.NODE_SECONDS.observe(time.perf_counter() - t0, node=name)
+    return run
+
+# the pipeline is a straight chain; both executors run these in order
+NODES = [
+    ("map_schema", map_schema_node),
+    ("validate", validate_node),
+    ("plan_batches", plan_batches_node),
+    ("throttle_and_upsert", throttle_and_upsert_node),
+    ("reconcile", reconcile_node),
+]
+
+def _node(name: str, fn, profile: bool):
+    fn = _timed(name, fn)
+    # profiling wrappers only exist in graphs built for a profiled run
+    return profiling.wrap_node(name, fn) if profile else fn
+
+def build_graph(entry: str = "map_schema", profile: bool = False):
     g = StateGraph(PipelineState)
-    g.add_node("map_schema", map_schema_node)
-    g.add_node("validate", validate_node)
-    g.add_node("plan_batches", plan_batches_node)
-    g.add_node("throttle_and_upsert", throttle_and_upsert_node)
-    g.add_node("reconcile", reconcile_node)
+    for name, fn in NODES:
+        g.add_node(name, _node(name, fn, profile))
 
-    g.set_entry_point("map_schema")
+    g.set_entry_point(entry)
     g.add_edge("map_schema", "validate")
     g.add_edge("validate", "plan_batches")
     g.add_edge("plan_batches", "throttle_and_upsert")
@@ -57,39 +110,196 @@ def build_graph():
 
     return g.compile()
 
-def run_pipeline(channel: str, catalog_path: str, batch_size: int, dry_run: bool, extra: Dict[str, Any]):
-    items = _load_items(catalog_path)
-    state = PipelineState(
-        channel=channel,
-        catalog_path=catalog_path,
-        batch_size=batch_size,
-        dry_run=dry_run,
-        items=items,
-    )
-    app = build_graph()
-    result = app.invoke(state)
-
-    # NEW: LangGraph may return a dict; coerce to PipelineState for attribute access
-    final_state = PipelineState(**result) if isinstance(result, dict) else result
-
-    preview = [
-        (m.model_dump() if hasattr(m, "model_dump") else m)
-        for m in final_state.mapped[: min(5, len(final_state.mapped))]
-    ]
-    return {
+class InlineChain:
+    """
+    The same node chain called directly: one PipelineState object is handed from node to
+    node by reference, with no per-step channel copies, checkpoint bookkeeping or
+    dict round-trip. Has the compiled graph's invoke() so run_pipeline can use either.
+    """
+
+    def __init__(self, entry: str = "map_schema", profile: bool = False):
+        names = [name for name, _ in NODES]
+        self.steps = [_node(name, fn, profile) for name, fn in NODES[names.index(entry):]]
+
+    def invoke(self, state: PipelineState) -> PipelineState:
+        for step in self.steps:
+            state = step(state)
+        return state
+
+# (entry, profile, executor) -> compiled graph / chain; compiling costs more than a small run
+_GRAPHS: Dict[Tuple[str, bool, str], Any] = {}
+
+def _executor(extra: Optional[Dict[str, Any]]) -> str:
+    v = ((extra or {}).get("executor") or os.getenv("PIPELINE_EXECUTOR") or "langgraph").lower()
+    return "inline" if v == "inline" else "langgraph"
+
+def get_graph(entry: str = "map_schema", profile: bool = False, executor: str = "langgraph"):
+    """Process-wide compiled graph (or inline chain); built once per key, safe to share across threads."""
+    key = (entry, profile, executor)
+    app = _GRAPHS.get(key)
+    if app is None:
+        app = InlineChain(entry, profile) if executor == "inline" else build_graph(entry, profile)
+        app = _GRAPHS.setdefault(key, app)
+    return app
+
+def _row_states(
+    channel: str, catalog_path: str, batch_size: int, dry_run: bool, extra: Dict[str, Any], chunk_size: int
+) -> Iterator[Tuple[int, PipelineState]]:
+    chunks = _iter_chunks(catalog_path, chunk_size) if chunk_size else [_load_items(catalog_path)]
+    for items in chunks:
+        yield len(items), PipelineState(
+            channel=channel,
+            catalog_path=catalog_path,
+            batch_size=batch_size,
+            dry_run=dry_run,
+            extra=extra,
+            items=items,
+        )
+
+def _columnar_states(
+    channel: str, catalog_path: str, batch_size: int, dry_run: bool, extra: Dict[str, Any], chunk_size: int
+) -> Iterator[Tuple[int, PipelineState]]:
+    # map + validate happen column-wise; the graph picks up at plan_batches
+    start = 0
+    for df in columnar.iter_frames(catalog_path, chunk_size or None):
+        with metrics.NODE_SECONDS.time(node="columnar_translate"):
+            mapped, valid, rejects, errors = columnar.translate_frame(df, channel, start)
+        start += len(df)
+        yield len(df), PipelineState(
+            channel=channel,
+            catalog_path=catalog_path,
+            batch_size=batch_size,
+            dry_run=dry_run,
+            extra=extra,
+            valid=valid,
+            n_mapped=len(mapped),
+            n_valid=len(valid),
+            preview=mapped[:PREVIEW_SIZE],
+            rejects=rejects,
+            errors=errors,
+        )
+
+def _buffered(states: Iterator[Tuple[int, PipelineState]], bulk) -> Iterator[Tuple[int, PipelineState]]:
+    """Share the run's bulk buffer with every chunk; reads one chunk ahead to flag the last."""
+    prev = None
+    for n, state in states:
+        state.bulk, state.last_chunk = bulk, False
+        if prev is not None:
+            yield prev
+        prev = (n, state)
+    if prev is not None:
+        prev[1].last_chunk = True
+        yield prev
+
+def run_pipeline(
+    channel: str,
+    catalog_path: str,
+    batch_size: int,
+    dry_run: bool,
+    extra: Dict[str, Any],
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+):
+    """
+    `on_progress(counts)` runs after every chunk (once without streaming); an exception
+    raised from it (e.g. a job cancellation) stops the run between chunks.
+    """
+    extra = extra or {}
+    # Streaming mode: run the graph per chunk and keep only counters plus the first
+    # errors/rejects, so memory stays flat and upserts start after the first chunk is parsed.
+    chunk_size = resolve_chunk_size(extra) if extra.get("stream") else 0
+    max_errors, max_rejects = _stream_caps() if chunk_size else (sys.maxsize, sys.maxsize)
+
+    prof = profiling.start(extra)
+    executor = _executor(extra)
+    if extra.get("engine") == "columnar" and columnar.supports(channel, catalog_path, extra):
+        states = _columnar_states(channel, catalog_path, batch_size, dry_run, extra, chunk_size)
+        app = get_graph(entry="plan_batches", profile=prof is not None, executor=executor)
+        read_stage = "read_catalog+columnar_translate"
+    else:
+        states = _row_states(channel, catalog_path, batch_size, dry_run, extra, chunk_size)
+        app = get_graph(profile=prof is not None, executor=executor)
+        read_stage = "read_catalog"
+    bulk = bulk_buffer(channel, dry_run, extra)
+    if bulk is not None:
+        states = _buffered(states, bulk)
+    if prof is not None:
+        states = prof.iterate(read_stage, states)
+        token = prof.start()
+
+    counts = {
+        "input_items": 0, "mapped": 0, "valid": 0, "changed": 0, "skipped": 0,
+        "batches": 0, "upserted": 0, "errors": 0,
+    }
+    preview: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    rejects: List[Dict[str, Any]] = []
+    n_rejected = 0
+
+    metrics.PIPELINE_RUNS.inc(channel=channel)
+    try:
+        for n_input, state in states:
+            result = app.invoke(state)
+
+            # LangGraph returns the channel values as a dict (rewrapping copies no records);
+            # the inline chain returns the state itself
+            final_state = PipelineState(**result) if isinstance(result, dict) else result
+
+            chunk = {
+                "input_items": n_input,
+                "mapped": final_state.n_mapped,
+                "valid": final_state.n_valid,
+                "changed": final_state.changed,
+                "skipped": final_state.skipped,
+                "batches": len(final_state.batches),
+                "upserted": len(final_state.upserted_ids),
+                "errors": len(final_state.errors),
+            }
+            for k, v in chunk.items():
+                counts[k] += v
+                if v and k != "batches":
+                    # dry-run "upserts" are not accepted listings
+                    stage = "dry_run" if k == "upserted" and dry_run else k
+                    metrics.PIPELINE_ITEMS.inc(v, channel=channel, stage=stage)
+            if final_state.rejects:
+                metrics.PIPELINE_ITEMS.inc(len(final_state.rejects), channel=channel, stage="rejected")
+            if len(preview) < PREVIEW_SIZE:
+                preview.extend(as_dict(m) for m in final_state.preview[: PREVIEW_SIZE - len(preview)])
+            errors.extend(final_state.errors[: max_errors - len(errors)])
+            n_rejected += len(final_state.rejects)
+            keep = final_state.rejects[: max_rejects - len(rejects)]
+            rejects.extend(as_dict(r) for r in keep)
+            if on_progress is not None:
+                on_progress(dict(counts))
+    finally:
+        summary = prof.finish(token) if prof is not None else None
+
+    result = {
         "channel": channel,
-        "counts": {
-            "input_items": len(items),
-            "mapped": len(final_state.mapped),
-            "valid": len(final_state.valid),
-            "batches": len(final_state.batches),
-            "upserted": len(final_state.upserted_ids),
-            "errors": len(final_state.errors),
-        },
+        "counts": counts,
         "preview_mapped": preview,
-        "errors": final_state.errors,
-        "rejects": [
-            (r.model_dump() if hasattr(r, "model_dump") else r)
-            for r in getattr(final_state, "rejects", [])
-        ],
+        "errors": errors,
+        "rejects": rejects,
+        "rejected": n_rejected,
+        "errors_truncated": counts["errors"] > len(errors),
+        "rejects_truncated": n_rejected > len(rejects),
     }
+    if summary is not None:
+        result["profile"] = summary
+    return result
+
+def collect_rejects(channel: str, catalog_path: str, extra: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Rejects only: map + validate every chunk, no batching or (dry-run) upserts.
+    Honors `engine`, `workers` and `chunk_size` like run_pipeline; always streams.
+    """
+    extra = extra or {}
+    chunk_size = resolve_chunk_size(extra)
+    rejects: List[Dict[str, Any]] = []
+    if extra.get("engine") == "columnar" and columnar.supports(channel, catalog_path, extra):
+        for _, state in _columnar_states(channel, catalog_path, 0, True, extra, chunk_size):
+            rejects.extend(as_dict(r) for r in state.rejects)
+        return rejects
+    for _, state in _row_states(channel, catalog_path, 0, True, extra, chunk_size):
+        state = validate_node(map_schema_node(state))
+        rejects.extend(as_dict(r) for r in state.rejects)
+    return rejects
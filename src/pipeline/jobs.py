@@ -0,0 +1,138 @@
+"""
+Background execution of translate runs.
+
+Jobs are persisted in storage.db (status, live counts, errors, result) and run on a
+bounded worker pool owned by this process, so a million-item upsert neither holds an
+HTTP request open nor eats the API's threadpool.
+
+  JOB_WORKERS     (2)    jobs running at once
+  JOB_MAX_QUEUED  (20)   queued + running jobs accepted before submit is refused
+  JOB_MAX_ERRORS  (1000) error strings kept per job (counts stay exact)
+
+Jobs stream their catalog (extra["stream"] defaults to true) so progress is reported
+and cancellation is honored after every chunk.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from storage import db
+from pipeline.graph import run_pipeline
+from utils import metrics
+
+class QueueFull(Exception):
+    pass
+
+class JobCancelled(Exception):
+    pass
+
+def _max_errors() -> int:
+    return int(os.getenv("JOB_MAX_ERRORS", "1000"))
+
+class JobRunner:
+    def __init__(self, workers: Optional[int] = None, max_queued: Optional[int] = None):
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.max_queued = max_queued or int(os.getenv("JOB_MAX_QUEUED", "20"))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._active = 0  # queued + running in this process
+        self._running = 0
+        db.fail_interrupted_jobs()
+
+    def submit(self, channel: str, params: Dict[str, Any]) -> str:
+        """Persist and enqueue a translate job; raises QueueFull when admission control says no."""
+        with self._lock:
+            if self._active >= self.max_queued:
+                raise QueueFull(f"{self._active} jobs queued or running (JOB_MAX_QUEUED={self.max_queued})")
+            self._active += 1
+        try:
+            job_id = db.create_job("translate", channel, params)
+            self._pool.submit(self._run, job_id, channel, params)
+        except BaseException:
+            with self._lock:
+                self._active -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id: str, channel: str, params: Dict[str, Any]) -> None:
+        try:
+            if db.cancel_requested(job_id):
+                db.update_job(job_id, status="cancelled", finished_at=time.time())
+                return
+            db.update_job(job_id, status="running", started_at=time.time())
+            with self._lock:
+                self._running += 1
+            try:
+                self._execute(job_id, channel, params)
+            finally:
+                with self._lock:
+                    self._running -= 1
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _execute(self, job_id: str, channel: str, params: Dict[str, Any]) -> None:
+        def progress(counts: Dict[str, int]) -> None:
+            db.update_job(job_id, counts=counts)
+            if db.cancel_requested(job_id):
+                raise JobCancelled()
+
+        extra = {"stream": True, **(params.get("extra") or {})}
+        try:
+            result = run_pipeline(
+                channel=channel,
+                catalog_path=params["catalog_path"],
+                batch_size=params.get("batch_size", 50),
+                dry_run=params.get("dry_run", True),
+                extra=extra,
+                on_progress=progress,
+            )
+        except JobCancelled:
+            db.update_job(job_id, status="cancelled", finished_at=time.time())
+            return
+        except Exception as ex:
+            db.update_job(job_id, status="failed", error=f"{type(ex).__name__}: {ex}", finished_at=time.time())
+            return
+
+        keep = _max_errors()
+        db.update_job(
+            job_id,
+            status="succeeded",
+            counts=result["counts"],
+            errors=result["errors"][:keep],
+            # rejects can be huge; /review serves them, the job keeps a sample
+            result={"preview_mapped": result["preview_mapped"], "rejects_sample": result["rejects"][:50],
+                    "errors_truncated": len(result["errors"]) > keep or bool(result.get("errors_truncated"))},
+            finished_at=time.time(),
+        )
+
+    def shutdown(self) -> None:
+        # this process's running jobs finish their current chunk and stop; its queued ones are cancelled
+        db.cancel_owned_jobs(os.getpid())
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+def get_runner() -> JobRunner:
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
+
+def shutdown_runner() -> None:
+    global _runner
+    with _runner_lock:
+        runner, _runner = _runner, None
+    if runner is not None:
+        runner.shutdown()
+
+def _collect_job_metrics() -> None:
+    runner = _runner
+    running = runner._running if runner else 0
+    metrics.JOBS_ACTIVE.set(running, state="running")
+    metrics.JOBS_ACTIVE.set((runner._active if runner else 0) - running, state="queued")
+
+metrics.register_collector(_collect_job_metrics)
@@ -1,7 +1,84 @@
-from pipeline.state import PipelineState, TranslatedItem
+from typing import Any, Callable, Dict, List, Tuple
+from pipeline.state import ITEM_FIELDS, PREVIEW_SIZE, PipelineState, TranslatedItem, Item
+from pipeline import parallel
 from schema.mapping import loader as mapping_loader
 from dspylocal.normalizer import normalize_fields
 
+# channel -> (mapping version, compiled plan)
+_PLANS: Dict[str, Tuple[str, Callable[[Item], Dict[str, Any]]]] = {}
+
+def _source_expr(src: Any, default_name: str) -> str:
+    # Mirrors `it.attributes.get(src) or getattr(it, src, default)` with the getattr
+    # resolved once at compile time instead of per item.
+    if not isinstance(src, str):
+        return default_name
+    if src in ITEM_FIELDS:
+        return f"get({src!r}) or it.{src}"
+    if hasattr(Item, src):
+        return f"get({src!r}) or getattr(it, {src!r}, {default_name})"
+    return f"get({src!r}) or {default_name}"
+
+def compile_mapping(mapping: dict) -> Callable[[Item], Dict[str, Any]]:
+    """
+    Turn a YAML mapping into a specialized `plan(item) -> payload` function.
+    Rules are interpreted once here; the generated code is a single dict literal.
+    """
+    ns: Dict[str, Any] = {}
+    lines = []
+    for i, (target_field, rule) in enumerate(mapping.items()):
+        default_name = f"_d{i}"
+        if isinstance(rule, str):
+            ns[default_name] = ""
+            expr = _source_expr(rule, default_name)
+        elif isinstance(rule, dict):
+            ns[default_name] = rule.get("default", "")
+            expr = _source_expr(rule.get("source"), default_name)
+        else:
+            ns[default_name] = ""
+            expr = default_name
+        ns[f"_k{i}"] = target_field
+        lines.append(f"        _k{i}: {expr},")
+    src = "\n".join([
+        "def plan(it):",
+        "    get = it.attributes.get",
+        "    return {",
+        *lines,
+        "    }",
+    ])
+    exec(compile(src, "<mapping-plan>", "exec"), ns)
+    return ns["plan"]
+
+def get_plan(channel: str) -> Callable[[Item], Dict[str, Any]]:
+    mapping, version = mapping_loader.get_mapping(channel)
+    key = channel.lower()
+    hit = _PLANS.get(key)
+    if hit and hit[0] == version:
+        return hit[1]
+    plan = compile_mapping(mapping)
+    _PLANS[key] = (version, plan)
+    return plan
+
+def _map_item(plan: Callable[[Item], Dict[str, Any]], it: Item) -> Dict[str, Any]:
+    # Basic mapping via compiled YAML plan + DSPy normalizer to fill/clean fields
+    payload = plan(it)
+    # Run light normalization (title, bullets, brand, etc.)
+    return normalize_fields(it, payload)
+
+def _map_chunk(channel: str, rows: List[Tuple[str, str, str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    # process-pool worker: items arrive as plain (id, title, description, attributes) tuples
+    plan = get_plan(channel)
+    return [
+        _map_item(plan, Item(i, t, d, a))
+        for i, t, d, a in rows
+    ]
+
+def _mapped(state: PipelineState, mapped: List[TranslatedItem]) -> PipelineState:
+    state.mapped = mapped
+    state.n_mapped = len(mapped)
+    state.preview = mapped[:PREVIEW_SIZE]
+    state.items = []  # consumed; rebinding (not clearing) leaves callers' lists alone
+    return state
+
 def map_schema_node(state: PipelineState) -> PipelineState:
     # Pass-through mode for pre-mapped SP-API JSONL
     if (state.extra or {}).get("input_format") == "spapi-jsonl":
@@ -9,28 +86,14 @@ def map_schema_node(state: PipelineState) -> PipelineState:
         for it in state.items:
             payload = it.attributes  # each Item.attributes holds the JSON object from the .jsonl line
             sku = payload.get("sku") or it.id
-            mapped.append(TranslatedItem(id=str(sku), channel_payload=payload))
-        state.mapped = mapped
-        return state
-    
-    mapping = mapping_loader.load_mapping(state.channel)
-    mapped = []
-    for it in state.items:
-        # Basic mapping via YAML + DSPy normalizer to fill/clean fields
-        payload = {}
-        for target_field, rule in mapping.items():
-            if isinstance(rule, str):
-                # direct/alias mapping from attributes/title/description
-                payload[target_field] = it.attributes.get(rule) or getattr(it, rule, "")
-            elif isinstance(rule, dict):
-                src = rule.get("source")
-                default = rule.get("default", "")
-                val = it.attributes.get(src) or getattr(it, src, default)
-                payload[target_field] = val
-            else:
-                payload[target_field] = ""
-        # Run light normalization (title, bullets, brand, etc.)
-        payload = normalize_fields(it, payload)
-        mapped.append(TranslatedItem(id=it.id, channel_payload=payload))
-    state.mapped = mapped
-    return state
+            mapped.append(TranslatedItem(str(sku), payload))
+        return _mapped(state, mapped)
+
+    workers = parallel.resolve_workers(state.extra)
+    if parallel.should_parallelize(len(state.items), workers):
+        rows = [(it.id, it.title, it.description, it.attributes) for it in state.items]
+        payloads = parallel.map_chunks(_map_chunk, state.channel, rows, workers)
+    else:
+        plan = get_plan(state.channel)
+        payloads = [_map_item(plan, it) for it in state.items]
+    return _mapped(state, [TranslatedItem(it.id, payload) for it, payload in zip(state.items, payloads)])
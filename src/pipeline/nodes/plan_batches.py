@@ -1,8 +1,10 @@
+from typing import List
 from pipeline.state import PipelineState
 
+def batch_ranges(n: int, size: int) -> List[range]:
+    return [range(i, min(i + size, n)) for i in range(0, n, size)]
+
 def plan_batches_node(state: PipelineState) -> PipelineState:
-    # naive fixed-size batches; the rate limiter will enforce window constraints
-    items = state.valid
-    bs = state.batch_size or 50
-    state.batches = [items[i:i+bs] for i in range(0, len(items), bs)]
+    # naive fixed-size batches (index ranges into state.valid); the rate limiter will enforce window constraints
+    state.batches = batch_ranges(len(state.valid), state.batch_size or 50)
     return state
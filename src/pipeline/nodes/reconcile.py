@@ -1,6 +1,9 @@
 from pipeline.state import PipelineState
+from pipeline.nodes.upsert import flush_bulk
 
 def reconcile_node(state: PipelineState) -> PipelineState:
     # In production, query channel to confirm final status and collect rejects.
     # For MVP we just return accumulated errors.
+    if state.bulk is not None:
+        flush_bulk(state)
     return state
@@ -1,39 +1,249 @@
+import os
 import time
-from typing import List
-from pipeline.state import PipelineState, TranslatedItem
-from rate_limit.limiter import get_limiter
-from channels.base import get_client
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import httpx
+from pipeline.state import PipelineState, TranslatedItem, Reject
+from pipeline.nodes.plan_batches import batch_ranges
+from channels.base import ChannelClient, get_client
+from channels.http import async_client
+from storage import db
+from utils import profiling
+
+def _client(channel: str):
+    # client calls are timed individually in profiled runs
+    return profiling.wrap_client(get_client(channel))
 
 def _validate_and_upsert(batch: List[TranslatedItem], channel: str, dry_run: bool, errors_out: list) -> List[str]:
-    client = get_client(channel)
+    client = _client(channel)
     ids: List[str] = []
     for t in batch:
         payload = t.channel_payload
+        try:
+            # Ask channel to validate before we upsert (guards against API rejects)
+            ok, errs = client.validate_listing(payload)
+            if not ok:
+                errors_out.append(f"{t.id}: channel_validate:" + ",".join(errs))
+                continue
 
-        # Ask channel to validate before we upsert (guards against API rejects)
-        ok, errs = client.validate_listing(payload)
-        if not ok:
-            errors_out.append(f"{t.id}: channel_validate:" + ",".join(errs))
+            if dry_run:
+                # pretend success
+                time.sleep(0.005)
+                ids.append(t.id)
+                continue
+
+            ok = client.upsert_listing(payload)
+        except Exception as ex:
+            # a dropped connection or 5xx fails this item, not the whole run (as in the async engine)
+            errors_out.append(f"{t.id}: upsert:error:{type(ex).__name__}")
             continue
+        if ok:
+            ids.append(t.id)
+        else:
+            errors_out.append(f"{t.id}: upsert:failed")
+    return ids
 
-        if dry_run:
-            # pretend success
-            time.sleep(0.005)
+# ---------- bulk engine (Amazon feeds, eBay bulk Inventory API) ----------
+def _upsert_mode(extra: Optional[Dict[str, Any]]) -> str:
+    return ((extra or {}).get("upsert_mode") or os.getenv("UPSERT_MODE") or "item").lower()
+
+def _bulk_accept(batches: Iterable[List[TranslatedItem]], client, errors_out: list) -> List[TranslatedItem]:
+    accepted: List[TranslatedItem] = []
+    for batch in batches:
+        for t in batch:
+            try:
+                ok, errs = client.validate_listing(t.channel_payload)
+            except Exception as ex:
+                errors_out.append(f"{t.id}: upsert:error:{type(ex).__name__}")
+                continue
+            if ok:
+                accepted.append(t)
+            else:
+                errors_out.append(f"{t.id}: channel_validate:" + ",".join(errs))
+    return accepted
+
+def _bulk_submit(client, accepted: List[TranslatedItem], errors_out: list, rejects_out: list) -> List[str]:
+    ids: List[str] = []
+    results = client.upsert_bulk([t.channel_payload for t in accepted])
+    for t, errs in zip(accepted, results):
+        if not errs:
             ids.append(t.id)
             continue
+        # per-SKU issues from the channel's report become pipeline rejects
+        errors_out.append(f"{t.id}: upsert:" + ",".join(errs))
+        rejects_out.append(Reject(t.id, list(errs), t.channel_payload))
+    return ids
+
+def _bulk_upsert(
+    batches: Iterable[List[TranslatedItem]], channel: str, dry_run: bool, errors_out: list, rejects_out: list
+) -> List[str]:
+    """Validate per item, then hand every accepted payload to the channel's bulk endpoint at once."""
+    client = _client(channel)
+    accepted = _bulk_accept(batches, client, errors_out)
+    if dry_run or not accepted:
+        return [t.id for t in accepted]
+    return _bulk_submit(client, accepted, errors_out, rejects_out)
+
+class BulkBuffer:
+    """
+    Accepted payloads of a streamed bulk run, held across chunks: submitting per chunk
+    would mean one feed (createFeed is ~1 call per 2 min) and one blocking poll per
+    1000 rows. throttle_and_upsert fills it, reconcile submits whole feeds' worth and,
+    on the last chunk, the remainder.
+    """
+    __slots__ = ("size", "items", "hashes")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.items: List[TranslatedItem] = []
+        # id -> payload hash, recorded as pushed once the item is accepted
+        self.hashes: Dict[str, str] = {}
+
+    def take(self, final: bool) -> List[TranslatedItem]:
+        n = len(self.items) if final else len(self.items) // self.size * self.size
+        out, self.items = self.items[:n], self.items[n:]
+        return out
+
+def bulk_buffer(channel: str, dry_run: bool, extra: Optional[Dict[str, Any]]) -> Optional[BulkBuffer]:
+    """The run-wide buffer for a streamed bulk push, or None when chunks submit on their own."""
+    if dry_run or not (extra or {}).get("stream") or _upsert_mode(extra) != "bulk":
+        return None
+    size = get_client(channel).bulk_buffer
+    return BulkBuffer(size) if size > 0 else None
+
+def flush_bulk(state: PipelineState) -> None:
+    """Submit the buffered payloads that fill whole feeds; everything left on the last chunk."""
+    buf = state.bulk
+    items = buf.take(state.last_chunk)
+    if not items:
+        return
+    ids = _bulk_submit(_client(state.channel), items, state.errors, state.rejects)
+    state.upserted_ids.extend(ids)
+    _record_pushed(state, ids, {t.id: buf.hashes.pop(t.id) for t in items})
 
-        ok = client.upsert_listing(payload)
+# ---------- concurrent (asyncio) engine ----------
+def resolve_concurrency(extra: Optional[Dict[str, Any]]) -> int:
+    """Raises ValueError for a malformed `concurrency` (the routers answer 400)."""
+    v = (extra or {}).get("concurrency") or os.getenv("UPSERT_CONCURRENCY") or 1
+    try:
+        return max(1, int(v))
+    except (TypeError, ValueError):
+        raise ValueError(f"concurrency must be an integer, got {v!r}") from None
+
+async def _avalidate_and_upsert_one(
+    client: ChannelClient, t: TranslatedItem, dry_run: bool, http: httpx.AsyncClient
+) -> Tuple[bool, Optional[str]]:
+    payload = t.channel_payload
+    try:
+        ok, errs = await client.avalidate_listing(payload, http=http)
+        if not ok:
+            return False, f"{t.id}: channel_validate:" + ",".join(errs)
+        if dry_run:
+            await asyncio.sleep(0.005)
+            return True, None
+        if await client.aupsert_listing(payload, http=http):
+            return True, None
+        return False, f"{t.id}: upsert:failed"
+    except Exception as ex:
+        # one bad request must not tear down the other in-flight items
+        return False, f"{t.id}: upsert:error:{type(ex).__name__}"
+
+async def _upsert_concurrently(
+    batches: Iterable[List[TranslatedItem]], channel: str, dry_run: bool, errors_out: list, concurrency: int
+) -> List[str]:
+    """
+    Keep up to `concurrency` validate+upsert calls in flight. Each client call awaits its own
+    (channel, operation) rate tokens, and results are reported in input order.
+    """
+    client = _client(channel)
+    slots = asyncio.Semaphore(concurrency)
+    items = [t for batch in batches for t in batch]
+    results: List[Tuple[bool, Optional[str]]] = [(False, None)] * len(items)
+    running = set()
+
+    async def run(i: int, t: TranslatedItem) -> None:
+        try:
+            results[i] = await _avalidate_and_upsert_one(client, t, dry_run, http)
+        finally:
+            slots.release()
+
+    async with async_client(max_connections=concurrency, timeout=60) as http:
+        for i, t in enumerate(items):
+            await slots.acquire()  # back-pressure: never more than `concurrency` tasks alive
+            task = asyncio.create_task(run(i, t))
+            running.add(task)
+            task.add_done_callback(running.discard)
+        if running:
+            await asyncio.gather(*running)
+
+    ids: List[str] = []
+    for t, (ok, err) in zip(items, results):
         if ok:
             ids.append(t.id)
-        else:
-            errors_out.append(f"{t.id}: upsert:failed")
+        elif err:
+            errors_out.append(err)
     return ids
 
-def throttle_and_upsert_node(state: PipelineState) -> PipelineState:
-    limiter = get_limiter(state.channel)
+# ---------- delta sync ----------
+def _delta(state: PipelineState) -> Dict[str, str]:
+    """
+    Drop items whose payload hash equals the last successful push (unless
+    extra["force_resync"]); returns id -> hash for the items still to send.
+    """
+    items = [t for batch in state.iter_batches() for t in batch]
+    hashes = {t.id: db.fingerprint(t.channel_payload) for t in items}
+    if (state.extra or {}).get("force_resync"):
+        state.changed = len(items)
+        return hashes
+    known = db.get_fingerprints(state.channel, hashes.keys())
+    # unchanged items leave `valid`; the rest are re-packed into full batches
+    state.valid = [t for t in items if known.get(t.id) != hashes[t.id]]
+    state.batches = batch_ranges(len(state.valid), state.batch_size or 50)
+    state.changed = len(state.valid)
+    state.skipped = len(items) - state.changed
+    return hashes
+
+def _prefetch(state: PipelineState) -> None:
+    # one metadata round per distinct category up front, so per-item validation is CPU-bound
+    prefetch = getattr(_client(state.channel), "prefetch", None)
+    if prefetch is not None:
+        prefetch([t.channel_payload for batch in state.iter_batches() for t in batch])
+
+def _upsert(state: PipelineState) -> None:
+    _prefetch(state)
+
+    if _upsert_mode(state.extra) == "bulk":
+        state.upserted_ids = _bulk_upsert(state.iter_batches(), state.channel, state.dry_run, state.errors, state.rejects)
+        return
+
+    concurrency = resolve_concurrency(state.extra)
+    if concurrency > 1:
+        state.upserted_ids = asyncio.run(
+            _upsert_concurrently(state.iter_batches(), state.channel, state.dry_run, state.errors, concurrency)
+        )
+        return
+
+    # Rate limits are charged per outbound call inside the channel clients
+    # (rate_limit.limiter.acquire), so a batch is just a unit of work here.
     upserted: List[str] = []
-    for batch in state.batches:
-        with limiter():
-            upserted.extend(_validate_and_upsert(batch, state.channel, state.dry_run, state.errors))
+    for batch in state.iter_batches():
+        upserted.extend(_validate_and_upsert(batch, state.channel, state.dry_run, state.errors))
     state.upserted_ids = upserted
+
+def _record_pushed(state: PipelineState, ids: List[str], hashes: Dict[str, str]) -> None:
+    # only real pushes count; the credential-less stub client just pretends
+    if not state.dry_run and getattr(get_client(state.channel), "name", "base") != "base":
+        db.record_pushed(state.channel, [(i, hashes[i]) for i in ids if i in hashes])
+
+def throttle_and_upsert_node(state: PipelineState) -> PipelineState:
+    hashes = _delta(state)
+    if state.bulk is not None:
+        # streamed bulk run: validate now, reconcile submits once a feed is full
+        _prefetch(state)
+        for t in _bulk_accept(state.iter_batches(), _client(state.channel), state.errors):
+            state.bulk.items.append(t)
+            state.bulk.hashes[t.id] = hashes[t.id]
+        return state
+    _upsert(state)
+    _record_pushed(state, state.upserted_ids, hashes)
     return state
@@ -1,5 +1,6 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from pipeline.state import PipelineState, TranslatedItem, Reject
+from pipeline import parallel
 
 REQUIRED = {
     "amazon": ["title", "brand", "price"],
@@ -43,42 +44,71 @@ def _validate_bullets(payload: dict, max_count: int = 5) -> Tuple[bool, str]:
         return False, f"bullet_points:too_many({len(b)}>{max_count})"
     return True, ""
 
-def validate_node(state: PipelineState) -> PipelineState:
-    channel = (state.channel or "").lower()
-    req = REQUIRED.get(channel, ["title"])
+def _item_errors(payload: dict, channel: str, req: List[str]) -> List[str]:
+    item_errs: List[str] = []
 
-    valid: List[TranslatedItem] = []
-    errors: List[str] = []
-    rejects: List[Reject] = []
+    missing = _missing_fields(payload, req)
+    if missing:
+        item_errs.append("missing:" + ",".join(missing))
 
-    for item in state.mapped:
-        payload = item.channel_payload
-        item_errs: List[str] = []
+    ok, msg = _validate_price(payload)
+    if not ok:
+        item_errs.append(msg)
 
-        missing = _missing_fields(payload, req)
-        if missing:
-            item_errs.append("missing:" + ",".join(missing))
+    ok, msg = _validate_title(payload)
+    if not ok:
+        item_errs.append(msg)
 
-        ok, msg = _validate_price(payload)
+    if channel == "amazon":
+        ok, msg = _validate_bullets(payload, max_count=5)
         if not ok:
             item_errs.append(msg)
+    return item_errs
 
-        ok, msg = _validate_title(payload)
-        if not ok:
-            item_errs.append(msg)
+def _listing_errors(payload: dict) -> List[str]:
+    # pre-mapped SP-API listings items carry no flat title/price; the channel's PTD check covers attributes
+    errs: List[str] = []
+    if not str(payload.get("sku") or "").strip():
+        errs.append("sku:missing")
+    if not payload.get("productType"):
+        errs.append("productType:missing")
+    if not isinstance(payload.get("attributes"), dict):
+        errs.append("attributes:missing_or_not_dict")
+    return errs
+
+def _validate_chunk(channel: str, payloads: List[dict]) -> List[Optional[List[str]]]:
+    # process-pool worker: valid items come back as None to keep the result small
+    req = REQUIRED.get(channel, ["title"])
+    return [_item_errors(p, channel, req) or None for p in payloads]
+
+def validate_node(state: PipelineState) -> PipelineState:
+    channel = (state.channel or "").lower()
+    req = REQUIRED.get(channel, ["title"])
+
+    valid: List[TranslatedItem] = []
+    errors: List[str] = []
+    rejects: List[Reject] = []
 
-        if channel == "amazon":
-            ok, msg = _validate_bullets(payload, max_count=5)
-            if not ok:
-                item_errs.append(msg)
+    workers = parallel.resolve_workers(state.extra)
+    if (state.extra or {}).get("input_format") == "spapi-jsonl":
+        item_errors = (_listing_errors(m.channel_payload) for m in state.mapped)
+    elif parallel.should_parallelize(len(state.mapped), workers):
+        item_errors = parallel.map_chunks(
+            _validate_chunk, channel, [m.channel_payload for m in state.mapped], workers
+        )
+    else:
+        item_errors = (_item_errors(m.channel_payload, channel, req) for m in state.mapped)
 
+    for item, item_errs in zip(state.mapped, item_errors):
         if item_errs:
             errors.append(f"{item.id}: " + "; ".join(item_errs))
-            rejects.append(Reject(id=item.id, errors=item_errs, channel_payload=payload))
+            rejects.append(Reject(item.id, item_errs, item.channel_payload))
         else:
             valid.append(item)
 
     state.valid = valid
+    state.n_valid = len(valid)
+    state.mapped = []  # consumed
     state.errors.extend(errors)
     state.rejects = rejects
     return state
@@ -0,0 +1,95 @@
+"""
+Process-pool execution for the CPU-bound nodes (map_schema, validate).
+
+Items are sharded into contiguous chunks of plain tuples/dicts (cheap to
+pickle, no pydantic models on the wire), mapped by one shared pool and
+concatenated back in input order. Worker count comes from
+extra={"workers": N} per request or PIPELINE_WORKERS per deployment
+("auto" = one per CPU); 1 keeps everything in-process. Requests are capped
+at min(CPUs, PIPELINE_MAX_WORKERS), which is also the pool's size; a
+request's count only limits how many of its shards are in flight.
+"""
+import os
+import atexit
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+# Below this many items the pickling + IPC overhead outweighs the win
+MIN_PARALLEL_ITEMS = 2000
+# Aim for a few chunks per worker so a slow shard doesn't stall the merge
+CHUNKS_PER_WORKER = 4
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_SIZE = 0
+_POOL_LOCK = threading.Lock()
+
+def _cpus() -> int:
+    return os.cpu_count() or 1
+
+def max_workers() -> int:
+    """Upper bound for any request: min(CPUs, PIPELINE_MAX_WORKERS)."""
+    cap = os.getenv("PIPELINE_MAX_WORKERS")
+    return max(1, min(_cpus(), int(cap))) if cap else _cpus()
+
+def _parse_workers(v: Any) -> int:
+    if v in (None, ""):
+        return 0
+    if str(v).lower() == "auto":
+        return _cpus()
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        raise ValueError(f"workers must be an integer or 'auto', got {v!r}") from None
+
+def resolve_workers(extra: Optional[Dict[str, Any]] = None) -> int:
+    """Raises ValueError for a malformed `workers` (the routers answer 400)."""
+    n = _parse_workers((extra or {}).get("workers")) or _parse_workers(os.getenv("PIPELINE_WORKERS"))
+    return max(1, min(n, max_workers()))
+
+def should_parallelize(n_items: int, workers: int) -> bool:
+    return workers > 1 and n_items >= MIN_PARALLEL_ITEMS
+
+def get_pool() -> ProcessPoolExecutor:
+    """The shared pool, sized max_workers(); rebuilt only when that cap changes."""
+    global _POOL, _POOL_SIZE
+    size = max_workers()
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_SIZE != size:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False)  # in-flight maps finish on the old pool
+            _POOL, _POOL_SIZE = ProcessPoolExecutor(max_workers=size), size
+        return _POOL
+
+def shutdown_pools() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(shutdown_pools)
+
+def _shards(seq: Sequence[Any], workers: int) -> List[Sequence[Any]]:
+    n = len(seq)
+    size = max(1, -(-n // (workers * CHUNKS_PER_WORKER)))
+    return [seq[i:i + size] for i in range(0, n, size)]
+
+def map_chunks(fn: Callable[[str, Sequence[Any]], List[Any]], channel: str, seq: Sequence[Any], workers: int) -> List[Any]:
+    """
+    Run fn(channel, chunk) over contiguous shards of seq on the pool.
+    fn must be a module-level function returning one result per input element;
+    results are concatenated in input order. At most `workers` shards run at once.
+    """
+    pool, call = get_pool(), partial(fn, channel)
+    out: List[Any] = []
+    pending: Deque[Any] = deque()
+    for shard in _shards(seq, workers):
+        if len(pending) >= workers:
+            out.extend(pending.popleft().result())
+        pending.append(pool.submit(call, shard))
+    while pending:
+        out.extend(pending.popleft().result())
+    return out
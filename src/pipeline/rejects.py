@@ -0,0 +1,194 @@
+"""
+Materialized reject sets for /review.
+
+A reject set depends only on the catalog content, the channel, its mapping and the extra
+keys that change how rows are read (RESULT_KEYS), so it is computed once per (channel,
+catalog sha256, mapping version, hash of those keys) and kept in an LRU
+(REVIEW_CACHE_SIZE sets, default 4). Concurrent misses for the same key share one
+computation. Searches are trigram-index lookups (built on the first search), error codes
+are pre-bucketed for facets, sort orders are computed once per key, and the last few
+filtered+sorted views are memoized, so pages (offset or keyset cursor) are served without
+rescanning the set.
+"""
+import hashlib
+import json
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from pipeline.graph import collect_rejects
+from schema.mapping import loader as mapping_loader
+from utils import metrics
+from utils.cache import LRUCache, SingleFlight
+from utils.ngram import TrigramIndex
+
+_CACHE = LRUCache(int(os.getenv("REVIEW_CACHE_SIZE", "4")))
+_INFLIGHT = SingleFlight()
+# abs path -> ((mtime_ns, size), sha256)
+_HASHES = LRUCache(int(os.getenv("REVIEW_HASH_CACHE_SIZE", "256")))
+# extra keys that change the reject set; workers / chunk_size / engine only change how fast
+RESULT_KEYS = ("input_format",)
+_VIEWS_PER_SET = 8
+
+def catalog_hash(path: str) -> str:
+    """Content hash of the catalog file; only re-read when its mtime/size changes."""
+    p = os.path.abspath(path)
+    st = os.stat(p)
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _HASHES.get(p)
+    if hit and hit[0] == stamp:
+        return hit[1]
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    _HASHES.put(p, (stamp, h.hexdigest()))
+    return h.hexdigest()
+
+def extra_hash(extra: Optional[Dict[str, Any]]) -> str:
+    """Canonical hash of the RESULT_KEYS present in `extra`."""
+    keys = {k: (extra or {})[k] for k in RESULT_KEYS if (extra or {}).get(k) is not None}
+    return hashlib.sha256(json.dumps(keys, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def facet_code(error: str) -> str:
+    """Facet key of an error string: drops the detail in parentheses, e.g. title:too_long(250>200)."""
+    return error.split("(", 1)[0]
+
+class RejectSet:
+    def __init__(self, rejects: List[Dict[str, Any]]):
+        self.rejects = rejects
+        # lowercased search text per record, built once
+        self._ids = [(r.get("id") or "").lower() for r in rejects]
+        self._hay = [
+            (" ".join(r.get("errors", [])) + " "
+             + " ".join(f"{k}:{v}" for k, v in (r.get("channel_payload") or {}).items())).lower()
+            for r in rejects
+        ]
+        # error code -> ascending record indexes
+        self._codes: Dict[str, List[int]] = {}
+        for i, r in enumerate(rejects):
+            for code in dict.fromkeys(facet_code(e) for e in r.get("errors", [])):
+                self._codes.setdefault(code, []).append(i)
+        self._views = LRUCache(_VIEWS_PER_SET)
+        self._lock = threading.Lock()
+        self._text_index: Optional[TrigramIndex] = None
+        self._id_index: Optional[TrigramIndex] = None
+        self._ranks: Dict[str, array] = {}
+
+    # ---------- lazily built indexes ----------
+    def _indexes(self) -> Tuple[TrigramIndex, TrigramIndex]:
+        if self._text_index is None:
+            with self._lock:
+                if self._text_index is None:
+                    self._id_index = TrigramIndex(self._ids)
+                    self._text_index = TrigramIndex(self._hay)
+        return self._text_index, self._id_index
+
+    def _rank(self, sort_by: Optional[str]) -> Optional[array]:
+        """rank[i] = position of record i in the full sort order (ties broken by position)."""
+        if not sort_by:
+            return None
+        rank = self._ranks.get(sort_by)
+        if rank is None:
+            if sort_by == "id":
+                keys = [r.get("id") or "" for r in self.rejects]
+            else:
+                # sort by the joined error strings
+                keys = [" ".join(r.get("errors", [])) for r in self.rejects]
+            rank = array("I", bytes(4 * len(keys)))
+            for pos, i in enumerate(sorted(range(len(keys)), key=keys.__getitem__)):
+                rank[i] = pos
+            self._ranks[sort_by] = rank
+        return rank
+
+    # ---------- queries ----------
+    def match(self, contains: Optional[str] = None, id_like: Optional[str] = None,
+              error_code: Optional[str] = None) -> Optional[List[int]]:
+        """Ascending indexes of matching rejects; None means "all"."""
+        idx: Optional[List[int]] = None
+        if error_code:
+            idx = self._codes.get(error_code, [])
+        if contains or id_like:
+            text, ids = self._indexes()
+            if id_like:
+                idx = ids.search(id_like, within=idx)
+            if contains:
+                idx = text.search(contains, within=idx)
+        return idx
+
+    def view(self, contains: Optional[str] = None, id_like: Optional[str] = None,
+             error_code: Optional[str] = None, sort_by: Optional[str] = None) -> Tuple[List[int], Sequence[int]]:
+        """(matching indexes in ascending sort order, their ranks) - memoized per query."""
+        key = (contains or "", id_like or "", error_code or "", sort_by or "")
+        hit = self._views.get(key)
+        if hit is not None:
+            return hit
+        idx = self.match(contains, id_like, error_code)
+        if idx is None:
+            idx = range(len(self.rejects))
+        rank = self._rank(sort_by)
+        if rank is None:
+            out = (idx, idx)  # unsorted: rank is the position
+        else:
+            order = sorted(idx, key=rank.__getitem__)
+            out = (order, [rank[i] for i in order])
+        self._views.put(key, out)
+        return out
+
+    def facets(self, contains: Optional[str] = None, id_like: Optional[str] = None) -> Dict[str, int]:
+        """Error code -> rejects carrying it, among those matching contains/id_like."""
+        idx = self.match(contains, id_like)
+        if idx is None:
+            counts = {code: len(ix) for code, ix in self._codes.items()}
+        else:
+            counts = Counter(
+                code for i in idx
+                for code in dict.fromkeys(facet_code(e) for e in self.rejects[i].get("errors", []))
+            )
+        return dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+
+    def page(self, contains=None, id_like=None, sort_by=None, sort_dir="asc", offset=0, limit=50,
+             error_code=None, after: Optional[int] = None) -> Dict[str, Any]:
+        """
+        One page of the view. `after` is the previous page's next_cursor (keyset pagination:
+        stable and O(log n) however deep); without it `offset` is used.
+        Returns {"total", "items", "next_cursor"}.
+        """
+        idx, ranks = self.view(contains, id_like, error_code, sort_by)
+        n = len(idx)
+        desc = bool(sort_by) and sort_dir == "desc"
+        if not desc:
+            start = bisect_right(ranks, after) if after is not None else offset
+            positions = range(start, min(start + limit, n))
+            more = start + limit < n
+        else:
+            end = bisect_left(ranks, after) if after is not None else n - offset
+            positions = range(end - 1, max(end - limit, 0) - 1, -1)
+            more = end - limit > 0
+        items = [self.rejects[idx[p]] for p in positions]
+        next_cursor = ranks[positions[-1]] if items and more else None
+        return {"total": n, "items": items, "next_cursor": next_cursor}
+
+def get_reject_set(channel: str, catalog_path: str, extra: Optional[Dict[str, Any]] = None) -> RejectSet:
+    _, version = mapping_loader.get_mapping(channel)
+    key = (channel.lower(), catalog_hash(catalog_path), version, extra_hash(extra))
+    hit = _CACHE.get(key)
+    metrics.CACHE_REQUESTS.inc(cache="review_rejects", result="miss" if hit is None else "hit")
+    if hit is not None:
+        return hit
+
+    def build() -> RejectSet:
+        hit = _CACHE.get(key)  # filled while we waited
+        if hit is not None:
+            return hit
+        rs = RejectSet(collect_rejects(channel, catalog_path, extra or {}))
+        _CACHE.put(key, rs)
+        return rs
+
+    return _INFLIGHT.do(key, build)
+
+def clear() -> None:
+    _CACHE.clear()
+    _HASHES.clear()
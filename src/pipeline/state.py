@@ -1,30 +1,72 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+"""
+Pipeline records and the graph state.
 
-class Item(BaseModel):
+Plain slotted dataclasses: no per-instance __dict__ and no validation on construction
+(pydantic models cost ~3x the memory per record and re-checked every nested list when
+the graph rebuilt the state). Pydantic stays at the API boundary (request bodies);
+results leave run_pipeline as plain dicts via as_dict().
+
+Stages release what they consumed: map_schema drops `items`, validate drops `mapped`
+(their sizes survive in n_mapped / n_valid), and `batches` are index ranges into
+`valid` instead of copied sub-lists.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List
+
+@dataclass(slots=True)
+class Item:
     id: str
     title: str
     description: str
-    attributes: Dict[str, Any] = Field(default_factory=dict)
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+ITEM_FIELDS = frozenset(Item.__slots__)
 
-class TranslatedItem(BaseModel):
+@dataclass(slots=True)
+class TranslatedItem:
     id: str
     channel_payload: Dict[str, Any]
 
-class Reject(BaseModel):
+@dataclass(slots=True)
+class Reject:
     id: str
-    errors: List[str] = Field(default_factory=list)
-    channel_payload: Dict[str, Any] = Field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    channel_payload: Dict[str, Any] = field(default_factory=dict)
 
-class PipelineState(BaseModel):
+def as_dict(rec: Any) -> Dict[str, Any]:
+    """Shallow dict of a record, for results leaving the pipeline."""
+    return {name: getattr(rec, name) for name in rec.__slots__}
+
+# mapped items kept for the run's preview
+PREVIEW_SIZE = 5
+
+@dataclass(slots=True)
+class PipelineState:
     channel: str
     catalog_path: str
     dry_run: bool = True
     batch_size: int = 50
-    items: List[Item] = Field(default_factory=list)
-    mapped: List[TranslatedItem] = Field(default_factory=list)
-    valid: List[TranslatedItem] = Field(default_factory=list)
-    batches: List[List[TranslatedItem]] = Field(default_factory=list)
-    upserted_ids: List[str] = Field(default_factory=list)
-    errors: List[str] = Field(default_factory=list)
-    rejects: List[Reject] = Field(default_factory=list)
+    extra: Dict[str, Any] = field(default_factory=dict)
+    items: List[Item] = field(default_factory=list)
+    mapped: List[TranslatedItem] = field(default_factory=list)
+    valid: List[TranslatedItem] = field(default_factory=list)
+    # [start, stop) ranges into `valid`
+    batches: List[range] = field(default_factory=list)
+    upserted_ids: List[str] = field(default_factory=list)
+    n_mapped: int = 0
+    n_valid: int = 0
+    preview: List[TranslatedItem] = field(default_factory=list)
+    # delta sync: items sent vs. skipped because their payload hash matched the last push
+    changed: int = 0
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)
+    rejects: List[Reject] = field(default_factory=list)
+    # streamed bulk runs: the run-wide upsert.BulkBuffer, drained by reconcile on the last chunk
+    bulk: Any = None
+    last_chunk: bool = True
+
+    def iter_batches(self) -> Iterator[List[TranslatedItem]]:
+        """Each batch as a list, materialized one at a time."""
+        valid = self.valid
+        for r in self.batches:
+            yield valid[r.start:r.stop]
@@ -0,0 +1,86 @@
+"""
+AIMD rate control for one token bucket.
+
+- 2xx/4xx (not 429): additive increase, ~`increase` req/s gained per second of success
+- 429/503:           multiplicative decrease by `decrease`, and pause for Retry-After
+- x-amzn-RateLimit-Limit: the marketplace's own number replaces the ceiling (`max_rate`,
+  by default the configured rate), up or down
+
+The controller rewrites the bucket's `rate`, so the limiter itself stays unchanged.
+"""
+from __future__ import annotations
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping, Optional
+
+THROTTLE_STATUSES = (429, 503)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class AIMDController:
+    def __init__(
+        self,
+        limiter: Any,
+        min_rate: float,
+        max_rate: float,
+        increase: float,
+        decrease: float = 0.5,
+    ):
+        self.limiter = limiter
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.paused_until = 0.0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.limiter.rate
+
+    def pause_remaining(self) -> float:
+        return max(0.0, self.paused_until - time.monotonic())
+
+    def on_success(self) -> None:
+        with self.lock:
+            r = self.limiter.rate
+            self.limiter.rate = min(self.max_rate, r + self.increase / max(r, 1e-9))
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        with self.lock:
+            self.throttled += 1
+            self.limiter.rate = max(self.min_rate, self.limiter.rate * self.decrease)
+            pause = retry_after if retry_after is not None else 1.0 / self.limiter.rate
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+
+    def on_limit_header(self, limit: float) -> None:
+        if limit <= 0:
+            return
+        with self.lock:
+            self.max_rate = limit
+            self.limiter.rate = min(self.limiter.rate, limit)
+
+    def observe(self, status: int, headers: Mapping[str, str]) -> None:
+        limit = headers.get("x-amzn-RateLimit-Limit") if headers is not None else None
+        if limit:
+            try:
+                self.on_limit_header(float(limit))
+            except ValueError:
+                pass
+        if status in THROTTLE_STATUSES:
+            self.on_throttle(parse_retry_after(headers.get("Retry-After") if headers is not None else None))
+        elif status < 500:
+            self.on_success()
@@ -0,0 +1,171 @@
+"""
+Shared token-bucket backends so every worker process / pod draws from one quota.
+
+Select with RATE_LIMIT_BACKEND:
+  memory (default)         per-process buckets (SlidingWindowLimiter)
+  sqlite:///path/to/file   one SQLite file shared by all processes on the host
+  redis://host:6379/0      one Redis (or Redis-protocol server) shared by all nodes
+
+A backend implements `take()` (all-or-nothing, for try_acquire) and `reserve()` (always
+takes, possibly into debt, so waiters queue FIFO); the limiter handles the sleeping.
+"""
+from __future__ import annotations
+import abc
+import os
+import time
+import sqlite3
+import threading
+from typing import Any, Optional
+
+class BucketBackend(abc.ABC):
+    @abc.abstractmethod
+    def take(self, key: str, rate: float, burst: float, cost: float) -> float:
+        """
+        Atomically refill bucket `key` and try to take `cost` tokens.
+        Returns 0.0 when granted, otherwise the seconds to wait before retrying
+        (nothing is taken in that case).
+        """
+
+    @abc.abstractmethod
+    def reserve(self, key: str, rate: float, burst: float, cost: float) -> float:
+        """
+        Atomically refill bucket `key` and take `cost` tokens even if that leaves it in debt.
+        Returns the seconds the caller must wait before using them (0.0 = now).
+        A negative cost gives tokens back.
+        """
+
+def _refill_and_take(tokens: float, ts: float, now: float, rate: float, burst: float, cost: float):
+    tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+    # a cost above the bucket size can never fit; let it through once full (goes into debt)
+    need = min(cost, burst)
+    if tokens >= need:
+        return tokens - cost, 0.0
+    return tokens, (need - tokens) / rate
+
+def _refill_and_reserve(tokens: float, ts: float, now: float, rate: float, burst: float, cost: float):
+    tokens = min(burst, tokens + max(0.0, now - ts) * rate) - cost
+    return min(burst, tokens), max(0.0, -tokens / rate)
+
+class SQLiteBackend(BucketBackend):
+    """Host-local shared buckets; BEGIN IMMEDIATE serializes the read-modify-write."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        c = self._conn()
+        c.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, ts REAL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread, and never reuse one inherited across fork()
+        c = getattr(self._local, "conn", None)
+        if c is None or self._local.pid != os.getpid():
+            c = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=OFF")  # limiter state doesn't need to survive a crash
+            self._local.conn, self._local.pid = c, os.getpid()
+        return c
+
+    def _apply(self, fn, key: str, rate: float, burst: float, cost: float) -> float:
+        c = self._conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = c.execute("SELECT tokens, ts FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, ts = row if row else (burst, now)
+            tokens, wait = fn(tokens, ts, now, rate, burst, cost)
+            c.execute(
+                "INSERT INTO buckets (key, tokens, ts) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, ts = excluded.ts",
+                (key, tokens, now),
+            )
+            c.execute("COMMIT")
+        except BaseException:
+            if c.in_transaction:
+                c.execute("ROLLBACK")
+            raise
+        return wait
+
+    def take(self, key: str, rate: float, burst: float, cost: float) -> float:
+        return self._apply(_refill_and_take, key, rate, burst, cost)
+
+    def reserve(self, key: str, rate: float, burst: float, cost: float) -> float:
+        return self._apply(_refill_and_reserve, key, rate, burst, cost)
+
+# Same algorithm as _refill_and_take, run atomically inside Redis. Uses the server clock so
+# nodes with skewed clocks agree; returns the wait as a string (Lua numbers become ints).
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or burst
+local ts = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local need = math.min(cost, burst)
+local wait = 0
+if tokens >= need then
+  tokens = tokens - cost
+else
+  wait = (need - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+# _refill_and_reserve inside Redis; the key lives until any debt is repaid and the bucket refilled
+RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or burst
+local ts = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate) - cost
+local wait = math.max(0, -tokens / rate)
+tokens = math.min(burst, tokens)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+class RedisBackend(BucketBackend):
+    """
+    Cluster-wide shared buckets. `client` is anything with redis-py's
+    `eval(script, numkeys, *keys_and_args)`, e.g. redis.Redis or a test stand-in.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        import redis  # optional dependency; only needed for the redis backend
+        return cls(redis.Redis.from_url(url))
+
+    def _eval(self, script: str, key: str, rate: float, burst: float, cost: float) -> float:
+        wait = self.client.eval(script, 1, self.prefix + key, rate, burst, cost)
+        if isinstance(wait, bytes):
+            wait = wait.decode()
+        return float(wait)
+
+    def take(self, key: str, rate: float, burst: float, cost: float) -> float:
+        return self._eval(TAKE_SCRIPT, key, rate, burst, cost)
+
+    def reserve(self, key: str, rate: float, burst: float, cost: float) -> float:
+        return self._eval(RESERVE_SCRIPT, key, rate, burst, cost)
+
+def backend_from_url(url: Optional[str]) -> Optional[BucketBackend]:
+    """None means in-process buckets."""
+    if not url or url == "memory":
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend.from_url(url)
+    raise ValueError(f"Unsupported RATE_LIMIT_BACKEND: {url}")
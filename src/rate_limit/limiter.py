@@ -1,12 +1,26 @@
+import os
 import time
+import asyncio
 import threading
 import yaml
 from pathlib import Path
 from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+from rate_limit.backends import BucketBackend, backend_from_url
+from rate_limit.adaptive import AIMDController, THROTTLE_STATUSES
+from utils import metrics, profiling
 
 CONFIG_PATH = Path("configs/rate_limits.yaml")
+DEFAULT_LIMITS = {"rate_per_sec": 2, "burst": 5}
+# Throttled (429/503) calls are retried this many times unless the channel sets max_retries
+MAX_RETRIES = 3
 
 class SlidingWindowLimiter:
+    """
+    In-process token bucket with reservations: a caller takes its tokens up front (the bucket
+    may go into debt) and is told how long to wait, then sleeps outside the lock. Waits grow
+    with the debt, so concurrent callers are served in arrival (FIFO) order.
+    """
     def __init__(self, rate_per_sec: float, burst: int):
         self.rate = rate_per_sec
         self.capacity = burst
@@ -14,34 +28,259 @@ class SlidingWindowLimiter:
         self.lock = threading.Lock()
         self.last = time.monotonic()
 
-    @contextmanager
-    def __call__(self):
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Take `cost` tokens now; returns the seconds to wait before using them."""
         with self.lock:
-            now = time.monotonic()
-            elapsed = now - self.last
-            self.last = now
-            # refill
-            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
-            if self.tokens < 1:
-                # wait until we have at least 1 token
-                needed = 1 - self.tokens
-                time.sleep(needed / self.rate)
-                self.tokens = 1
-                self.last = time.monotonic()
-            # consume
-            self.tokens -= 1
+            self._refill()
+            self.tokens -= cost
+            return max(0.0, -self.tokens / self.rate)
+
+    def try_acquire(self, cost: float = 1.0) -> bool:
+        """Take `cost` tokens only if available right now (never jumps queued reservations)."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= min(cost, self.capacity):
+                self.tokens -= cost
+                return True
+            return False
+
+    def refund(self, cost: float = 1.0) -> None:
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + cost)
+
+    @contextmanager
+    def __call__(self, cost: float = 1.0):
+        wait = self.reserve(cost)
+        if wait:
+            time.sleep(wait)
+        yield
+
+    async def acquire(self, cost: float = 1.0) -> None:
+        wait = self.reserve(cost)
+        if wait:
+            await asyncio.sleep(wait)
+
+class SharedBucketLimiter:
+    """
+    Same interface as SlidingWindowLimiter, but the bucket lives in a shared backend
+    (SQLite file, Redis) so all processes/pods draw from one quota.
+    """
+    def __init__(self, backend: BucketBackend, key: str, rate_per_sec: float, burst: int):
+        self.backend = backend
+        self.key = key
+        self.rate = rate_per_sec
+        self.capacity = burst
+
+    def reserve(self, cost: float = 1.0) -> float:
+        return self.backend.reserve(self.key, self.rate, self.capacity, cost)
+
+    def try_acquire(self, cost: float = 1.0) -> bool:
+        return not self.backend.take(self.key, self.rate, self.capacity, cost)
+
+    def refund(self, cost: float = 1.0) -> None:
+        self.backend.reserve(self.key, self.rate, self.capacity, -cost)
+
+    @contextmanager
+    def __call__(self, cost: float = 1.0):
+        wait = self.reserve(cost)
+        if wait:
+            time.sleep(wait)
         yield
 
+    async def acquire(self, cost: float = 1.0) -> None:
+        # backend calls are short blocking I/O; keep them off the loop
+        wait = await asyncio.to_thread(self.reserve, cost)
+        if wait:
+            await asyncio.sleep(wait)
+
+Limiter = Union[SlidingWindowLimiter, SharedBucketLimiter]
+
+# ((path, mtime_ns), parsed config)
+_config_cache: Tuple[Optional[Tuple[str, int]], Dict[str, Any]] = (None, {})
+
 def _load_config():
-    if not CONFIG_PATH.exists():
+    global _config_cache
+    path = Path(os.getenv("RATE_LIMITS_PATH") or CONFIG_PATH)
+    if not path.exists():
         return {}
-    return yaml.safe_load(CONFIG_PATH.read_text()) or {}
+    stamp = (str(path), path.stat().st_mtime_ns)
+    if _config_cache[0] != stamp:
+        _config_cache = (stamp, yaml.safe_load(path.read_text()) or {})
+    return _config_cache[1]
 
 _limiters = {}
+# (RATE_LIMIT_BACKEND url, backend or None for in-process)
+_backend: Tuple[Optional[str], Optional[BucketBackend]] = (None, None)
+
+def _get_backend() -> Optional[BucketBackend]:
+    global _backend
+    url = os.getenv("RATE_LIMIT_BACKEND") or "memory"
+    if _backend[0] != url:
+        _backend = (url, backend_from_url(url))
+    return _backend[1]
+
+def _bucket(key: str, cfg: Dict[str, Any]) -> Limiter:
+    backend = _get_backend()
+    lkey = f"{key}:{cfg['rate_per_sec']}:{cfg['burst']}"
+    lim = _limiters.get(lkey)
+    if lim is None or getattr(lim, "backend", None) is not backend:
+        if backend is None:
+            lim = SlidingWindowLimiter(cfg["rate_per_sec"], cfg["burst"])
+        else:
+            lim = SharedBucketLimiter(backend, key, cfg["rate_per_sec"], cfg["burst"])
+        rate = cfg["rate_per_sec"]
+        lim.aimd = AIMDController(
+            lim,
+            min_rate=cfg.get("min_rate", rate / 10),
+            # never above the configured quota unless the config or a limit header raises it
+            max_rate=cfg.get("max_rate", rate),
+            increase=cfg.get("increase", rate / 10),
+            decrease=cfg.get("decrease", 0.5),
+        )
+        _limiters[lkey] = lim
+    return lim
+
+def get_limiter(channel: str, operation: Optional[str] = None) -> Limiter:
+    """Channel-wide bucket, or the bucket of one (channel, operation) if configured."""
+    cfg = _load_config().get(channel, DEFAULT_LIMITS)
+    if operation:
+        op_cfg = (cfg.get("operations") or {}).get(operation)
+        if op_cfg:
+            return _bucket(f"{channel}/{operation}", op_cfg)
+    return _bucket(channel, cfg)
+
+def _plan(channel: str, operation: Optional[str], cost: Optional[float]):
+    """Buckets to charge, innermost first, and the cost weight of one call."""
+    cfg = _load_config().get(channel, DEFAULT_LIMITS)
+    buckets = []
+    op_cfg = (cfg.get("operations") or {}).get(operation) if operation else None
+    if op_cfg:
+        buckets.append(_bucket(f"{channel}/{operation}", op_cfg))
+        if cost is None:
+            cost = op_cfg.get("cost", 1)
+    buckets.append(_bucket(channel, cfg))
+    return buckets, (1 if cost is None else cost)
+
+def _record_acquire(channel: str, operation: Optional[str], cost: float, wait: float) -> None:
+    metrics.LIMITER_TOKENS.inc(cost, channel=channel, operation=operation or "")
+    metrics.LIMITER_WAIT.observe(wait, channel=channel, operation=operation or "")
+    profiling.record_wait(channel, operation, wait)
+
+def acquire(channel: str, operation: Optional[str] = None, cost: Optional[float] = None) -> None:
+    """
+    Charge one outbound call against the (channel, operation) bucket and the channel-wide
+    bucket, blocking until both allow it. `cost` defaults to the operation's configured weight.
+    Tokens are reserved in every bucket first, then we sleep once for the longest wait.
+    """
+    buckets, cost = _plan(channel, operation, cost)
+    # a Retry-After pause on this operation comes on top of the bucket waits
+    wait = buckets[0].aimd.pause_remaining() + max(b.reserve(cost) for b in buckets)
+    _record_acquire(channel, operation, cost, wait)
+    if wait:
+        time.sleep(wait)
+
+async def aacquire(channel: str, operation: Optional[str] = None, cost: Optional[float] = None) -> None:
+    buckets, cost = _plan(channel, operation, cost)
+    waits = []
+    for b in buckets:
+        if isinstance(b, SharedBucketLimiter):
+            waits.append(await asyncio.to_thread(b.reserve, cost))
+        else:
+            waits.append(b.reserve(cost))
+    wait = buckets[0].aimd.pause_remaining() + max(waits)
+    _record_acquire(channel, operation, cost, wait)
+    if wait:
+        await asyncio.sleep(wait)
+
+def try_acquire(channel: str, operation: Optional[str] = None, cost: Optional[float] = None) -> bool:
+    """Non-blocking acquire: charge every bucket or none of them."""
+    buckets, cost = _plan(channel, operation, cost)
+    if buckets[0].aimd.pause_remaining():
+        return False
+    taken = []
+    for b in buckets:
+        if not b.try_acquire(cost):
+            for t in taken:
+                t.refund(cost)
+            return False
+        taken.append(b)
+    _record_acquire(channel, operation, cost, 0.0)
+    return True
+
+def observe(channel: str, operation: Optional[str], status: int, headers: Any) -> None:
+    """Feed a response to the AIMD controller of the operation's bucket."""
+    buckets, _ = _plan(channel, operation, None)
+    buckets[0].aimd.observe(status, headers)
+
+def _max_retries(channel: str) -> int:
+    return int(_load_config().get(channel, {}).get("max_retries", MAX_RETRIES))
+
+def _record_call(channel: str, operation: Optional[str], status: Any, t0: float) -> None:
+    op = operation or ""
+    elapsed = time.perf_counter() - t0
+    metrics.HTTP_SECONDS.observe(elapsed, channel=channel, operation=op)
+    profiling.record_http(channel, operation, elapsed)
+    metrics.HTTP_RESPONSES.inc(channel=channel, operation=op, status=status)
+
+def send(channel: str, operation: Optional[str], request: Callable[[], Any], cost: Optional[float] = None):
+    """
+    acquire -> request() -> observe, retrying 429/503 after the controller's backoff.
+    `request` performs one HTTP call and returns the httpx.Response.
+    """
+    retries = _max_retries(channel)
+    for attempt in range(retries + 1):
+        acquire(channel, operation, cost)
+        t0 = time.perf_counter()
+        try:
+            r = request()
+        except Exception:
+            _record_call(channel, operation, "error", t0)
+            raise
+        _record_call(channel, operation, r.status_code, t0)
+        observe(channel, operation, r.status_code, r.headers)
+        if r.status_code not in THROTTLE_STATUSES or attempt == retries:
+            return r
+
+async def asend(channel: str, operation: Optional[str], request: Callable[[], Awaitable[Any]], cost: Optional[float] = None):
+    retries = _max_retries(channel)
+    for attempt in range(retries + 1):
+        await aacquire(channel, operation, cost)
+        t0 = time.perf_counter()
+        try:
+            r = await request()
+        except Exception:
+            _record_call(channel, operation, "error", t0)
+            raise
+        _record_call(channel, operation, r.status_code, t0)
+        observe(channel, operation, r.status_code, r.headers)
+        if r.status_code not in THROTTLE_STATUSES or attempt == retries:
+            return r
+
+def effective_rates() -> Dict[str, Dict[str, float]]:
+    """Current (adapted) rate of every live bucket, keyed by channel[/operation]."""
+    out = {}
+    for lkey, lim in list(_limiters.items()):
+        out[lkey.rsplit(":", 2)[0]] = {
+            "rate_per_sec": round(lim.rate, 4),
+            "max_rate": round(lim.aimd.max_rate, 4),
+            "throttled": lim.aimd.throttled,
+        }
+    return out
+
+def _collect_bucket_metrics() -> None:
+    for lkey, lim in list(_limiters.items()):
+        bucket = lkey.rsplit(":", 2)[0]
+        metrics.LIMITER_RATE.set(lim.rate, bucket=bucket)
+        if isinstance(lim, SlidingWindowLimiter):
+            with lim.lock:
+                lim._refill()
+                tokens = lim.tokens
+            # negative = reservations queued behind the bucket
+            metrics.LIMITER_AVAILABLE.set(tokens, bucket=bucket)
 
-def get_limiter(channel: str) -> SlidingWindowLimiter:
-    cfg = _load_config().get(channel, {"rate_per_sec": 2, "burst": 5})
-    key = f"{channel}:{cfg['rate_per_sec']}:{cfg['burst']}"
-    if key not in _limiters:
-        _limiters[key] = SlidingWindowLimiter(cfg["rate_per_sec"], cfg["burst"])
-    return _limiters[key]
+metrics.register_collector(_collect_bucket_metrics)
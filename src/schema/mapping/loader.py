@@ -1,5 +1,7 @@
+import hashlib
 import yaml
 from pathlib import Path
+from typing import Dict, Tuple
 
 # BEFORE:
 # MAPPING_DIR = Path(__file__).parent / "mapping"
@@ -7,7 +9,10 @@ from pathlib import Path
 # AFTER:
 MAPPING_DIR = Path(__file__).resolve().parent
 
-def load_mapping(channel: str) -> dict:
+# channel -> ((mtime_ns, size), version, mapping)
+_CACHE: Dict[str, Tuple[Tuple[int, int], str, dict]] = {}
+
+def _mapping_path(channel: str) -> Path:
     p = MAPPING_DIR / f"{channel.lower()}.yaml"
     if not p.exists():
         available = [x.name for x in MAPPING_DIR.glob("*.yaml")]
@@ -15,4 +20,33 @@ def load_mapping(channel: str) -> dict:
             f"No mapping found for channel '{channel}' at {p}. "
             f"Available: {available}"
         )
+    return p
+
+def load_mapping(channel: str) -> dict:
+    p = _mapping_path(channel)
     return yaml.safe_load(p.read_text()) or {}
+
+def get_mapping(channel: str) -> Tuple[dict, str]:
+    """
+    Cached load_mapping. Returns (mapping, version) where version is a short content hash.
+    The file is only re-read when its mtime/size changes, and only re-parsed when the
+    content hash changes. The returned dict is shared: treat it as read-only.
+    """
+    p = _mapping_path(channel)
+    st = p.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = channel.lower()
+    hit = _CACHE.get(key)
+    if hit and hit[0] == stamp:
+        return hit[2], hit[1]
+
+    raw = p.read_bytes()
+    version = hashlib.sha256(raw).hexdigest()[:16]
+    if hit and hit[1] == version:
+        # touched but unchanged
+        _CACHE[key] = (stamp, version, hit[2])
+        return hit[2], version
+
+    mapping = yaml.safe_load(raw) or {}
+    _CACHE[key] = (stamp, version, mapping)
+    return mapping, version
@@ -1,6 +1,208 @@
-# Placeholder storage layer; swap with Postgres/Redis as you scale.
-from typing import Any
+# Local SQLite storage; swap with Postgres/Redis as you scale.
+# STORAGE_DB points at the file (default .cache/market_translator.db).
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# SQLite's default limit on bound parameters is 999
+_IN_CHUNK = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    channel   TEXT NOT NULL,
+    sku       TEXT NOT NULL,
+    hash      TEXT NOT NULL,
+    pushed_at REAL NOT NULL,
+    PRIMARY KEY (channel, sku)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    channel     TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    counts      TEXT NOT NULL DEFAULT '{}',
+    errors      TEXT NOT NULL DEFAULT '[]',
+    result      TEXT,
+    error       TEXT,
+    cancel      INTEGER NOT NULL DEFAULT 0,
+    owner       INTEGER NOT NULL,
+    boot        TEXT NOT NULL DEFAULT '',
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+_local = threading.local()
+_boot: Tuple[int, str] = (0, "")
+
+def boot_id() -> str:
+    """Random id of this process incarnation; PIDs get reused across container restarts."""
+    global _boot
+    if _boot[0] != os.getpid():
+        _boot = (os.getpid(), uuid.uuid4().hex)
+    return _boot[1]
+
+def _migrate(c: sqlite3.Connection) -> None:
+    cols = {row[1] for row in c.execute("PRAGMA table_info(jobs)")}
+    if "boot" not in cols:
+        c.execute("ALTER TABLE jobs ADD COLUMN boot TEXT NOT NULL DEFAULT ''")
+
+def db_path() -> str:
+    return os.getenv("STORAGE_DB") or ".cache/market_translator.db"
+
+def connect() -> sqlite3.Connection:
+    """One connection per thread/process/path; never reused across fork()."""
+    path = db_path()
+    c = getattr(_local, "conn", None)
+    if c is None or _local.key != (os.getpid(), path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        c = sqlite3.connect(path, timeout=30, isolation_level=None)
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        c.executescript(_SCHEMA)
+        _migrate(c)
+        _local.conn, _local.key = c, (os.getpid(), path)
+    return c
 
 def save_event(event: str, payload: Any) -> None:
     # Extend to persist to a DB or queue
     pass
+
+# ---------- delta sync fingerprints ----------
+def fingerprint(payload: Dict[str, Any]) -> str:
+    """Stable content hash of a channel payload (key order doesn't matter)."""
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def get_fingerprints(channel: str, skus: Iterable[str]) -> Dict[str, str]:
+    """sku -> hash of the payload last pushed successfully."""
+    c = connect()
+    skus = list(skus)
+    out: Dict[str, str] = {}
+    for i in range(0, len(skus), _IN_CHUNK):
+        part = skus[i:i + _IN_CHUNK]
+        rows = c.execute(
+            f"SELECT sku, hash FROM fingerprints WHERE channel = ? AND sku IN ({','.join('?' * len(part))})",
+            [channel, *part],
+        )
+        out.update(rows)
+    return out
+
+def record_pushed(channel: str, pushed: List[Tuple[str, str]]) -> None:
+    """Remember (sku, hash) pairs that the channel accepted."""
+    if not pushed:
+        return
+    now = time.time()
+    c = connect()
+    with c:
+        c.execute("BEGIN")
+        c.executemany(
+            "INSERT INTO fingerprints (channel, sku, hash, pushed_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(channel, sku) DO UPDATE SET hash = excluded.hash, pushed_at = excluded.pushed_at",
+            [(channel, sku, h, now) for sku, h in pushed],
+        )
+
+# ---------- jobs ----------
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+_JSON_COLUMNS = ("params", "counts", "errors", "result")
+
+def _job_row(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    for k in _JSON_COLUMNS:
+        if job.get(k) is not None:
+            job[k] = json.loads(job[k])
+    job["cancel"] = bool(job["cancel"])
+    return job
+
+def create_job(kind: str, channel: str, params: Dict[str, Any]) -> str:
+    job_id = uuid.uuid4().hex
+    connect().execute(
+        "INSERT INTO jobs (id, kind, channel, status, params, owner, boot, created_at) VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+        (job_id, kind, channel, json.dumps(params), os.getpid(), boot_id(), time.time()),
+    )
+    return job_id
+
+def update_job(job_id: str, **fields: Any) -> None:
+    if not fields:
+        return
+    vals = [json.dumps(v) if k in _JSON_COLUMNS and v is not None else v for k, v in fields.items()]
+    sets = ", ".join(f"{k} = ?" for k in fields)
+    connect().execute(f"UPDATE jobs SET {sets} WHERE id = ?", [*vals, job_id])
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    cur = connect().cursor()
+    cur.row_factory = sqlite3.Row
+    row = cur.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _job_row(row) if row else None
+
+def list_jobs(status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    c = connect().cursor()
+    c.row_factory = sqlite3.Row
+    cols = "id, kind, channel, status, counts, error, cancel, created_at, started_at, finished_at"
+    if status:
+        rows = c.execute(
+            f"SELECT {cols} FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit))
+    else:
+        rows = c.execute(f"SELECT {cols} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+    return [_job_row(r) for r in rows]
+
+def count_jobs(*statuses: str) -> int:
+    q = f"SELECT COUNT(*) FROM jobs WHERE status IN ({','.join('?' * len(statuses))})"
+    return connect().execute(q, statuses).fetchone()[0]
+
+def request_cancel(job_id: str) -> bool:
+    """Flag a queued/running job for cancellation; False if it already finished (or is unknown)."""
+    cur = connect().execute(
+        "UPDATE jobs SET cancel = 1 WHERE id = ? AND status IN ('queued', 'running')", (job_id,))
+    return cur.rowcount > 0
+
+def cancel_owned_jobs(owner: int) -> int:
+    """
+    Shutdown of process `owner`: flag its running jobs for cancellation and mark its
+    queued ones cancelled (their futures are dropped with the pool). Jobs of other
+    workers/replicas sharing the database are left alone.
+    """
+    c = connect()
+    n = c.execute("UPDATE jobs SET cancel = 1 WHERE owner = ? AND status = 'running'", (owner,)).rowcount
+    n += c.execute(
+        "UPDATE jobs SET cancel = 1, status = 'cancelled', finished_at = ? WHERE owner = ? AND status = 'queued'",
+        (time.time(), owner)).rowcount
+    return n
+
+def cancel_requested(job_id: str) -> bool:
+    row = connect().execute("SELECT cancel FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return bool(row and row[0])
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def fail_interrupted_jobs() -> int:
+    """
+    Queues live in the process that accepted the job, so jobs whose owner process is
+    gone (crash/restart) can't resume; mark them failed. The owner PID alone isn't
+    enough: after a container restart this process often gets the same PID (e.g. 1),
+    so a job from an earlier boot is also dead when its PID is now ours.
+    """
+    c = connect()
+    rows = c.execute("SELECT id, owner, boot FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+    me, boot = os.getpid(), boot_id()
+    dead = [job_id for job_id, owner, job_boot in rows
+            if job_boot != boot and (owner == me or not _alive(owner))]
+    for job_id in dead:
+        update_job(job_id, status="failed", error="interrupted", finished_at=time.time())
+    return len(dead)
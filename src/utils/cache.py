@@ -0,0 +1,159 @@
+"""
+Small caching building blocks: a bounded in-memory LRU, a JSON-on-disk store and
+single-flight coalescing of concurrent misses.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+class LRUCache:
+    """Thread-safe LRU bounded by entry count."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class DiskCache:
+    """One JSON document per key under `root`; writes are atomic (write + rename)."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            doc = json.loads(self._path(key).read_text())
+        except (OSError, ValueError):
+            return None
+        return doc if doc.get("key") == key else None
+
+    def put(self, key: str, doc: Dict[str, Any]) -> None:
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps({**doc, "key": key}))
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the disk tier is best-effort; memory still has the value
+
+class SingleFlight:
+    """Concurrent calls for the same key run `fn` once; the others wait and share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, "_Call"] = {}
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+class TTLCache:
+    """
+    LRU + per-entry TTL, with an optional DiskCache tier (values must be JSON-serializable)
+    and single-flight loading. Keys are strings.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, disk: Optional[DiskCache] = None):
+        self.ttl = ttl
+        self.disk = disk
+        self._lru = LRUCache(max_entries)
+        self._inflight = SingleFlight()
+
+    def get(self, key: str) -> Any:
+        hit = self._lru.get(key)
+        if hit and time.time() < hit[0]:
+            return hit[1]
+        if self.disk is not None:
+            doc = self.disk.get(key)
+            if doc and time.time() < doc["exp"]:
+                self._lru.put(key, (doc["exp"], doc["value"]))
+                return doc["value"]
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        exp = time.time() + self.ttl
+        self._lru.put(key, (exp, value))
+        if self.disk is not None:
+            self.disk.put(key, {"exp": exp, "value": value})
+
+    def get_or_load(self, key: str, load: Callable[[], Any]) -> Any:
+        """Cached value, or load() once across concurrent callers. None results aren't cached."""
+        v = self.get(key)
+        if v is not None:
+            return v
+
+        def run():
+            v = self.get(key)  # filled while we waited
+            if v is None:
+                v = load()
+                if v is not None:
+                    self.put(key, v)
+            return v
+
+        return self._inflight.do(key, run)
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
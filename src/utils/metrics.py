@@ -0,0 +1,276 @@
+"""
+Process-local Prometheus metrics (counters, gauges, histograms) rendered in the text
+exposition format, with aggregation across uvicorn workers:
+
+  METRICS_DIR             every worker snapshots its metrics to <dir>/<pid>.json and a
+                          scrape merges all files (unset: this process only)
+  METRICS_FLUSH_INTERVAL  seconds between snapshots (5)
+
+Counters and histograms from exited workers keep counting toward the totals; gauges
+only come from live ones. Clear METRICS_DIR when (re)deploying.
+Recording is a dict update under a lock, so instrument per call or per chunk, not per field.
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        _REGISTRY[name] = self
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(k, "")) for k in self.labelnames)
+
+    def samples(self) -> Dict[Tuple[str, ...], Any]:
+        with self._lock:
+            return {k: (list(v) if isinstance(v, list) else v) for k, v in self._values.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(_Metric):
+    """
+    `mode` says how workers combine: "sum" (e.g. jobs in flight) or "pid" (one series per
+    worker, labelled pid, for per-process state such as a bucket's current rate).
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), mode: str = "sum"):
+        super().__init__(name, help, labelnames)
+        self.mode = mode
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)  # first bucket with le >= value (+Inf if none)
+        with self._lock:
+            v = self._values.get(key)
+            if v is None:
+                # per-bucket (non-cumulative) counts incl. +Inf, then sum
+                v = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            v[i] += 1
+            v[-1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+_REGISTRY: Dict[str, _Metric] = {}
+# run right before a snapshot, to set gauges from live state (zero hot-path cost)
+_COLLECTORS: List[Callable[[], None]] = []
+
+def register_collector(fn: Callable[[], None]) -> None:
+    _COLLECTORS.append(fn)
+
+# ---------- snapshots + cross-worker merge ----------
+def snapshot() -> Dict[str, Any]:
+    for fn in list(_COLLECTORS):
+        try:
+            fn()
+        except Exception:
+            pass
+    return {
+        "pid": os.getpid(),
+        "metrics": {
+            name: [[list(k), v] for k, v in m.samples().items()]
+            for name, m in list(_REGISTRY.items())
+        },
+    }
+
+def metrics_dir() -> Optional[str]:
+    return os.getenv("METRICS_DIR") or None
+
+def flush() -> None:
+    root = metrics_dir()
+    if not root:
+        return
+    try:
+        Path(root).mkdir(parents=True, exist_ok=True)
+        path = Path(root) / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(snapshot()))
+        os.replace(tmp, path)
+    except OSError:
+        pass  # metrics are best-effort
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _snapshots() -> List[Dict[str, Any]]:
+    own = snapshot()
+    out = [own]
+    root = metrics_dir()
+    if root:
+        for f in Path(root).glob("*.json"):
+            if f.stem == str(own["pid"]):
+                continue
+            try:
+                out.append(json.loads(f.read_text()))
+            except (OSError, ValueError):
+                continue
+    return out
+
+def collect() -> Dict[str, Dict[Tuple[str, ...], Any]]:
+    """name -> labels -> value, merged over every worker."""
+    merged: Dict[str, Dict[Tuple[str, ...], Any]] = {name: {} for name in _REGISTRY}
+    for snap in _snapshots():
+        pid = snap["pid"]
+        live = None
+        for name, samples in snap["metrics"].items():
+            m = _REGISTRY.get(name)
+            if m is None:
+                continue
+            if m.kind == "gauge":
+                if live is None:
+                    live = pid == os.getpid() or _alive(pid)
+                if not live:
+                    continue
+            out = merged[name]
+            for labels, v in samples:
+                key = tuple(labels)
+                if m.kind == "gauge" and m.mode == "pid":
+                    key = key + (str(pid),)
+                if isinstance(v, list):
+                    cur = out.get(key)
+                    out[key] = v if cur is None else [a + b for a, b in zip(cur, v)]
+                else:
+                    out[key] = out.get(key, 0.0) + v
+    return merged
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not float(v).is_integer() else str(int(v))
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [
+        f'{n}="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for n, v in zip(names, values)
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def render() -> str:
+    """Prometheus text exposition format 0.0.4."""
+    lines: List[str] = []
+    for name, samples in collect().items():
+        m = _REGISTRY[name]
+        lines.append(f"# HELP {name} {m.help}")
+        lines.append(f"# TYPE {name} {m.kind}")
+        names = m.labelnames + (("pid",) if m.kind == "gauge" and m.mode == "pid" else ())
+        for key, v in sorted(samples.items()):
+            if m.kind != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {_fmt(v)}")
+                continue
+            cum = 0
+            for le, n in zip(m.buckets + (float("inf"),), v[:-1]):
+                cum += n
+                le_label = 'le="%s"' % _fmt(le)
+                lines.append(f"{name}_bucket{_labels(names, key, le_label)} {cum}")
+            lines.append(f"{name}_sum{_labels(names, key)} {_fmt(v[-1])}")
+            lines.append(f"{name}_count{_labels(names, key)} {cum}")
+    return "\n".join(lines) + "\n"
+
+def total(name: str, **match: str) -> float:
+    """Sum of a counter/gauge over all workers and the series matching `match`."""
+    m = _REGISTRY[name]
+    idx = [(m.labelnames.index(k), str(v)) for k, v in match.items()]
+    return sum(v for key, v in collect()[name].items() if all(key[i] == want for i, want in idx))
+
+# ---------- periodic flush ----------
+_flusher: Optional[Tuple[int, threading.Thread]] = None
+
+def start_flusher() -> None:
+    """Snapshot this worker every METRICS_FLUSH_INTERVAL seconds (no-op without METRICS_DIR)."""
+    global _flusher
+    if not metrics_dir() or (_flusher and _flusher[0] == os.getpid()):
+        return
+    interval = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+    def run():
+        while True:
+            time.sleep(interval)
+            flush()
+
+    t = threading.Thread(target=run, name="metrics-flush", daemon=True)
+    _flusher = (os.getpid(), t)
+    t.start()
+
+def _after_fork_in_child() -> None:
+    # a forked child starts from zero; otherwise the parent's counts would be merged twice
+    for m in list(_REGISTRY.values()):
+        m._lock = threading.Lock()
+        m._values = {}
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+# ---------- the app's metrics ----------
+PIPELINE_RUNS = Counter("pipeline_runs_total", "Pipeline runs", ("channel",))
+PIPELINE_ITEMS = Counter("pipeline_items_total", "Items reaching each pipeline stage", ("channel", "stage"))
+NODE_SECONDS = Histogram("pipeline_node_seconds", "Wall time per graph node and chunk", ("node",))
+HTTP_SECONDS = Histogram("channel_request_seconds", "Channel API call latency", ("channel", "operation"))
+HTTP_RESPONSES = Counter("channel_responses_total", "Channel API responses by status", ("channel", "operation", "status"))
+LIMITER_WAIT = Histogram(
+    "rate_limit_wait_seconds", "Time spent waiting for rate-limit tokens", ("channel", "operation"),
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+LIMITER_TOKENS = Counter("rate_limit_tokens_total", "Rate-limit tokens consumed", ("channel", "operation"))
+LIMITER_RATE = Gauge("rate_limit_rate", "Current (AIMD-adapted) bucket refill rate per second", ("bucket",), mode="pid")
+LIMITER_AVAILABLE = Gauge("rate_limit_available_tokens", "Tokens in a process-local bucket", ("bucket",), mode="pid")
+TOKEN_REFRESHES = Counter("oauth_token_refreshes_total", "OAuth access tokens fetched from the auth endpoint", ("token",))
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by result", ("cache", "result"))
+JOBS_ACTIVE = Gauge("jobs_active", "Background jobs queued or running", ("state",))
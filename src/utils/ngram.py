@@ -0,0 +1,53 @@
+"""
+Trigram index for case-insensitive substring search over a fixed list of strings.
+
+Every distinct 3-gram maps to the ascending ids of the documents containing it (compact
+array('I') postings). A query of 3+ chars only verifies documents on its rarest
+trigram's postings; shorter queries fall back to a scan.
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+def _grams(text: str) -> Iterable[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TrigramIndex:
+    def __init__(self, docs: Sequence[str]):
+        """`docs` must already be lowercased; ids are their positions."""
+        self.docs = docs
+        self._postings: Dict[str, array] = {}
+        for i, doc in enumerate(docs):
+            for g in _grams(doc):
+                p = self._postings.get(g)
+                if p is None:
+                    p = self._postings[g] = array("I")
+                p.append(i)
+
+    def candidates(self, needle: str) -> Optional[Sequence[int]]:
+        """Ids that may contain `needle` (a superset), or None if it is too short to use the index."""
+        if len(needle) < 3:
+            return None
+        best: Optional[array] = None
+        for g in _grams(needle):
+            p = self._postings.get(g)
+            if p is None:
+                return ()
+            if best is None or len(p) < len(best):
+                best = p
+        return best
+
+    def search(self, needle: str, within: Optional[Sequence[int]] = None) -> List[int]:
+        """Ascending ids whose document contains `needle` (optionally restricted to `within`)."""
+        needle = needle.lower()
+        docs = self.docs
+        cands = self.candidates(needle)
+        if cands is None:
+            cands = range(len(docs)) if within is None else within
+        elif within is not None:
+            # walk the smaller side
+            if len(within) <= len(cands):
+                cands = within
+            else:
+                keep = set(within)
+                return [i for i in cands if i in keep and needle in docs[i]]
+        return [i for i in cands if needle in docs[i]]
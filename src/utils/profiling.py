@@ -0,0 +1,287 @@
+"""
+Per-run profiling (extra={"profile": true} or ?profile=1 on /translate).
+
+  true / "timing"  every graph node, channel client call, channel HTTP call and limiter
+                   wait gets wall/CPU timers; nodes also get peak traced memory (tracemalloc)
+  "sample"         ...plus a sampling profiler on the run's thread (PROFILE_SAMPLE_INTERVAL,
+                   default 5 ms) written as collapsed stacks for flamegraph tools
+
+The run response gets a `profile` breakdown and an artifact id downloadable from
+/profiles/{id} (files under PROFILE_DIR, default .cache/profiles; the newest PROFILE_KEEP
+runs, default 100, are kept).
+
+tracemalloc is process-wide: concurrent profiled runs share one trace, started by the
+first and stopped by the last.
+
+When profiling is off the graph is built without wrappers and the only cost is one
+context-variable lookup per channel call.
+"""
+from __future__ import annotations
+import collections
+import contextvars
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+_ACTIVE: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar("profile", default=None)
+
+# profiled runs currently relying on the tracemalloc trace we started
+_TRACE_LOCK = threading.Lock()
+_trace_users = 0
+
+def _trace_acquire() -> bool:
+    """Join (or start) our trace; False if someone else's trace is running, e.g. a benchmark's."""
+    global _trace_users
+    with _TRACE_LOCK:
+        if _trace_users == 0:
+            if tracemalloc.is_tracing():
+                return False
+            tracemalloc.start()
+        _trace_users += 1
+        return True
+
+def _trace_release() -> None:
+    global _trace_users
+    with _TRACE_LOCK:
+        _trace_users -= 1
+        if _trace_users == 0:
+            tracemalloc.stop()
+
+def profile_dir() -> Path:
+    return Path(os.getenv("PROFILE_DIR") or ".cache/profiles")
+
+def _prune(root: Path, keep: int) -> None:
+    """Delete all but the newest `keep` runs' artifacts."""
+    runs = sorted(root.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in runs[keep:]:
+        for path in (old, old.with_suffix(".folded")):
+            path.unlink(missing_ok=True)
+
+def current() -> Optional["Profile"]:
+    return _ACTIVE.get()
+
+def _mode(extra: Dict[str, Any]) -> Optional[str]:
+    v = extra.get("profile")
+    if v in (None, False, "", 0, "0", "false"):
+        return None
+    return "sample" if str(v).lower() == "sample" else "timing"
+
+class _Stat:
+    __slots__ = ("calls", "wall", "cpu", "wait", "peak")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.wait = 0.0
+        self.peak = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "wall_ms": round(self.wall * 1000, 3),
+            "cpu_ms": round(self.cpu * 1000, 3),
+            "wait_ms": round(self.wait * 1000, 3),
+            "peak_mem_kb": round(self.peak / 1024, 1),
+        }
+
+class Profile:
+    def __init__(self, mode: str = "timing"):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.spans: Dict[str, Dict[str, _Stat]] = collections.defaultdict(lambda: collections.defaultdict(_Stat))
+        self._lock = threading.Lock()
+        self._node: Optional[str] = None
+        self._traced = False
+        self._sampler: Optional[_Sampler] = None
+        self._t0 = self._cpu0 = 0.0
+
+    # ---------- lifecycle ----------
+    def start(self) -> contextvars.Token:
+        self._traced = _trace_acquire()
+        if self.mode == "sample":
+            self._sampler = _Sampler(threading.get_ident())
+            self._sampler.start()
+        self._t0, self._cpu0 = time.perf_counter(), time.process_time()
+        return _ACTIVE.set(self)
+
+    def finish(self, token: contextvars.Token) -> Dict[str, Any]:
+        _ACTIVE.reset(token)
+        wall, cpu = time.perf_counter() - self._t0, time.process_time() - self._cpu0
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self._traced:
+            _trace_release()
+        summary = {
+            "id": self.id,
+            "mode": self.mode,
+            "wall_ms": round(wall * 1000, 3),
+            "cpu_ms": round(cpu * 1000, 3),
+            **{kind: {name: s.as_dict() for name, s in sorted(stats.items())} for kind, stats in self.spans.items()},
+        }
+        self._write(summary)
+        summary["artifact"] = f"/profiles/{self.id}"
+        return summary
+
+    def _write(self, summary: Dict[str, Any]) -> None:
+        try:
+            root = profile_dir()
+            root.mkdir(parents=True, exist_ok=True)
+            doc = dict(summary)
+            if self._sampler is not None:
+                doc["sample_interval_ms"] = self._sampler.interval * 1000
+                doc["samples"] = self._sampler.total
+                (root / f"{self.id}.folded").write_text(self._sampler.folded())
+            (root / f"{self.id}.json").write_text(json.dumps(doc, indent=2))
+            _prune(root, max(1, int(os.getenv("PROFILE_KEEP", "100"))))
+        except OSError:
+            pass  # the breakdown is still returned inline
+
+    # ---------- recording ----------
+    def _add(self, kind: str, name: str, wall: float, cpu: float, peak: int = 0) -> None:
+        with self._lock:
+            s = self.spans[kind][name]
+            s.calls += 1
+            s.wall += wall
+            s.cpu += cpu
+            s.peak = max(s.peak, peak)
+
+    def add_wait(self, name: str, seconds: float) -> None:
+        with self._lock:
+            s = self.spans["waits"][name]
+            s.calls += 1
+            s.wait += seconds
+            if self._node:
+                self.spans["nodes"][self._node].wait += seconds
+
+    @contextmanager
+    def span(self, kind: str, name: str) -> Iterator[None]:
+        t0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self._add(kind, name, time.perf_counter() - t0, time.process_time() - c0)
+
+    @contextmanager
+    def node(self, name: str) -> Iterator[None]:
+        """A graph node: timers, peak traced memory, and limiter waits attributed to it."""
+        prev, self._node = self._node, name
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        t0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+            peak = max(0, tracemalloc.get_traced_memory()[1] - base)
+            self._node = prev
+            self._add("nodes", name, wall, cpu, peak)
+
+    def iterate(self, name: str, it):
+        """Time each next() of an iterator (e.g. catalog parsing between graph invocations)."""
+        it = iter(it)
+        while True:
+            with self.node(name):
+                try:
+                    v = next(it)
+                except StopIteration:
+                    return
+            yield v
+
+# ---------- hooks used by the pipeline ----------
+def start(extra: Dict[str, Any]) -> Optional[Profile]:
+    mode = _mode(extra or {})
+    return Profile(mode) if mode else None
+
+def wrap_node(name: str, fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    def run(state):
+        prof = current()
+        if prof is None:
+            return fn(state)
+        with prof.node(name):
+            return fn(state)
+    return run
+
+def record_wait(channel: str, operation: Optional[str], seconds: float) -> None:
+    prof = current()
+    if prof is not None:
+        prof.add_wait(f"{channel}/{operation or ''}", seconds)
+
+def record_http(channel: str, operation: Optional[str], seconds: float) -> None:
+    prof = current()
+    if prof is not None:
+        prof._add("http", f"{channel}/{operation or ''}", seconds, 0.0)
+
+class _ProfiledClient:
+    """Times every public method call of a channel client (sync or async)."""
+
+    def __init__(self, client: Any, prof: Profile):
+        self._client = client
+        self._prof = prof
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        label = f"{getattr(self._client, 'name', type(self._client).__name__)}.{name}"
+        prof = self._prof
+        if inspect.iscoroutinefunction(attr):
+            async def acall(*a, **kw):
+                with prof.span("client", label):
+                    return await attr(*a, **kw)
+            return acall
+
+        def call(*a, **kw):
+            with prof.span("client", label):
+                return attr(*a, **kw)
+        return call
+
+def wrap_client(client: Any) -> Any:
+    prof = current()
+    return client if prof is None else _ProfiledClient(client, prof)
+
+# ---------- sampling ----------
+class _Sampler:
+    """Samples one thread's Python stack every `interval` seconds from a daemon thread."""
+
+    def __init__(self, thread_id: int, interval: Optional[float] = None):
+        self.thread_id = thread_id
+        self.interval = interval or float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+        self.stacks: Dict[str, int] = collections.Counter()
+        self.total = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(parts))] += 1
+            self.total += 1
+
+    def folded(self) -> str:
+        """Brendan Gregg's collapsed-stack format: `root;...;leaf count` per line."""
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(self.stacks.items()))
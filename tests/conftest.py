@@ -0,0 +1,15 @@
+import pytest
+
+@pytest.fixture(autouse=True)
+def _isolated_storage(tmp_path, monkeypatch):
+    # delta-sync fingerprints etc. must not leak between tests or into the repo
+    monkeypatch.setenv("STORAGE_DB", str(tmp_path / "storage.db"))
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setenv("PTD_CACHE_DIR", str(tmp_path / "ptd"))
+
+@pytest.fixture(autouse=True)
+def _no_renewal_timers():
+    # token renewal timers would outlive the test (and make later fork()s multi-threaded)
+    yield
+    from channels.tokens import stop_renewals
+    stop_renewals()
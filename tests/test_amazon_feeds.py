@@ -0,0 +1,108 @@
+import gzip
+import json
+import os
+import httpx
+from channels import base, http as channel_http
+from channels import amazon_feeds
+from bench import synth
+from pipeline.graph import run_pipeline
+from pipeline.nodes import upsert
+from pipeline.state import TranslatedItem
+
+ENV = {
+    "LWA_CLIENT_ID": "id", "LWA_CLIENT_SECRET": "secret", "LWA_REFRESH_TOKEN": "rt-feeds",
+    "SPAPI_HOST": "https://sp.test", "SELLER_ID": "S1", "MARKETPLACE_IDS": "M1",
+    "SPAPI_SCHEMA_VALIDATE": "0", "SPAPI_FEED_POLL_INTERVAL": "0",
+}
+
+class _FeedsStub:
+    """Feeds + Documents endpoints and the pre-signed S3 urls, in memory."""
+
+    def __init__(self):
+        self.calls = []
+        self.uploads = {}
+        self.polls = {}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls.append((request.method, path))
+        if path == "/auth/o2/token":
+            return httpx.Response(200, json={"access_token": "tok", "expires_in": 3600})
+        if path == "/feeds/2021-06-30/documents":
+            doc_id = f"doc{len(self.uploads)}"
+            self.uploads[doc_id] = None
+            return httpx.Response(201, json={"feedDocumentId": doc_id, "url": f"https://s3.test/{doc_id}"})
+        if path.startswith("/doc") and request.method == "PUT":
+            self.uploads[path[1:]] = json.loads(request.content)
+            return httpx.Response(200)
+        if path == "/feeds/2021-06-30/feeds":
+            return httpx.Response(202, json={"feedId": json.loads(request.content)["inputFeedDocumentId"]})
+        if path.startswith("/feeds/2021-06-30/feeds/"):
+            feed_id = path.rsplit("/", 1)[-1]
+            self.polls[feed_id] = self.polls.get(feed_id, 0) + 1
+            if self.polls[feed_id] < 2:
+                return httpx.Response(200, json={"feedId": feed_id, "processingStatus": "IN_PROGRESS"})
+            return httpx.Response(200, json={
+                "feedId": feed_id, "processingStatus": "DONE", "resultFeedDocumentId": f"report-{feed_id}"})
+        if path.startswith("/feeds/2021-06-30/documents/report-"):
+            doc_id = path.rsplit("-", 1)[-1]
+            return httpx.Response(200, json={
+                "feedDocumentId": path, "url": f"https://s3.test/report/{doc_id}", "compressionAlgorithm": "GZIP"})
+        if path.startswith("/report/"):
+            feed = self.uploads[path.rsplit("/", 1)[-1]]
+            # reject every SKU ending in 7
+            issues = [
+                {"messageId": m["messageId"], "code": "90220", "severity": "ERROR", "attributeNames": ["brand"]}
+                for m in feed["messages"] if m["sku"].endswith("7")
+            ] + [{"messageId": 1, "code": "18027", "severity": "WARNING"}]
+            return httpx.Response(200, content=gzip.compress(json.dumps({"issues": issues}).encode()))
+        return httpx.Response(404)
+
+def _feeds_client(monkeypatch) -> _FeedsStub:
+    stub = _FeedsStub()
+    monkeypatch.setattr(channel_http, "_client", (os.getpid(), httpx.Client(transport=httpx.MockTransport(stub))))
+    monkeypatch.setattr(base, "_CLIENTS", {})
+    monkeypatch.setattr(amazon_feeds, "FEED_MAX_MESSAGES", 1000)
+    for k, v in ENV.items():
+        monkeypatch.setenv(k, v)
+    client = base.get_client("amazon")
+    monkeypatch.setattr(client, "validate_listing", lambda p: (True, []))
+    return stub
+
+def test_feed_mode_packs_submits_and_maps_issues(monkeypatch):
+    stub = _feeds_client(monkeypatch)
+
+    items = [
+        TranslatedItem(id=f"S{i}", channel_payload={"sku": f"S{i}", "productType": "SHIRT", "attributes": {}})
+        for i in range(2500)
+    ]
+    errors, rejects = [], []
+    ids = upsert._bulk_upsert([items[:1250], items[1250:]], "amazon", False, errors, rejects)
+
+    # 2500 SKUs -> 3 feeds, and no per-item PUTs
+    assert len(stub.uploads) == 3
+    assert sorted(len(f["messages"]) for f in stub.uploads.values()) == [500, 1000, 1000]
+    assert not any(m == "PUT" and p.startswith("/listings") for m, p in stub.calls)
+    assert len([c for c in stub.calls if c[0] != "PUT"]) < 25
+    bad = {t.id for t in items if t.id.endswith("7")}
+    assert {r.id for r in rejects} == bad and len(ids) == 2500 - len(bad)
+    assert rejects[0].errors == ["feed:90220:brand"]
+    assert errors[0] == f"{rejects[0].id}: upsert:feed:90220:brand"
+
+def test_streamed_feed_mode_fills_feeds_across_chunks(monkeypatch, tmp_path):
+    stub = _feeds_client(monkeypatch)
+    path = str(tmp_path / "cat.jsonl")
+    synth.generate(path, 2500, seed=3)
+
+    res = run_pipeline("amazon", path, 50, False, {
+        "stream": True, "chunk_size": 400, "upsert_mode": "bulk", "input_format": "spapi-jsonl",
+        "force_resync": True})
+
+    # 7 chunks of <= 400 rows -> 3 feeds (not 7), each full but the last
+    valid = res["counts"]["valid"]
+    assert sorted(len(f["messages"]) for f in stub.uploads.values()) == [valid - 2000, 1000, 1000]
+    skus = [m["sku"] for f in stub.uploads.values() for m in f["messages"]]
+    assert len(set(skus)) == valid
+    bad = {s for s in skus if s.endswith("7")}
+    assert {r["id"] for r in res["rejects"]} >= bad
+    assert res["counts"]["upserted"] == valid - len(bad)
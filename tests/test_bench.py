@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+from bench import suite, synth
+from pipeline.graph import run_pipeline
+
+def test_generator_is_deterministic_and_dirty():
+    a = synth.csv_text(2000, seed=7)
+    assert a == synth.csv_text(2000, seed=7)
+    assert a != synth.csv_text(2000, seed=8)
+    rows = list(csv.DictReader(io.StringIO(a)))
+    assert len(rows) == 2000 and list(rows[0]) == synth.CSV_COLUMNS
+    assert len({r["id"] for r in rows}) == 2000
+    assert any(not r["title"] for r in rows) and any(len(r["title"]) > 200 for r in rows)
+    assert any("$" in r["price"] or "EUR" in r["price"] for r in rows)
+
+def test_jsonl_is_spapi_shaped(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    assert synth.generate(path, 50, seed=1) == 50
+    docs = [json.loads(line) for line in open(path)]
+    assert all(d["requirements"] == "LISTING" and "purchasable_offer" in d["attributes"] for d in docs)
+
+def test_pipeline_runs_on_synthetic_catalog(tmp_path):
+    path = str(tmp_path / "c.csv")
+    synth.generate(path, 500, seed=3, invalid_rate=0.2)
+    res = run_pipeline(channel="amazon", catalog_path=path, batch_size=50, dry_run=True, extra={"stream": True, "chunk_size": 200})
+    assert res["counts"]["input_items"] == 500
+    assert 0 < len(res["rejects"]) < 500
+
+def test_compare_flags_throughput_and_memory_regressions():
+    base = {"results": {"validate": {"items_per_sec": 1000.0, "peak_mem_mb": 10.0},
+                        "map_schema": {"items_per_sec": 500.0, "peak_mem_mb": 0.2}}}
+    cur = {"results": {"validate": {"items_per_sec": 800.0, "peak_mem_mb": 14.0},
+                       "map_schema": {"items_per_sec": 480.0, "peak_mem_mb": 0.9},
+                       "new_bench": {"items_per_sec": 1.0, "peak_mem_mb": 1.0}}}
+    msgs = suite.compare(base, cur)
+    assert len(msgs) == 3 and all(m.startswith("validate:") for m in msgs[:2])
+    assert msgs[2] == "new_bench: no baseline entry; record one with --save"
+
+def test_overhead_reports_every_mode(tmp_path):
+    res = suite.overhead(str(tmp_path), rows=3, number=2, repeat=1)
+    assert set(res["us_per_request"]) == set(suite.OVERHEAD_MODES) | {"run_pipeline_inline", "run_pipeline_langgraph"}
+    assert set(res["overhead_us"]) == set(suite.OVERHEAD_MODES[1:])
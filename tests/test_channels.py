@@ -0,0 +1,38 @@
+import os
+import httpx
+from channels import base, http as channel_http
+
+AMAZON_ENV = {
+    "LWA_CLIENT_ID": "id", "LWA_CLIENT_SECRET": "secret", "LWA_REFRESH_TOKEN": "rt",
+    "SPAPI_HOST": "https://sp.test", "SELLER_ID": "S1", "MARKETPLACE_IDS": "M1",
+    "SPAPI_SCHEMA_VALIDATE": "0",
+}
+
+def _stub_http(monkeypatch, calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/auth/o2/token":
+            return httpx.Response(200, json={"access_token": "tok", "expires_in": 3600})
+        return httpx.Response(200, json={})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(channel_http, "_client", (os.getpid(), client))
+    monkeypatch.setattr(base, "_CLIENTS", {})
+
+def test_registry_keeps_clients_and_tokens_alive(monkeypatch):
+    calls = []
+    _stub_http(monkeypatch, calls)
+    for k, v in AMAZON_ENV.items():
+        monkeypatch.setenv(k, v)
+    payload = {"sku": "A1", "productType": "SHIRT", "attributes": {}}
+
+    for _ in range(3):
+        c = base.get_client("amazon")
+        assert c.upsert_listing(payload)
+    assert c is base.get_client("amazon")
+    # one LWA refresh for all three upserts, all on the shared pooled client
+    assert calls.count("/auth/o2/token") == 1 and len(calls) == 4
+
+    # changed credentials rebuild the client
+    monkeypatch.setenv("SELLER_ID", "S2")
+    assert base.get_client("amazon") is not c
@@ -0,0 +1,51 @@
+import ast
+import csv
+from pipeline import columnar
+from pipeline.graph import run_pipeline
+
+ROWS = [
+    ["SKU-1", "  Big   Tee\t x ", " soft ", "Acme", "$1,299.00", "['a','a','b','c','d','e','f']", "k:v;k2: v2"],
+    ["", "Mug", "", " ", "abc", "x; y ;x", ""],
+    ["SKU-3", "", "d", "B", "-3", "", "novalue"],
+    ["SKU-4", "A" * 250, "", "", "nan", "[1,2", ":x;a:b"],
+    ["SKU-5", "Lamp", "", "Lux", "0", "('t',)", "k:v"],
+    # str.split() whitespace (not just ASCII), float()-only prices, -0, >15 digits, Unicode digits
+    ["SKU-6", "\x1cTea\u3000\u3000Cup\x85", "\xa0d\t", "Acme", "nan", '["a", "a"]', "a:1:2"],
+    ["SKU-7", "Pot", "", "Acme", "-0", "['x',]", ""],
+    ["SKU-8", "Pan", "", "Acme", "99999999999999999999", "Durable; Light", ""],
+    ["SKU-9", "Jar", "", "Acme", "\uff11\uff12", "None", ""],
+    ["SKU-10", "Lid", "", "Acme", "1_0", "5", ""],
+]
+
+def _write(path):
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "title", "description", "brand", "price", "bullet_points", "specifics"])
+        w.writerows(ROWS)
+
+def test_columnar_matches_row_path(tmp_path):
+    p = tmp_path / "dirty.csv"
+    _write(p)
+    for channel in ("amazon", "ebay"):
+        for extra in ({}, {"stream": True, "chunk_size": 2}):
+            kw = dict(channel=channel, catalog_path=str(p), batch_size=2, dry_run=True)
+            row = run_pipeline(extra=dict(extra), **kw)
+            col = run_pipeline(extra={"engine": "columnar", **extra}, **kw)
+            assert col["counts"] == row["counts"]
+            assert col["preview_mapped"] == row["preview_mapped"]
+            assert col["rejects"] == row["rejects"]
+            assert col["errors"] == row["errors"]
+
+def test_literal_fast_paths_match_literal_eval():
+    cases = ["['a','b']", '["a", "b"]', "['it''s']", "['a',]", "[1,2", "['a' 'b']", " ['x']",
+             "Lightweight;Gift ready", "None", "b'x'", "5", "{'a':1}", "Ärger", '["a\\u00e9"]']
+    for v in cases:
+        try:
+            want = ("ok", ast.literal_eval(v))
+        except Exception:
+            want = ("error",)
+        try:
+            got = ("ok", columnar._literal(v))
+        except Exception:
+            got = ("error",)
+        assert got == want, v
@@ -0,0 +1,40 @@
+from pipeline.state import PipelineState, TranslatedItem
+from pipeline.nodes import upsert
+
+class _RecordingClient:
+    name = "fake"
+
+    def __init__(self):
+        self.sent = []
+
+    def validate_listing(self, payload):
+        return True, []
+
+    def upsert_listing(self, payload):
+        self.sent.append(payload["sku"])
+        return True
+
+def _run(items, **extra):
+    state = PipelineState(channel="shop", catalog_path="x", dry_run=False, extra=extra,
+                          valid=items, batches=[range(0, 5), range(5, 10)])
+    return upsert.throttle_and_upsert_node(state)
+
+def test_only_new_or_changed_items_are_sent(monkeypatch):
+    client = _RecordingClient()
+    monkeypatch.setattr(upsert, "get_client", lambda channel: client)
+    items = [TranslatedItem(id=f"S{i}", channel_payload={"sku": f"S{i}", "price": "1.00"}) for i in range(10)]
+
+    out = _run(items)
+    assert (out.changed, out.skipped, len(client.sent)) == (10, 0, 10)
+
+    # same content in a different key order hashes the same; one price changed
+    items = [TranslatedItem(id=t.id, channel_payload={"price": "1.00", "sku": t.id}) for t in items]
+    items[7].channel_payload["price"] = "2.00"
+    client.sent.clear()
+    out = _run(items)
+    assert (out.changed, out.skipped, client.sent) == (1, 9, ["S7"])
+    assert out.upserted_ids == ["S7"] and out.batches == [range(0, 1)]
+
+    client.sent.clear()
+    out = _run(items, force_resync=True)
+    assert (out.changed, out.skipped, len(client.sent)) == (10, 0, 10)
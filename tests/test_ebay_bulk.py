@@ -0,0 +1,117 @@
+import json
+import os
+import httpx
+from channels import base, http as channel_http
+from rate_limit import limiter
+
+ENV = {
+    "EBAY_BASE_URL": "https://ebay.test", "EBAY_CLIENT_ID": "id", "EBAY_CLIENT_SECRET": "secret",
+    "EBAY_REFRESH_TOKEN": "rt-bulk", "EBAY_MARKETPLACE_ID": "EBAY_US",
+}
+
+class _EbayStandIn:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/oauth2/token"):
+            return httpx.Response(200, json={"access_token": "tok", "expires_in": 7200})
+        self.calls.append(path)
+        if path.endswith("/get_item_aspects_for_category"):
+            return httpx.Response(200, json={"aspects": [
+                {"localizedAspectName": "Color", "aspectConstraint": {"aspectRequired": True}}]})
+        if "/sell/account/v1/" in path:
+            kind = path.rsplit("/", 1)[-1].split("_")[0]  # payment / fulfillment / return
+            return httpx.Response(200, json={f"{kind}Policies": [{f"{kind}PolicyId": f"{kind}-1"}]})
+        body = json.loads(request.content or b"{}")
+        if path.endswith("/bulk_create_or_replace_inventory_item"):
+            return httpx.Response(207, json={"responses": [
+                {"statusCode": 400, "sku": r["sku"], "errors": [{"errorId": 25002}]} if r["sku"].endswith("7")
+                else {"statusCode": 200, "sku": r["sku"]} for r in body["requests"]]})
+        if path.endswith("/bulk_create_offer"):
+            return httpx.Response(200, json={"responses": [
+                {"statusCode": 201, "sku": r["sku"], "offerId": f"O-{r['sku']}"} for r in body["requests"]]})
+        if path.endswith("/bulk_publish_offer"):
+            return httpx.Response(200, json={"responses": [
+                {"statusCode": 200, "offerId": r["offerId"], "listingId": "L"} for r in body["requests"]]})
+        if path.endswith("/offer"):
+            return httpx.Response(201, json={"offerId": "O"})
+        return httpx.Response(204)
+
+def _client(monkeypatch, tmp_path):
+    # count calls, don't wait on the real eBay quotas
+    cfg = tmp_path / "rate_limits.yaml"
+    cfg.write_text("ebay: {rate_per_sec: 100000, burst: 100000}\n")
+    monkeypatch.setattr(limiter, "CONFIG_PATH", cfg)
+    monkeypatch.setattr(limiter, "_limiters", {})
+    stub = _EbayStandIn()
+    monkeypatch.setattr(channel_http, "_client", (os.getpid(), httpx.Client(transport=httpx.MockTransport(stub))))
+    monkeypatch.setattr(base, "_CLIENTS", {})
+    for k, v in ENV.items():
+        monkeypatch.setenv(k, v)
+    return base.get_client("ebay"), stub
+
+def test_bulk_path_cuts_calls_more_than_20x(monkeypatch, tmp_path):
+    payloads = [
+        {"sku": f"S{i}", "title": "Tee", "brand": "Acme", "price": "9.99", "mode": "LIVE"} for i in range(100)
+    ]
+    client, stub = _client(monkeypatch, tmp_path)
+    for p in payloads:
+        client.upsert_listing(p)
+    per_item = len(stub.calls)
+
+    client, stub = _client(monkeypatch, tmp_path)
+    results = client.upsert_bulk(payloads + [{"title": "no sku"}])
+    bulk = len(stub.calls)
+
+    assert per_item / bulk > 20
+    # policies listed once for the whole job
+    assert sum("/sell/account/v1/" in c for c in stub.calls) == 3
+    failed = {payloads[i]["sku"] for i, errs in enumerate(results[:100]) if errs}
+    assert failed == {p["sku"] for p in payloads if p["sku"].endswith("7")}
+    assert results[17] == ["ebay:25002"] and results[-1] == ["sku:missing"]
+
+def test_metadata_cache_prefetches_categories_and_persists(monkeypatch, tmp_path):
+    monkeypatch.setenv("EBAY_METADATA_CACHE_DIR", str(tmp_path / "meta"))
+    payloads = [
+        {"sku": f"S{i}", "title": "Tee", "brand": "Acme", "price": "9.99", "categoryId": str(i % 5),
+         **({"color": "red"} if i % 2 else {})}
+        for i in range(500)
+    ]
+    client, stub = _client(monkeypatch, tmp_path)
+    client.prefetch(payloads)
+    assert sorted(stub.calls) == [client._aspects_url().split("ebay.test")[1]] * 5
+    results = [client.validate_listing(p) for p in payloads]
+    assert len(stub.calls) == 5  # validation itself made no calls
+    assert results[0] == (False, ["aspects:missing:Color"]) and results[1] == (True, [])
+
+    # policies: listed once, then served from the cache for every later upsert
+    client.upsert_listing(payloads[1])
+    client.upsert_listing(payloads[3])
+    assert sum("/sell/account/v1/" in c for c in stub.calls) == 3
+
+    # a new process (fresh client) reuses the on-disk metadata
+    client, stub = _client(monkeypatch, tmp_path)
+    client.prefetch(payloads)
+    client.upsert_listing(payloads[1])
+    assert not any("aspects" in c or "/sell/account/v1/" in c for c in stub.calls)
+
+def test_policy_lookup_failure_is_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setenv("EBAY_METADATA_CACHE_DIR", str(tmp_path / "meta"))
+    stub = _EbayStandIn()
+    down = {"return_policy"}
+
+    def flaky(request):
+        if request.url.path.rsplit("/", 1)[-1] in down:
+            return httpx.Response(403)
+        return stub(request)
+
+    client, _ = _client(monkeypatch, tmp_path)
+    monkeypatch.setattr(client, "http", httpx.Client(transport=httpx.MockTransport(flaky)))
+    assert client._find_policies()["returnPolicyId"] == ""
+
+    # the 403 wasn't cached as "no return policy": the next job looks it up again
+    down.clear()
+    assert client._find_policies() == {
+        "paymentPolicyId": "payment-1", "fulfillmentPolicyId": "fulfillment-1", "returnPolicyId": "return-1"}
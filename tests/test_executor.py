@@ -0,0 +1,24 @@
+from bench import synth
+from pipeline import graph
+from pipeline.graph import get_graph, run_pipeline
+
+def test_compiled_graphs_are_cached_per_key():
+    assert get_graph() is get_graph()
+    assert get_graph(entry="plan_batches") is not get_graph()
+    assert get_graph(executor="inline") is get_graph(executor="inline")
+    assert [s.__name__ for s in get_graph(entry="validate", executor="inline").steps] == [
+        "validate_node", "plan_batches_node", "throttle_and_upsert_node", "reconcile_node"]
+
+def test_inline_executor_matches_langgraph(tmp_path, monkeypatch):
+    path = str(tmp_path / "c.csv")
+    synth.generate(path, 120, seed=9, invalid_rate=0.2)
+    for extra in ({"stream": True, "chunk_size": 50}, {"engine": "columnar"}):
+        runs = [run_pipeline("ebay", path, 20, False, {**extra, "force_resync": True, "executor": ex})
+                for ex in ("langgraph", "inline")]
+        assert runs[0] == runs[1] and runs[0]["counts"]["upserted"] > 0
+
+    # deployment default, and profiled runs time each node on the inline path too
+    monkeypatch.setenv("PIPELINE_EXECUTOR", "inline")
+    assert graph._executor({}) == "inline" and graph._executor({"executor": "langgraph"}) == "langgraph"
+    res = run_pipeline("ebay", path, 20, True, {"profile": True})
+    assert "throttle_and_upsert" in res["profile"]["nodes"]
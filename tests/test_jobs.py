@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+import pytest
+from pipeline import jobs
+from storage import db
+
+def _wait(job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = db.get_job(job_id)
+        if job["status"] in ("succeeded", "failed", "cancelled"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+def _chunked_pipeline(gate=None, chunks=3):
+    def run(channel, catalog_path, batch_size, dry_run, extra, on_progress=None):
+        counts = {"input": 0, "accepted": 0}
+        for _ in range(chunks):
+            if gate is not None:
+                gate.wait(5)
+            counts["input"] += 10
+            counts["accepted"] += 9
+            on_progress(dict(counts))
+        return {"counts": counts, "errors": ["bad"] * 5, "rejects": [], "preview_mapped": []}
+    return run
+
+def test_job_runs_and_reports_progress(monkeypatch):
+    monkeypatch.setattr(jobs, "run_pipeline", _chunked_pipeline())
+    monkeypatch.setenv("JOB_MAX_ERRORS", "2")
+    runner = jobs.JobRunner(workers=1)
+    try:
+        job = _wait(runner.submit("amazon", {"catalog_path": "x.csv"}))
+    finally:
+        runner.shutdown()
+    assert job["status"] == "succeeded"
+    assert job["counts"] == {"input": 30, "accepted": 27}
+    assert job["errors"] == ["bad", "bad"] and job["result"]["errors_truncated"]
+    assert job["params"]["catalog_path"] == "x.csv"
+
+def test_cancel_stops_between_chunks(monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(jobs, "run_pipeline", _chunked_pipeline(gate, chunks=100))
+    runner = jobs.JobRunner(workers=1)
+    try:
+        job_id = runner.submit("amazon", {"catalog_path": "x.csv"})
+        assert db.request_cancel(job_id)
+        gate.set()
+        job = _wait(job_id)
+    finally:
+        runner.shutdown()
+    assert job["status"] == "cancelled"
+    assert job["counts"].get("input", 0) <= 10
+    assert not db.request_cancel(job_id)  # already finished
+
+def test_admission_control_refuses_when_full(monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(jobs, "run_pipeline", _chunked_pipeline(gate, chunks=1))
+    runner = jobs.JobRunner(workers=1, max_queued=2)
+    try:
+        a = runner.submit("amazon", {"catalog_path": "x.csv"})
+        b = runner.submit("amazon", {"catalog_path": "x.csv"})
+        with pytest.raises(jobs.QueueFull):
+            runner.submit("amazon", {"catalog_path": "x.csv"})
+        gate.set()
+        assert _wait(a)["status"] == _wait(b)["status"] == "succeeded"
+        # slots free up once jobs finish
+        time.sleep(0.05)
+        assert _wait(runner.submit("amazon", {"catalog_path": "x.csv"}))["status"] == "succeeded"
+    finally:
+        runner.shutdown()
+
+def test_shutdown_only_cancels_this_process_jobs(monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(jobs, "run_pipeline", _chunked_pipeline(gate, chunks=100))
+    other = db.create_job("translate", "amazon", {})
+    db.update_job(other, owner=os.getppid())  # a live sibling worker's job
+    runner = jobs.JobRunner(workers=1)
+    running = runner.submit("amazon", {"catalog_path": "x.csv"})
+    queued = runner.submit("amazon", {"catalog_path": "x.csv"})
+    runner.shutdown()
+    gate.set()
+    assert _wait(running)["status"] == "cancelled"
+    assert db.get_job(queued)["status"] == "cancelled"  # never left waiting as "queued"
+    job = db.get_job(other)
+    assert job["status"] == "queued" and not job["cancel"]
+
+def test_jobs_of_dead_processes_are_failed():
+    job_id = db.create_job("translate", "amazon", {})
+    db.update_job(job_id, owner=2 ** 22 + 12345, boot="crashed-worker")
+    assert db.fail_interrupted_jobs() == 1
+    job = db.get_job(job_id)
+    assert (job["status"], job["error"]) == ("failed", "interrupted")
+
+def test_jobs_of_a_previous_boot_with_a_reused_pid_are_failed():
+    job_id = db.create_job("translate", "amazon", {})
+    db.update_job(job_id, boot="earlier-boot")  # same PID, e.g. 1 after a container restart
+    mine = db.create_job("translate", "amazon", {})
+    assert db.fail_interrupted_jobs() == 1
+    assert db.get_job(job_id)["status"] == "failed"
+    assert db.get_job(mine)["status"] == "queued"
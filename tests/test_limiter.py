@@ -0,0 +1,159 @@
+import pytest
+from rate_limit import limiter
+
+CONFIG = """
+shop:
+  rate_per_sec: 0.01
+  burst: 10
+  operations:
+    putItem: {rate_per_sec: 0.01, burst: 4, cost: 2}
+"""
+
+def _use_config(tmp_path, monkeypatch, text=CONFIG):
+    p = tmp_path / "rate_limits.yaml"
+    p.write_text(text)
+    monkeypatch.setattr(limiter, "CONFIG_PATH", p)
+    monkeypatch.setattr(limiter, "_limiters", {})
+
+def test_operation_cost_charges_both_buckets(tmp_path, monkeypatch):
+    _use_config(tmp_path, monkeypatch)
+    limiter.acquire("shop", "putItem")
+    op = limiter.get_limiter("shop", "putItem")
+    ch = limiter.get_limiter("shop")
+    assert round(op.tokens, 2) == 2 and round(ch.tokens, 2) == 8
+    # unknown operations only hit the channel bucket, at cost 1
+    limiter.acquire("shop", "getItem")
+    assert round(ch.tokens, 2) == 7
+
+class _RedisStandIn:
+    """Runs the bucket script's algorithm in-process, atomically, like a Redis EVAL."""
+
+    def __init__(self):
+        import threading
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def eval(self, script, numkeys, key, rate, burst, cost):
+        import time
+        from rate_limit.backends import RESERVE_SCRIPT, _refill_and_reserve, _refill_and_take
+        fn = _refill_and_reserve if script == RESERVE_SCRIPT else _refill_and_take
+        with self.lock:
+            now = time.time()
+            tokens, ts = self.data.get(key, (burst, now))
+            tokens, wait = fn(tokens, ts, now, rate, burst, cost)
+            self.data[key] = (tokens, now)
+            return str(wait).encode()
+
+def test_shared_backends_enforce_one_quota(tmp_path, monkeypatch):
+    from rate_limit.backends import RedisBackend, SQLiteBackend
+    for backend in (SQLiteBackend(str(tmp_path / "rl.db")), RedisBackend(_RedisStandIn())):
+        granted = [backend.take("shop", 0.01, 3, 1) for _ in range(4)]
+        assert granted[:3] == [0.0, 0.0, 0.0] and granted[3] > 0
+        # reservations always take, so each later caller is told to wait longer
+        waits = [backend.reserve("queue", 1, 1, 1) for _ in range(3)]
+        assert waits[0] == 0.0 and 0.9 < waits[1] < 1.1 and 1.9 < waits[2] < 2.1
+
+def test_bucket_backend_is_abstract():
+    from rate_limit.backends import BucketBackend
+
+    class TakeOnly(BucketBackend):
+        def take(self, key, rate, burst, cost):
+            return 0.0
+
+    for cls in (BucketBackend, TakeOnly):
+        with pytest.raises(TypeError):
+            cls()
+
+def test_sqlite_backend_is_shared_across_processes(tmp_path, monkeypatch):
+    import multiprocessing as mp
+    from rate_limit.backends import SQLiteBackend
+    path = str(tmp_path / "rl.db")
+    # sqlite locks must not be inherited across fork(): create the table, then drop the connection
+    SQLiteBackend(path)._conn().close()
+    with mp.get_context("fork").Pool(2) as pool:
+        waits = pool.starmap(_take_from, [(path,)] * 6)
+    assert sorted(w == 0.0 for w in waits) == [False, False, True, True, True, True]
+
+def _take_from(path):
+    from rate_limit.backends import SQLiteBackend
+    return SQLiteBackend(path).take("shop", 0.01, 4, 1)
+
+def test_limiter_uses_configured_backend(tmp_path, monkeypatch):
+    _use_config(tmp_path, monkeypatch)
+    monkeypatch.setenv("RATE_LIMIT_BACKEND", f"sqlite:///{tmp_path / 'rl.db'}")
+    lim = limiter.get_limiter("shop", "putItem")
+    assert isinstance(lim, limiter.SharedBucketLimiter)
+    limiter.acquire("shop", "putItem")
+    monkeypatch.delenv("RATE_LIMIT_BACKEND")
+    assert isinstance(limiter.get_limiter("shop"), limiter.SlidingWindowLimiter)
+
+class _Resp:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+def test_aimd_backs_off_on_429_and_recovers(tmp_path, monkeypatch):
+    _use_config(tmp_path, monkeypatch, "shop:\n  rate_per_sec: 10\n  burst: 10\n  max_retries: 1\n")
+    responses = iter([_Resp(429, {"Retry-After": "0"}), _Resp(200)])
+    r = limiter.send("shop", None, lambda: next(responses))
+    lim = limiter.get_limiter("shop")
+    # throttled once (rate halved), retried, then one additive step back up
+    assert r.status_code == 200 and lim.aimd.throttled == 1
+    assert 5 < lim.rate < 5.5
+    # the marketplace's advertised limit caps the adapted rate
+    limiter.observe("shop", None, 200, {"x-amzn-RateLimit-Limit": "2.0"})
+    assert lim.rate == 2.0 and limiter.effective_rates()["shop"]["max_rate"] == 2.0
+
+def test_aimd_never_exceeds_configured_rate_unless_raised(tmp_path, monkeypatch):
+    _use_config(tmp_path, monkeypatch, "shop:\n  rate_per_sec: 10\n  burst: 10\n")
+    lim = limiter.get_limiter("shop")
+    for _ in range(100):
+        limiter.observe("shop", None, 200, {})
+    assert lim.rate == 10
+    # an advertised limit above the configured rate lifts the ceiling
+    for _ in range(100):
+        limiter.observe("shop", None, 200, {"x-amzn-RateLimit-Limit": "12"})
+    assert lim.rate == 12
+
+def test_reservations_are_fifo_and_never_block_try_acquire():
+    import threading
+    import time
+    lim = limiter.SlidingWindowLimiter(20, 1)
+    order = []
+
+    def worker(i):
+        with lim():
+            order.append(i)
+
+    threads = []
+    for i in range(6):
+        threads.append(threading.Thread(target=worker, args=(i,)))
+        threads[-1].start()
+        time.sleep(0.005)  # arrive in index order
+    # waiters sleep outside the lock, so a non-blocking probe answers immediately
+    t0 = time.perf_counter()
+    assert lim.try_acquire() is False
+    assert time.perf_counter() - t0 < 0.01
+    for t in threads:
+        t.join()
+    assert order == list(range(6))
+
+def test_async_acquire_queues_without_blocking_the_loop():
+    import asyncio
+    import time
+
+    async def main():
+        lim = limiter.SlidingWindowLimiter(100, 1)
+        done = []
+
+        async def one(i):
+            await lim.acquire()
+            done.append((i, time.perf_counter()))
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(10)))
+        return done, time.perf_counter() - t0
+
+    done, elapsed = asyncio.run(main())
+    assert [i for i, _ in done] == list(range(10))
+    assert 0.08 < elapsed < 0.3  # 9 waits of 10ms each, paid concurrently
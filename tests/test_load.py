@@ -0,0 +1,71 @@
+import httpx
+import pytest
+from bench import load, standin
+
+LIMITS = """
+amazon:
+  rate_per_sec: 500
+  burst: 500
+ebay:
+  rate_per_sec: 500
+  burst: 500
+"""
+
+@pytest.fixture
+def fast_limits(monkeypatch, tmp_path):
+    path = tmp_path / "limits.yaml"
+    path.write_text(LIMITS)
+    monkeypatch.setenv("RATE_LIMITS_PATH", str(path))
+
+def test_standin_quota_errors_and_drops():
+    faults = {
+        "default": {"error_rate": 0.0},
+        "operations": {
+            "putListingsItem": {"quota": {"rate_per_sec": 0.5, "burst": 2}},
+            "createOffer": {"error_rate": 1.0, "error_status": 503},
+            "publishOffer": {"drop_rate": 1.0},
+        },
+    }
+    with standin.StandIn(faults) as s, httpx.Client(base_url=s.url) as c:
+        statuses = [c.put("/listings/2021-08-01/items/S/A1", json={}).status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        r = c.put("/listings/2021-08-01/items/S/A1", json={})
+        assert float(r.headers["Retry-After"]) > 0 and r.headers["x-amzn-RateLimit-Limit"] == "0.5"
+        assert c.post("/sell/inventory/v1/offer", json={}).status_code == 503
+        with pytest.raises(httpx.TransportError):
+            c.post("/sell/inventory/v1/offer/1/publish")
+        assert c.get("/nope").status_code == 404
+        stats = s.stats()
+    assert stats["putListingsItem"]["statuses"] == {200: 2, 429: 2}
+    assert stats["publishOffer"]["drops"] == 1
+
+def test_amazon_load_run_end_to_end(fast_limits, tmp_path):
+    rep = load.run("amazon", str(tmp_path), rows=60, seed=5, concurrency=4,
+                   faults={"default": {"latency": {"dist": "fixed", "value": 0.001}}})
+    c = rep["counts"]
+    assert c["input_items"] == 60 and c["upserted"] > 0
+    assert c["upserted"] + c["errors"] == 60
+    ops = rep["operations"]
+    assert ops["putListingsItem"]["calls"] == c["upserted"] == rep["server"]["putListingsItem"]["requests"]
+    assert ops["lwaToken"]["calls"] == 1
+    assert ops["putListingsItem"]["limiter"]["configured_per_sec"] == 500
+
+def test_ebay_faults_fail_items_not_the_run(fast_limits, tmp_path):
+    faults = {
+        "default": {"latency": {"dist": "fixed", "value": 0.001}},
+        "operations": {"createOffer": {"drop_rate": 0.2, "error_rate": 0.2}},
+    }
+    # sequential engine: a dropped connection must not abort the request
+    rep = load.run("ebay", str(tmp_path), rows=60, seed=5, concurrency=1, faults=faults)
+    kinds = rep["item_errors"]
+    assert rep["counts"]["upserted"] > 0
+    assert kinds.get("upsert:failed") and any(k.startswith("upsert:error:") for k in kinds)
+    offer = rep["operations"]["createOffer"]
+    assert offer["error_rate"] > 0 and "error" in offer["statuses"]
+
+def test_histogram_quantile_interpolates():
+    from utils import metrics
+    h = metrics.HTTP_SECONDS
+    counts = [0] * (len(h.buckets) + 2)
+    counts[h.buckets.index(0.05)] = 10  # all in (0.025, 0.05]
+    assert load.quantile(h, counts, 0.5) == pytest.approx(0.0375)
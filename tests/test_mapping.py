@@ -5,3 +5,56 @@ def test_sample_translation():
     assert out["counts"]["input_items"] == 3
     assert out["counts"]["mapped"] == 3
     assert out["counts"]["valid"] >= 2
+
+def test_compiled_plan_resolves_sources_and_defaults():
+    from pipeline.state import Item
+    from pipeline.nodes.map_schema import compile_mapping
+    plan = compile_mapping({
+        "title": "title",
+        "brand": {"source": "brand", "default": "Generic"},
+        "color": "color",
+        "odd": 42,
+    })
+    it = Item(id="1", title="Tee", description="", attributes={"brand": "", "color": "Red"})
+    assert plan(it) == {"title": "Tee", "brand": "Generic", "color": "Red", "odd": ""}
+
+def test_mapping_cache_invalidates_on_change(tmp_path, monkeypatch):
+    from schema.mapping import loader
+    monkeypatch.setattr(loader, "MAPPING_DIR", tmp_path)
+    monkeypatch.setattr(loader, "_CACHE", {})
+    p = tmp_path / "shop.yaml"
+    p.write_text("title: title\n")
+    m1, v1 = loader.get_mapping("shop")
+    assert loader.get_mapping("shop")[0] is m1
+    p.write_text("title: name\nprice: price\n")
+    m2, v2 = loader.get_mapping("shop")
+    assert v2 != v1 and m2 == {"title": "name", "price": "price"}
+
+def test_ebay_mapping_emits_sku():
+    from pipeline.graph import _load_items
+    from pipeline.nodes.map_schema import map_schema_node
+    from pipeline.state import PipelineState
+    items = _load_items("data/samples/catalog_sample.csv")
+    mapped = map_schema_node(PipelineState(channel="ebay", catalog_path="", items=list(items))).mapped
+    # the eBay clients key inventory items by sku; without it every upsert fails before any call
+    assert [m.channel_payload["sku"] for m in mapped] == [it.id for it in items]
+
+def test_spapi_jsonl_listings_are_validated_by_shape(tmp_path):
+    import json
+    docs = [
+        {"sku": "OK-1", "productType": "SHIRT", "attributes": {"item_name": [{"value": "Tee"}]}},
+        {"sku": "OK-2", "productType": "SHIRT", "attributes": {}},  # no flat title/price needed
+        {"sku": " ", "productType": "SHIRT", "attributes": {}},
+        {"sku": "BAD-2", "attributes": {}},
+        {"sku": "BAD-3", "productType": "SHIRT", "attributes": ["not", "a", "dict"]},
+    ]
+    p = tmp_path / "listings.jsonl"
+    p.write_text("".join(json.dumps(d) + "\n" for d in docs))
+    out = run_pipeline(channel="amazon", catalog_path=str(p), batch_size=10, dry_run=True,
+                       extra={"input_format": "spapi-jsonl"})
+    assert out["counts"]["valid"] == 2
+    assert {r["id"]: r["errors"] for r in out["rejects"]} == {
+        " ": ["sku:missing"],
+        "BAD-2": ["productType:missing"],
+        "BAD-3": ["attributes:missing_or_not_dict"],
+    }
@@ -0,0 +1,69 @@
+import multiprocessing as mp
+from utils import metrics
+
+def _worker(ready):
+    metrics.PIPELINE_ITEMS.inc(5, channel="t", stage="upserted")
+    metrics.NODE_SECONDS.observe(0.2, node="t_node")
+    metrics.JOBS_ACTIVE.set(7, state="t")
+    metrics.flush()
+    ready.set()
+
+def _clear():
+    for m in metrics._REGISTRY.values():
+        m.clear()
+
+def test_render_counters_and_histograms():
+    _clear()
+    metrics.HTTP_RESPONSES.inc(channel="amazon", operation="getListingsItem", status=200)
+    metrics.HTTP_RESPONSES.inc(channel="amazon", operation="getListingsItem", status=200)
+    for v in (0.003, 0.2, 99):
+        metrics.HTTP_SECONDS.observe(v, channel="amazon", operation='a"b')
+    text = metrics.render()
+    assert 'channel_responses_total{channel="amazon",operation="getListingsItem",status="200"} 2' in text
+    assert 'channel_request_seconds_bucket{channel="amazon",operation="a\\"b",le="0.005"} 1' in text
+    assert 'channel_request_seconds_bucket{channel="amazon",operation="a\\"b",le="0.25"} 2' in text
+    assert 'channel_request_seconds_bucket{channel="amazon",operation="a\\"b",le="+Inf"} 3' in text
+    assert 'channel_request_seconds_count{channel="amazon",operation="a\\"b"} 3' in text
+    assert "# TYPE channel_request_seconds histogram" in text
+
+def test_workers_are_merged_through_metrics_dir(tmp_path, monkeypatch):
+    _clear()
+    monkeypatch.setenv("METRICS_DIR", str(tmp_path))
+    metrics.PIPELINE_ITEMS.inc(2, channel="t", stage="upserted")
+    metrics.NODE_SECONDS.observe(0.2, node="t_node")
+    ctx = mp.get_context("fork")
+    ready = ctx.Event()
+    p = ctx.Process(target=_worker, args=(ready,))
+    p.start()
+    p.join(10)
+    assert ready.is_set()
+
+    # the exited worker's counters still count, its gauges don't
+    assert metrics.total("pipeline_items_total", channel="t", stage="upserted") == 7
+    assert metrics.collect()["pipeline_node_seconds"][("t_node",)][-1] == 0.4
+    assert ("t",) not in metrics.collect()["jobs_active"]
+
+def test_pipeline_records_stages_and_node_latency():
+    from pipeline.graph import run_pipeline
+    _clear()
+    run_pipeline(channel="amazon", catalog_path="data/samples/catalog_sample.csv", batch_size=2, dry_run=True, extra={})
+    assert metrics.total("pipeline_items_total", channel="amazon", stage="input_items") == 3
+    assert metrics.total("pipeline_items_total", channel="amazon", stage="dry_run") == 3
+    nodes = {k[0] for k in metrics.collect()["pipeline_node_seconds"]}
+    assert {"map_schema", "validate", "plan_batches", "throttle_and_upsert", "reconcile"} <= nodes
+
+def test_metrics_endpoint_negotiates_json_summary():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    _clear()
+    metrics.PIPELINE_ITEMS.inc(6, channel="t", stage="upserted")
+    metrics.NODE_SECONDS.observe(3.0, node="throttle_and_upsert")
+    client = TestClient(app)
+
+    summary = client.get("/metrics/summary").json()
+    assert summary["accepted"] == 6 and summary["throughput_per_min"] == 120.0
+    assert client.get("/metrics", headers={"Accept": "application/json"}).json() == summary
+    scrape = client.get("/metrics", headers={"Accept": "application/openmetrics-text;version=1.0.0,text/plain;q=0.5,*/*;q=0.1"})
+    assert scrape.headers["content-type"].startswith("text/plain")
+    assert 'pipeline_items_total{channel="t",stage="upserted"} 6' in scrape.text
+    assert client.get("/metrics").headers["content-type"].startswith("text/plain")
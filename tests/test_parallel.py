@@ -0,0 +1,48 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from pipeline.graph import run_pipeline
+from pipeline import parallel
+
+def _double(channel, chunk):
+    return [2 * x for x in chunk]
+
+def test_resolve_workers(monkeypatch):
+    monkeypatch.setattr(parallel, "_cpus", lambda: 8)
+    monkeypatch.setenv("PIPELINE_WORKERS", "3")
+    assert parallel.resolve_workers({}) == 3
+    assert parallel.resolve_workers({"workers": 2}) == 2
+    monkeypatch.delenv("PIPELINE_WORKERS")
+    assert parallel.resolve_workers(None) == 1
+    # clamped to the CPUs and PIPELINE_MAX_WORKERS
+    assert parallel.resolve_workers({"workers": 5000}) == 8
+    monkeypatch.setenv("PIPELINE_MAX_WORKERS", "4")
+    assert parallel.resolve_workers({"workers": "auto"}) == 4
+    with pytest.raises(ValueError):
+        parallel.resolve_workers({"workers": "four"})
+
+def test_malformed_workers_is_a_400():
+    client = TestClient(app)
+    body = {"catalog_path": "data/samples/catalog_sample.csv", "extra": {"workers": "four"}}
+    for url in ("/translate/amazon", "/jobs/translate/amazon", "/review/amazon"):
+        r = client.post(url, json=body)
+        assert r.status_code == 400 and "workers" in r.json()["detail"]
+
+def test_one_shared_pool(monkeypatch):
+    monkeypatch.setattr(parallel, "_cpus", lambda: 2)
+    try:
+        assert parallel.get_pool() is parallel.get_pool()
+        assert parallel.map_chunks(_double, "x", list(range(50)), 2) == [2 * i for i in range(50)]
+    finally:
+        parallel.shutdown_pools()
+
+def test_process_pool_keeps_order(monkeypatch):
+    monkeypatch.setattr(parallel, "MIN_PARALLEL_ITEMS", 0)
+    monkeypatch.setattr(parallel, "_cpus", lambda: 2)
+    kw = dict(channel="amazon", catalog_path="data/samples/catalog_sample.csv", batch_size=2, dry_run=True)
+    serial = run_pipeline(extra={}, **kw)
+    pooled = run_pipeline(extra={"workers": 2}, **kw)
+    parallel.shutdown_pools()
+    assert pooled["counts"] == serial["counts"]
+    assert pooled["preview_mapped"] == serial["preview_mapped"]
+    assert pooled["rejects"] == serial["rejects"]
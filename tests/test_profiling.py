@@ -0,0 +1,72 @@
+import json
+import time
+from pipeline import graph
+from pipeline.nodes import upsert
+from utils import profiling
+
+CATALOG = "data/samples/catalog_sample.csv"
+
+class _WaitingClient:
+    name = "fake"
+
+    def validate_listing(self, payload):
+        # what limiter.acquire reports when a bucket makes us wait
+        profiling.record_wait("fake", "validate", 0.01)
+        time.sleep(0.001)
+        return True, []
+
+def _run(**extra):
+    return graph.run_pipeline(channel="amazon", catalog_path=CATALOG, batch_size=2, dry_run=True, extra=extra)
+
+def test_off_by_default():
+    assert "profile" not in _run()
+    assert profiling.current() is None
+
+def test_breakdown_per_node_client_and_wait(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(upsert, "get_client", lambda channel: _WaitingClient())
+    prof = _run(profile=True)["profile"]
+
+    nodes = prof["nodes"]
+    assert {"read_catalog", "map_schema", "validate", "plan_batches", "throttle_and_upsert", "reconcile"} <= set(nodes)
+    assert nodes["throttle_and_upsert"]["wait_ms"] == 30.0  # 3 items x 10 ms, attributed to the node
+    assert prof["waits"]["fake/validate"]["calls"] == 3
+    assert prof["client"]["fake.validate_listing"]["calls"] == 3
+    assert all(n["peak_mem_kb"] >= 0 for n in nodes.values())
+    assert prof["wall_ms"] >= nodes["throttle_and_upsert"]["wall_ms"]
+
+    saved = json.loads((tmp_path / f"{prof['id']}.json").read_text())
+    assert saved["nodes"] == nodes and prof["artifact"] == f"/profiles/{prof['id']}"
+    assert profiling.current() is None
+
+def test_sampling_writes_collapsed_stacks(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_SAMPLE_INTERVAL", "0.001")
+
+    class _Slow(_WaitingClient):
+        def validate_listing(self, payload):
+            time.sleep(0.02)
+            return True, []
+
+    monkeypatch.setattr(upsert, "get_client", lambda channel: _Slow())
+    prof = _run(profile="sample")["profile"]
+    folded = (tmp_path / f"{prof['id']}.folded").read_text().splitlines()
+    assert folded and any("validate_listing" in line for line in folded)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded)
+
+def test_overlapping_profiles_share_tracemalloc():
+    import tracemalloc
+    a, b = profiling.Profile(), profiling.Profile()
+    ta = a.start()
+    tb = b.start()
+    a.finish(ta)  # the other run is still measuring: the trace must outlive this one
+    assert tracemalloc.is_tracing()
+    b.finish(tb)
+    assert not tracemalloc.is_tracing()
+
+def test_old_artifacts_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_KEEP", "2")
+    for _ in range(3):
+        _run(profile=True)
+    assert len(list(tmp_path.glob("*.json"))) == 2
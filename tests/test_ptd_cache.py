@@ -0,0 +1,71 @@
+import os
+import threading
+import httpx
+from channels import http as channel_http
+from models import ptd_validator as ptd
+from utils.cache import LRUCache, SingleFlight
+
+SCHEMA = {"type": "object", "required": ["brand"], "properties": {"brand": {"type": "array"}}}
+
+def _stub(monkeypatch, tmp_path, calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        pt = request.url.path.rsplit("/", 1)[-1]
+        calls.append((pt, request.headers.get("if-none-match")))
+        if pt == "NOPE":
+            return httpx.Response(404)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"schema": SCHEMA}, headers={"etag": '"v1"'})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(channel_http, "_client", (os.getpid(), client))
+    monkeypatch.setattr(ptd, "_CACHE", LRUCache(8))
+    monkeypatch.setenv("PTD_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ptd, "_INFLIGHT", SingleFlight())
+
+def _validate(pt, attrs):
+    return ptd.validate_attributes_with_ptd("https://sp.test", ["M1"], "tok", pt, attrs)
+
+def test_one_definitions_call_per_product_type(monkeypatch, tmp_path):
+    calls = []
+    _stub(monkeypatch, tmp_path, calls)
+    results = []
+    items = [("SHIRT" if i % 2 else "SHOES", {"brand": ["x"]} if i % 3 else {}) for i in range(200)]
+    threads = [threading.Thread(target=lambda it=it: results.append(_validate(*it))) for it in items]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(pt for pt, _ in calls) == ["SHIRT", "SHOES"]
+    assert sum(1 for ok, _ in results if not ok) == sum(1 for _, a in items if not a)
+    v = ptd.get_validator("https://sp.test", ["M1"], "tok", "SHIRT")
+    assert v is ptd.get_validator("https://sp.test", ["M1"], "tok", "SHIRT")
+
+    # unknown product types are negative-cached
+    assert _validate("NOPE", {}) == (False, ["productType:unsupported:NOPE"])
+    assert _validate("NOPE", {}) == (False, ["productType:unsupported:NOPE"])
+    assert [c for c in calls if c[0] == "NOPE"] == [("NOPE", None)]
+
+def test_disk_tier_survives_restart_and_revalidates_with_etag(monkeypatch, tmp_path):
+    calls = []
+    _stub(monkeypatch, tmp_path, calls)
+    assert _validate("SHIRT", {"brand": ["x"]}) == (True, [])
+    # "restart": memory tier gone, disk entry still fresh -> no call
+    monkeypatch.setattr(ptd, "_CACHE", LRUCache(8))
+    assert _validate("SHIRT", {}) == (False, ["schema:required:attributes/<root>"])
+    assert len(calls) == 1
+    # after the TTL, the disk copy is revalidated with If-None-Match and reused on 304
+    monkeypatch.setattr(ptd, "_CACHE", LRUCache(8))
+    monkeypatch.setattr(ptd, "_TTL", -1)
+    key = ptd._cache_key("https://sp.test", ["M1"], "SHIRT")
+    ptd._disk().put(key, {**ptd._disk().get(key), "exp": 0})
+    assert _validate("SHIRT", {"brand": ["x"]}) == (True, [])
+    assert calls[-1] == ("SHIRT", '"v1"')
+
+def test_no_disk_tier_unless_configured(monkeypatch, tmp_path):
+    calls = []
+    _stub(monkeypatch, tmp_path, calls)
+    monkeypatch.delenv("PTD_CACHE_DIR")
+    monkeypatch.chdir(tmp_path)
+    assert _validate("SHIRT", {"brand": ["x"]}) == (True, [])
+    assert ptd._disk() is None and not any(tmp_path.rglob("*.json"))
@@ -0,0 +1,59 @@
+import random
+from pipeline.rejects import RejectSet
+from utils.ngram import TrigramIndex
+
+def _rejects(n=300, seed=7):
+    rnd = random.Random(seed)
+    codes = ["missing:brand", "price:not_numeric", "price:not_positive", "title:too_long(250>200)", "title:empty"]
+    return [
+        {"id": f"SKU-{rnd.randrange(10_000):05d}-{i}",
+         "errors": rnd.sample(codes, rnd.randint(1, 2)),
+         "channel_payload": {"title": rnd.choice(["Red Mug", "Blue Shirt", "Green Hat", ""]), "price": rnd.choice(["-1", "x", "3"])}}
+        for i in range(n)
+    ]
+
+def _naive(rejects, contains, id_like):
+    def hay(r):
+        return (" ".join(r["errors"]) + " " + " ".join(f"{k}:{v}" for k, v in r["channel_payload"].items())).lower()
+    return [i for i, r in enumerate(rejects)
+            if (not contains or contains.lower() in hay(r)) and (not id_like or id_like.lower() in r["id"].lower())]
+
+def test_trigram_search_matches_substring_scan():
+    docs = ["red mug", "blue shirt", "green hat", "shirt blue", "", "ab"]
+    idx = TrigramIndex(docs)
+    for q in ["shirt", "ue s", "hat", "ab", "zzz", "e", "blue shirt"]:
+        assert idx.search(q) == [i for i, d in enumerate(docs) if q in d]
+    assert idx.search("shirt", within=[3, 4]) == [3]
+
+def test_index_lookups_match_linear_scan():
+    rejects = _rejects()
+    rs = RejectSet(rejects)
+    for contains, id_like in [("shirt", None), ("NOT_POS", "-1"), (None, "sku-00"), ("mug price:-1", None), ("x", None)]:
+        assert list(rs.view(contains, id_like)[0]) == _naive(rejects, contains, id_like)
+
+def test_facets_and_error_code_filter():
+    rejects = _rejects()
+    rs = RejectSet(rejects)
+    facets = rs.facets()
+    assert facets["title:too_long"] == sum("title:too_long(250>200)" in r["errors"] for r in rejects)
+    assert list(facets.values()) == sorted(facets.values(), reverse=True)
+    assert rs.page(error_code="title:empty", limit=1000)["total"] == facets["title:empty"]
+    assert sum(rs.facets(contains="shirt").values()) >= rs.page(contains="shirt")["total"]
+
+def test_keyset_pages_cover_the_sorted_view():
+    rejects = _rejects()
+    rs = RejectSet(rejects)
+    for sort_dir in ("asc", "desc"):
+        expected = sorted(rejects, key=lambda r: " ".join(r["errors"]), reverse=sort_dir == "desc")
+        seen, cursor = [], None
+        while True:
+            page = rs.page(contains="price", sort_by="errors", sort_dir=sort_dir, limit=17, after=cursor)
+            seen.extend(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        # every payload has a price key, so the view is the whole set
+        assert [" ".join(r["errors"]) for r in seen] == [" ".join(r["errors"]) for r in expected]
+        assert len({r["id"] for r in seen}) == len(seen) == rs.page(contains="price")["total"]
+        # offset paging agrees with keyset paging
+        assert rs.page(contains="price", sort_by="errors", sort_dir=sort_dir, offset=17, limit=17)["items"] == seen[17:34]
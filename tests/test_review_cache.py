@@ -0,0 +1,72 @@
+import threading
+import time
+from pipeline import rejects as rejects_mod
+from pipeline.graph import run_pipeline
+
+HEADER = "id,title,description,brand,price\n"
+
+def _catalog(tmp_path, n=20):
+    p = tmp_path / "catalog.csv"
+    rows = [f"S{i:03d},Title {i},desc,Brand,{'-1' if i % 2 else '5.00'}\n" for i in range(n)]
+    p.write_text(HEADER + "".join(rows))
+    return str(p)
+
+def test_reject_set_matches_pipeline_and_pages(tmp_path):
+    rejects_mod.clear()
+    path = _catalog(tmp_path)
+    rs = rejects_mod.get_reject_set("amazon", path)
+    full = run_pipeline(channel="amazon", catalog_path=path, batch_size=50, dry_run=True, extra={})
+    assert rs.rejects == full["rejects"] and len(rs.rejects) == 10
+
+    page = rs.page(sort_by="id", sort_dir="desc", offset=2, limit=3)
+    assert page["total"] == 10 and [r["id"] for r in page["items"]] == ["S015", "S013", "S011"]
+    page = rs.page(contains="NOT_POSITIVE", id_like="s01")
+    assert page["total"] == 5 and all(r["id"].startswith("S01") for r in page["items"])
+
+def test_computed_once_per_content_and_shared_by_concurrent_calls(tmp_path, monkeypatch):
+    rejects_mod.clear()
+    path = _catalog(tmp_path)
+    calls = []
+    real = rejects_mod.collect_rejects
+
+    def slow(*a, **kw):
+        calls.append(1)
+        time.sleep(0.1)
+        return real(*a, **kw)
+
+    monkeypatch.setattr(rejects_mod, "collect_rejects", slow)
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(rejects_mod.get_reject_set("amazon", path))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and all(o is out[0] for o in out)
+    assert rejects_mod.get_reject_set("amazon", path) is out[0]
+
+    # new content -> new key
+    _catalog(tmp_path, n=4)
+    assert len(rejects_mod.get_reject_set("amazon", path).rejects) == 2
+    assert len(calls) == 2
+
+def test_input_format_is_part_of_the_key(tmp_path, monkeypatch):
+    rejects_mod.clear()
+    path = _catalog(tmp_path)
+    calls = []
+    real = rejects_mod.collect_rejects
+    monkeypatch.setattr(rejects_mod, "collect_rejects", lambda *a, **kw: calls.append(a[2]) or real(*a, **kw))
+
+    plain = rejects_mod.get_reject_set("amazon", path, {"workers": 1})
+    assert rejects_mod.get_reject_set("amazon", path, {"chunk_size": 5}) is plain
+    spapi = rejects_mod.get_reject_set("amazon", path, {"input_format": "spapi-jsonl"})
+    assert spapi is not plain and len(calls) == 2
+    assert rejects_mod.get_reject_set("amazon", path, {"input_format": "spapi-jsonl", "workers": 2}) is spapi
+
+def test_catalog_hashes_are_bounded(tmp_path, monkeypatch):
+    rejects_mod.clear()
+    monkeypatch.setattr(rejects_mod._HASHES, "max_entries", 3)
+    for i in range(5):
+        p = tmp_path / f"c{i}.csv"
+        p.write_text(HEADER)
+        rejects_mod.catalog_hash(str(p))
+    assert len(rejects_mod._HASHES) == 3
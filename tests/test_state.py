@@ -0,0 +1,26 @@
+from bench import synth
+from pipeline.graph import _load_items, run_pipeline
+from pipeline.state import PipelineState
+from pipeline.nodes.map_schema import map_schema_node
+from pipeline.nodes.validate import validate_node
+from pipeline.nodes.plan_batches import plan_batches_node
+
+def test_stages_release_what_they_consume(tmp_path):
+    path = str(tmp_path / "c.csv")
+    synth.generate(path, 23, seed=4, invalid_rate=0.3)
+    items = _load_items(path)
+    state = map_schema_node(PipelineState(channel="ebay", catalog_path=path, batch_size=5, items=items))
+    assert state.items == [] and len(items) == 23  # rebinding leaves the caller's list alone
+    assert state.n_mapped == 23 and len(state.preview) == 5
+
+    state = plan_batches_node(validate_node(state))
+    assert state.mapped == [] and state.n_valid == len(state.valid) < 23
+    assert all(isinstance(b, range) for b in state.batches)
+    assert [t for b in state.iter_batches() for t in b] == state.valid
+
+def test_counts_and_preview_survive_release():
+    res = run_pipeline("ebay", "data/samples/catalog_sample.csv", 2, True, {})
+    c = res["counts"]
+    assert c["mapped"] == c["input_items"] and c["valid"] == c["upserted"] > 0
+    assert res["preview_mapped"][0].keys() == {"id", "channel_payload"}
+    assert all(r.keys() == {"id", "errors", "channel_payload"} for r in res["rejects"])
@@ -0,0 +1,36 @@
+from src.pipeline.graph import run_pipeline, _iter_chunks
+
+def test_iter_chunks_is_lazy_and_sized():
+    chunks = _iter_chunks("data/samples/catalog_sample.csv", 2)
+    assert [len(c) for c in chunks] == [2, 1]
+
+def test_streaming_matches_full_run():
+    kw = dict(channel="amazon", catalog_path="data/samples/catalog_sample.csv", batch_size=2, dry_run=True)
+    full = run_pipeline(extra={}, **kw)
+    streamed = run_pipeline(extra={"stream": True, "chunk_size": 1}, **kw)
+    assert streamed["counts"]["input_items"] == full["counts"]["input_items"]
+    assert streamed["counts"]["valid"] == full["counts"]["valid"]
+    assert streamed["counts"]["upserted"] == full["counts"]["upserted"]
+    assert streamed["preview_mapped"] == full["preview_mapped"]
+    assert streamed["rejects"] == full["rejects"]
+
+def test_malformed_chunk_size_is_a_400():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+    body = {"catalog_path": "data/samples/catalog_sample.csv", "extra": {"stream": True, "chunk_size": "1k"}}
+    for url in ("/translate/amazon", "/jobs/translate/amazon", "/review/amazon"):
+        r = client.post(url, json=body)
+        assert r.status_code == 400 and "chunk_size" in r.json()["detail"]
+
+def test_streaming_keeps_only_the_first_rejects(tmp_path, monkeypatch):
+    monkeypatch.setenv("STREAM_MAX_REJECTS", "3")
+    path = tmp_path / "catalog.csv"
+    rows = [f"S{i:03d},Title {i},desc,Brand,{'-1' if i % 2 else '5.00'}\n" for i in range(20)]
+    path.write_text("id,title,description,brand,price\n" + "".join(rows))
+    kw = dict(channel="amazon", catalog_path=str(path), batch_size=50, dry_run=True)
+    full = run_pipeline(extra={}, **kw)
+    streamed = run_pipeline(extra={"stream": True, "chunk_size": 4}, **kw)
+    assert streamed["rejects"] == full["rejects"][:3]
+    assert streamed["rejected"] == full["rejected"] == 10
+    assert streamed["rejects_truncated"] and not full["rejects_truncated"]
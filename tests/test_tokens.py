@@ -0,0 +1,111 @@
+import pytest
+import threading
+import time
+from channels import tokens
+from channels.tokens import FileTokenStore, RedisTokenStore, TokenManager
+from utils import metrics
+
+def _counting_fetch(calls, delay=0.05, expires_in=3600):
+    def fetch():
+        calls.append(1)
+        time.sleep(delay)  # slow auth endpoint: concurrent callers pile up behind it
+        return f"tok{len(calls)}", expires_in
+    return fetch
+
+def test_concurrent_callers_share_one_refresh():
+    calls = []
+    tm = TokenManager("test:sf", "k", _counting_fetch(calls))
+    got = []
+    threads = [threading.Thread(target=lambda: got.append(tm.get())) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and set(got) == {"tok1"}
+    assert tokens.token_metrics()["test:sf"]["refreshes"] == 1
+    assert metrics.total("oauth_token_refreshes_total", token="test:sf") == 1
+
+def test_token_is_renewed_ahead_of_expiry():
+    calls = []
+    # expires_in inside the renewal window: still served, but renewed in the background
+    tm = TokenManager("test:ahead", "k", _counting_fetch(calls, delay=0, expires_in=tokens.RENEW_AHEAD - 10))
+    assert tm.get() == "tok1"
+    assert tm.get() == "tok1"
+    for _ in range(100):
+        if tm._token == "tok2":
+            break
+        time.sleep(0.01)
+    assert tm._token == "tok2"
+
+class _RedisStandIn:
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, k):
+        return self.data.get(k)
+
+    def set(self, k, v, ex=None, px=None, nx=False):
+        with self.lock:
+            if nx and k in self.data:
+                return None
+            self.data[k] = v
+            return True
+
+    def eval(self, script, numkeys, k, token):
+        # the compare-and-delete release script
+        with self.lock:
+            if self.data.get(k) == token:
+                del self.data[k]
+                return 1
+            return 0
+
+def test_shared_store_reuses_one_token_across_workers(tmp_path):
+    for store in (FileTokenStore(str(tmp_path)), RedisTokenStore(_RedisStandIn())):
+        calls = []
+        # separate managers stand in for separate worker processes
+        workers = [TokenManager("test:shared", "cred", _counting_fetch(calls), store=store) for _ in range(4)]
+        got = []
+        threads = [threading.Thread(target=lambda w=w: got.append(w.get())) for w in workers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1 and set(got) == {"tok1"}
+
+def test_redis_lock_is_only_released_by_its_holder():
+    redis = _RedisStandIn()
+    store = RedisTokenStore(redis, lock_ttl=0.01)
+    with store.lock("cred"):
+        # our lock expired mid-refresh and another worker took it
+        redis.data["oauth:cred:lock"] = "theirs"
+    assert redis.data["oauth:cred:lock"] == "theirs"
+    with store.lock("other"):
+        pass
+    assert "oauth:other:lock" not in redis.data
+
+def test_token_store_is_abstract():
+    class Partial(tokens.TokenStore):
+        def get(self, key):
+            return None
+
+    for cls in (tokens.TokenStore, Partial):
+        with pytest.raises(TypeError):
+            cls()
+
+def test_token_is_renewed_before_expiry_without_callers():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        # the first token enters its renewal window almost at once, the next one doesn't
+        return f"tok{len(calls)}", tokens.RENEW_AHEAD + (0.05 if len(calls) == 1 else 3600)
+
+    tm = TokenManager("test:timer", "k", fetch)
+    assert tm.get() == "tok1"
+    # nobody calls get(): the timer renews on its own
+    for _ in range(200):
+        if tm._token == "tok2":
+            break
+        time.sleep(0.01)
+    assert tm._token == "tok2" and len(calls) == 2
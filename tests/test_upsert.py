@@ -0,0 +1,68 @@
+import asyncio
+import httpx
+from pipeline.state import PipelineState, TranslatedItem
+from pipeline.nodes import upsert
+
+class _SlowClient:
+    name = "slow"
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+
+    async def avalidate_listing(self, payload, http=None):
+        return (payload.get("price") != "bad"), ["price:bad"]
+
+    async def aupsert_listing(self, payload, http=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return True
+
+def test_concurrent_upsert_bounds_in_flight_and_keeps_order(monkeypatch):
+    client = _SlowClient()
+    monkeypatch.setattr(upsert, "get_client", lambda channel: client)
+    items = [TranslatedItem(id=f"S{i}", channel_payload={"price": "bad" if i == 3 else "1.00"}) for i in range(40)]
+    state = PipelineState(
+        channel="amazon", catalog_path="x", dry_run=False, extra={"concurrency": 8},
+        valid=items, batches=[range(i, i + 10) for i in range(0, 40, 10)],
+    )
+    out = upsert.throttle_and_upsert_node(state)
+    assert out.upserted_ids == [t.id for t in items if t.id != "S3"]
+    assert out.errors == ["S3: channel_validate:price:bad"]
+    assert 1 < client.peak <= 8
+
+class _FlakyClient:
+    name = "flaky"
+
+    def validate_listing(self, payload):
+        if payload["sku"] == "S1":
+            raise httpx.HTTPStatusError("503", request=httpx.Request("GET", "https://x"), response=httpx.Response(503))
+        return True, []
+
+    def upsert_listing(self, payload):
+        if payload["sku"] == "S2":
+            raise httpx.RemoteProtocolError("Server disconnected without sending a response.")
+        return True
+
+def test_sequential_upsert_turns_5xx_and_dropped_connections_into_item_errors(monkeypatch):
+    monkeypatch.setattr(upsert, "get_client", lambda channel: _FlakyClient())
+    items = [TranslatedItem(id=f"S{i}", channel_payload={"sku": f"S{i}"}) for i in range(5)]
+    state = PipelineState(
+        channel="amazon", catalog_path="x", dry_run=False, extra={"force_resync": True},
+        valid=items, batches=[range(0, 3), range(3, 5)],
+    )
+    out = upsert.throttle_and_upsert_node(state)
+    # the run goes on past both failures, in the same and the next batch
+    assert out.upserted_ids == ["S0", "S3", "S4"]
+    assert out.errors == ["S1: upsert:error:HTTPStatusError", "S2: upsert:error:RemoteProtocolError"]
+
+def test_malformed_concurrency_is_a_400():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+    body = {"catalog_path": "data/samples/catalog_sample.csv", "extra": {"concurrency": "eight"}}
+    for url in ("/translate/amazon", "/jobs/translate/amazon"):
+        r = client.post(url, json=body)
+        assert r.status_code == 400 and "concurrency" in r.json()["detail"]